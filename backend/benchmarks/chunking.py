@@ -0,0 +1,128 @@
+"""
+Chunker speed, chunk sizes and structure preservation on long documents.
+
+Generates a synthetic lab/clinical report (or reads a text file), then runs
+the previous whitespace chunker and the structure-aware ``TextChunker``.
+Reports wall time, peak memory, chunk count and size spread, and how many
+lab-value rows were cut between chunks.
+
+    python -m benchmarks.chunking --pages 150
+    python -m benchmarks.chunking --file report.txt --target-tokens 800 --overlap-tokens 80
+"""
+from typing import List, Callable, Dict, Any
+import argparse
+import random
+import time
+import tracemalloc
+
+from services.text_chunker import TextChunker, estimate_tokens
+
+CHARS_PER_PAGE = 3000
+LAB_TESTS = [
+    ("Fasting Blood Sugar", "mg/dL", 70, 180), ("HbA1c", "%", 4.5, 9.0), ("Total Cholesterol", "mg/dL", 140, 260),
+    ("LDL", "mg/dL", 60, 190), ("HDL", "mg/dL", 30, 80), ("Triglycerides", "mg/dL", 80, 300),
+    ("Hemoglobin", "g/dL", 10.0, 17.0), ("Creatinine", "mg/dL", 0.5, 1.6), ("TSH", "uIU/mL", 0.3, 6.0),
+]
+PROSE = [
+    "The patient reports improved energy levels since the last visit.",
+    "Blood pressure readings at home have been within the target range on most days.",
+    "Dietary changes include reduced refined sugar and increased fibre intake.",
+    "No adverse effects from the current medication were reported.",
+    "Sleep remains disturbed on some nights, averaging six hours.",
+    "Continue the current dose and review the results at the next appointment.",
+]
+
+
+def legacy_chunk_text(text: str, max_chunk_size: int = 4000) -> List[str]:
+    """The whitespace chunker DocumentService used before TextChunker."""
+    if len(text) <= max_chunk_size:
+        return [text]
+    chunks, current_chunk, current_size = [], [], 0
+    for word in text.split():
+        word_size = len(word) + 1
+        if current_size + word_size > max_chunk_size and current_chunk:
+            chunks.append(' '.join(current_chunk))
+            current_chunk, current_size = [word], word_size
+        else:
+            current_chunk.append(word)
+            current_size += word_size
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+    return chunks
+
+
+def build_report(pages: int, seed: int = 7) -> (str, List[str]):
+    """Synthetic report of about ``pages`` pages; also returns every lab-value row."""
+    rng = random.Random(seed)
+    sections, rows, size, visit = [], [], 0, 0
+    while size < pages * CHARS_PER_PAGE:
+        visit += 1
+        table = []
+        for name, unit, low, high in LAB_TESTS:
+            value = round(rng.uniform(low, high), 1)
+            row = f"{name}: {value} {unit} (ref {low}-{high})"
+            table.append(row)
+            rows.append(row)
+        notes = " ".join(rng.choice(PROSE) for _ in range(rng.randint(8, 20)))
+        section = f"VISIT {visit} - LABORATORY RESULTS\n\n" + "\n".join(table) + f"\n\nClinical notes\n{notes}"
+        sections.append(section)
+        size += len(section)
+    return "\n\n".join(sections), rows
+
+
+def measure(name: str, chunk: Callable[[str], List[str]], text: str, rows: List[str], repeat: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = chunk(text)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    chunk(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tokens = sorted(estimate_tokens(c) for c in chunks)
+    # A row survives if some chunk contains it with its line intact
+    broken = sum(1 for row in set(rows) if not any(row in c for c in chunks))
+    return {
+        "chunker": name,
+        "best_ms": round(min(timings) * 1000, 1),
+        "peak_mb": round(peak / 1_048_576, 1),
+        "chunks": len(chunks),
+        "min_tokens": tokens[0],
+        "median_tokens": tokens[len(tokens) // 2],
+        "max_tokens": tokens[-1],
+        "rows_broken": broken,
+    }
+
+
+def main(args) -> None:
+    if args.file:
+        with open(args.file, encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+        rows = [line.strip() for line in text.splitlines() if ":" in line and any(ch.isdigit() for ch in line)]
+    else:
+        text, rows = build_report(args.pages, args.seed)
+    print(f"{len(text):,} characters (~{len(text) // CHARS_PER_PAGE} pages), {len(set(rows)):,} lab rows\n")
+
+    chunker = TextChunker(target_tokens=args.target_tokens, overlap_tokens=args.overlap_tokens)
+    results = [
+        measure("legacy (4000 chars)", legacy_chunk_text, text, rows, args.repeat),
+        measure(f"structured ({args.target_tokens} tok)", chunker.chunk, text, rows, args.repeat),
+    ]
+    columns = ["best_ms", "peak_mb", "chunks", "min_tokens", "median_tokens", "max_tokens", "rows_broken"]
+    print(f"{'chunker':<26}" + "".join(f"{c:>14}" for c in columns))
+    for result in results:
+        print(f"{result['chunker']:<26}" + "".join(f"{result[c]:>14}" for c in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark document chunking")
+    parser.add_argument("--pages", type=int, default=150, help="Size of the synthetic report")
+    parser.add_argument("--file", default=None, help="Chunk this text file instead")
+    parser.add_argument("--target-tokens", type=int, default=1000)
+    parser.add_argument("--overlap-tokens", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,139 @@
+"""
+Bytes on the wire and transfer time with compression and conditional GET.
+
+Serves a health-metrics JSON body and a TTS-style WAV file through the
+app's CompressionMiddleware, ConditionalGetMiddleware and
+CompressedStaticFiles, and requests them as a browser would: without
+compression, with gzip/brotli, revalidating with If-None-Match, and seeking
+with Range. Reports bytes received, server time, and the time to transfer
+the response over a link of ``--mbps``. No database is needed.
+
+    python -m benchmarks.compression --rows 2000
+    python -m benchmarks.compression --wav reply.wav --mbps 5
+
+How well audio compresses depends on its content; pass ``--wav`` with a
+real TTS reply for representative audio numbers.
+"""
+from typing import List, Dict, Any
+from pathlib import Path
+import argparse
+import asyncio
+import io
+import math
+import random
+import shutil
+import struct
+import tempfile
+import time
+import wave
+
+import httpx # type: ignore
+
+from benchmarks.runner import percentile
+from benchmarks.serialization import build_rows
+from middlewares.compression import CompressionMiddleware
+from middlewares.etag import ConditionalGetMiddleware
+from utils.compression import SUPPORTED_ENCODINGS, precompress_file
+from utils.json_response import dumps
+from utils.static_files import CompressedStaticFiles
+
+
+def build_wav(seconds: float, seed: int = 7) -> bytes:
+    """Mono 22.05 kHz 16-bit audio: voiced bursts with pauses, like a spoken reply."""
+    rng = random.Random(seed)
+    rate = 22050
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        voiced = (i // 3000) % 3 != 2
+        sample = 0.0
+        if voiced:
+            sample = 6000 * math.sin(i * 0.06) + 2500 * math.sin(i * 0.17) + rng.gauss(0, 400)
+        else:
+            sample = rng.gauss(0, 60)
+        frames += struct.pack("<h", max(-32768, min(32767, int(sample))))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as output:
+        output.setnchannels(1)
+        output.setsampwidth(2)
+        output.setframerate(rate)
+        output.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def build_app(json_body: bytes, static_dir: str):
+    static = CompressedStaticFiles(directory=static_dir)
+
+    async def app(scope, receive, send):
+        if scope["path"].startswith("/static/"):
+            await static({**scope, "root_path": "/static", "path": scope["path"]}, receive, send)
+            return
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(json_body)).encode())]})
+        await send({"type": "http.response.body", "body": json_body})
+
+    return ConditionalGetMiddleware(CompressionMiddleware(app))
+
+
+async def measure(client: httpx.AsyncClient, url: str, headers: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    timings: List[float] = []
+    received = status = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        async with client.stream("GET", url, headers=headers) as response:
+            async for _ in response.aiter_raw():
+                pass
+            received = response.num_bytes_downloaded
+            status = response.status_code
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {"status": status, "bytes": received, "server_ms": percentile(timings, 50)}
+
+
+async def main(args) -> None:
+    json_body = dumps({"data": build_rows(args.rows, args.seed)["metrics"], "success": True})
+    static_dir = tempfile.mkdtemp(prefix="bench-static-")
+    try:
+        wav_path = Path(static_dir) / "reply.wav"
+        wav_path.write_bytes(Path(args.wav).read_bytes() if args.wav else build_wav(args.seconds, args.seed))
+        precompress_file(str(wav_path))
+
+        transport = httpx.ASGITransport(app=build_app(json_body, static_dir))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            cases = [("json identity", "/api/health/metrics", {"Accept-Encoding": "identity"})]
+            cases += [(f"json {encoding}", "/api/health/metrics", {"Accept-Encoding": encoding}) for encoding in SUPPORTED_ENCODINGS]
+            cases.append(("wav identity", "/static/reply.wav", {"Accept-Encoding": "identity"}))
+            cases += [(f"wav {encoding} (precompressed)", "/static/reply.wav", {"Accept-Encoding": encoding})
+                      for encoding in SUPPORTED_ENCODINGS]
+            cases.append(("wav range 64 KB", "/static/reply.wav", {"Accept-Encoding": "identity", "Range": "bytes=0-65535"}))
+
+            # Revalidating a cached copy: compressed JSON and the WAV file
+            for label, url, headers in (cases[1], next(case for case in cases if case[0] == "wav identity")):
+                etag = (await client.get(url, headers=headers)).headers.get("etag")
+                if etag:
+                    cases.append((f"{label} revalidate", url, {**headers, "If-None-Match": etag}))
+
+            print(f"JSON body {len(json_body):,} bytes ({args.rows:,} metrics), WAV {wav_path.stat().st_size:,} bytes; "
+                  f"link {args.mbps} Mbit/s, encodings available: {', '.join(SUPPORTED_ENCODINGS)}\n")
+            print(f"{'request':<34}{'status':>7}{'bytes':>12}{'saved':>8}{'server ms':>11}{'link ms':>10}")
+            baseline = {}
+            for label, url, headers in cases:
+                result = await measure(client, url, headers, args.repeat)
+                kind = label.split()[0]
+                baseline.setdefault(kind, result["bytes"])
+                saved = 1 - result["bytes"] / baseline[kind] if baseline[kind] else 0
+                link_ms = result["bytes"] * 8 / (args.mbps * 1_000_000) * 1000
+                print(f"{label:<34}{result['status']:>7}{result['bytes']:>12,}{saved:>8.0%}"
+                      f"{result['server_ms']:>11.2f}{link_ms:>10.1f}")
+    finally:
+        shutil.rmtree(static_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response compression and conditional GET")
+    parser.add_argument("--rows", type=int, default=2000, help="Metrics in the JSON body")
+    parser.add_argument("--wav", help="WAV file to serve instead of synthetic audio")
+    parser.add_argument("--seconds", type=float, default=8.0, help="Length of the synthetic audio")
+    parser.add_argument("--mbps", type=float, default=10.0, help="Client link speed for the transfer estimate")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""
+Health metric ingestion throughput: one reading per call vs batch upserts.
+
+Generates a wearable-style stream of readings for one user and stores it
+three ways: ``create_health_metric`` per reading (what ``POST /metrics``
+does), the batch path behind ``POST /metrics/batch``, and the batch path
+again on the same data, where every reading is a duplicate.
+
+    python -m benchmarks.metric_ingest --readings 100000
+    python -m benchmarks.metric_ingest --mongodb-url mongodb://db:27017 --batch-size 5000
+
+Needs a MongoDB server (the benchmark database is dropped first);
+mongomock's bulk_write doesn't accept current pymongo's UpdateOne.
+"""
+from typing import List, Dict, Any, AsyncIterator
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "bench-openai-key")
+os.environ.setdefault("SARVAM_API_KEY", "bench-sarvam-key")
+
+import database
+from config import settings
+from models.health import HealthMetricCreate, HealthMetricReading
+
+
+def build_readings(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Heart rate every minute plus a few blood pressure and glucose readings, as a device would send them."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        measured_at = (start + timedelta(minutes=i)).isoformat() + "Z"
+        if i % 50 == 0:
+            systolic, diastolic = rng.randint(105, 150), rng.randint(65, 95)
+            rows.append({"metric_type": "blood_pressure", "value": f"{systolic}/{diastolic}", "unit": "mmHg",
+                         "measured_at": measured_at, "device_used": "cuff-01"})
+        elif i % 97 == 0:
+            rows.append({"metric_type": "blood_glucose", "value": rng.randint(80, 180), "unit": "mg/dL",
+                         "measured_at": measured_at, "device_used": "cgm-01"})
+        else:
+            rows.append({"metric_type": "heart_rate", "value": rng.randint(55, 110), "unit": "bpm",
+                         "measured_at": measured_at, "device_used": "watch-01"})
+    return rows
+
+
+async def _connect(args) -> None:
+    settings.mongodb_url = args.mongodb_url
+    settings.database_name = args.database
+    await database.connect_to_mongo()
+    await database.db.client.drop_database(args.database) # type: ignore
+
+
+async def run_single(health_service, user_id: str, rows: List[Dict[str, Any]]) -> int:
+    stored = 0
+    for row in rows:
+        metric = HealthMetricCreate(**{**row, "value": str(row["value"]), "measured_at": row["measured_at"][:10]})
+        if await health_service.create_health_metric(user_id, metric):
+            stored += 1
+    return stored
+
+
+async def run_batch(health_service, user_id: str, rows: List[Dict[str, Any]], batch_size: int) -> Dict[str, int]:
+    async def batches() -> AsyncIterator[List[HealthMetricReading]]:
+        for i in range(0, len(rows), batch_size):
+            yield [HealthMetricReading.model_validate(row) for row in rows[i:i + batch_size]]
+    return await health_service.ingest_health_metrics(user_id, batches())
+
+
+async def main(args) -> None:
+    await _connect(args)
+    from services.health_service import health_service
+
+    rows = build_readings(args.readings, args.seed)
+    single_rows = rows[:args.single_readings]
+    print(f"{len(rows):,} readings\n")
+
+    results = []
+    started = time.perf_counter()
+    stored = await run_single(health_service, "bench-single", single_rows)
+    results.append(("one per call", len(single_rows), stored, 0, time.perf_counter() - started))
+
+    for label in ("batch", "batch (all duplicates)"):
+        started = time.perf_counter()
+        counts = await run_batch(health_service, "bench-batch", rows, args.batch_size)
+        results.append((label, len(rows), counts["inserted"], counts["duplicates"], time.perf_counter() - started))
+
+    print(f"{'path':<24}{'readings':>10}{'inserted':>10}{'dupes':>10}{'seconds':>10}{'rows/s':>12}")
+    for label, count, inserted, duplicates, elapsed in results:
+        print(f"{label:<24}{count:>10}{inserted:>10}{duplicates:>10}{elapsed:>10.2f}{count / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark health metric ingestion")
+    parser.add_argument("--readings", type=int, default=20000)
+    parser.add_argument("--single-readings", type=int, default=2000,
+                        help="Readings for the one-per-call path, which is much slower")
+    parser.add_argument("--batch-size", type=int, default=settings.metrics_batch_write_size)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="swasthwrap_bench")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
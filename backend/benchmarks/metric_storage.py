@@ -0,0 +1,125 @@
+"""
+Storage size and range-query latency: regular vs time-series metrics collection.
+
+Seeds the same device-style readings into a regular collection (with the
+user/time index the app creates) and a time-series collection, then reports
+data and index size and the latency of the per-user range queries behind
+``GET /api/health/metrics`` and the analytics trends.
+
+    python -m benchmarks.metric_storage --users 20 --days 90
+    python -m benchmarks.metric_storage --mongodb-url mongodb://db:27017 --interval-minutes 1 --days 30
+
+Needs MongoDB 5.0+; the benchmark database is dropped first.
+"""
+from typing import List, Dict, Any
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "bench-openai-key")
+os.environ.setdefault("SARVAM_API_KEY", "bench-sarvam-key")
+
+import database
+from config import settings
+from benchmarks.runner import percentile
+from repositories.metric_repository import MetricRepository
+
+METRIC_TYPES = {"heart_rate": ("bpm", 55, 110), "blood_glucose": ("mg/dL", 80, 180), "weight": ("kg", 50, 95)}
+
+
+def build_readings(user_id: str, start: datetime, days: int, interval_minutes: int, rng: random.Random) -> List[Dict[str, Any]]:
+    readings = []
+    steps = days * 24 * 60 // interval_minutes
+    for step in range(steps):
+        measured_at = start + timedelta(minutes=step * interval_minutes)
+        # Heart rate every interval, glucose hourly, weight daily
+        for metric_type, every in (("heart_rate", 1), ("blood_glucose", 60 // interval_minutes or 1),
+                                   ("weight", 1440 // interval_minutes or 1)):
+            if step % every:
+                continue
+            unit, low, high = METRIC_TYPES[metric_type]
+            readings.append({
+                "user_id": user_id, "metric_type": metric_type, "value": str(rng.randint(low, high)),
+                "unit": unit, "status": "normal", "notes": None, "measured_at": measured_at,
+                "device_used": "watch-01", "created_at": measured_at
+            })
+    return readings
+
+
+async def seed(repository: MetricRepository, users: List[str], args) -> float:
+    await repository.ensure_collection()
+    collection = await repository._collection()
+    rng = random.Random(args.seed)
+    start = datetime(2024, 1, 1)
+    started = time.perf_counter()
+    for user_id in users:
+        readings = build_readings(user_id, start, args.days, args.interval_minutes, rng)
+        for i in range(0, len(readings), 10000):
+            await collection.insert_many([repository.to_storage(r) for r in readings[i:i + 10000]], ordered=False)
+    return time.perf_counter() - started
+
+
+async def query_latencies(repository: MetricRepository, users: List[str], args) -> Dict[str, float]:
+    rng = random.Random(args.seed)
+    start = datetime(2024, 1, 1)
+    latencies = []
+    for _ in range(args.queries):
+        range_start = start + timedelta(days=rng.randint(0, max(0, args.days - args.range_days)))
+        started = time.perf_counter()
+        await repository.list_for_user(
+            rng.choice(users), ["heart_rate"], range_start, range_start + timedelta(days=args.range_days)
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {"p50_ms": round(percentile(latencies, 50), 1), "p95_ms": round(percentile(latencies, 95), 1)}
+
+
+async def main(args) -> None:
+    settings.mongodb_url = args.mongodb_url
+    settings.database_name = args.database
+    await database.connect_to_mongo()
+    await database.db.client.drop_database(args.database) # type: ignore
+    db = await database.get_database()
+
+    users = [f"bench-user-{i}" for i in range(args.users)]
+    layouts = [
+        ("collection", MetricRepository(storage="collection")),
+        ("timeseries", MetricRepository(storage="timeseries", granularity=args.granularity)),
+    ]
+    rows = []
+    for name, repository in layouts:
+        seconds = await seed(repository, users, args)
+        stats = await db.command("collStats", repository.collection_name)
+        count = await db[repository.collection_name].count_documents({})
+        rows.append({
+            "layout": name,
+            "readings": count,
+            "insert_s": round(seconds, 1),
+            "storage_mb": round(stats.get("storageSize", 0) / 1_048_576, 1),
+            "index_mb": round(stats.get("totalIndexSize", 0) / 1_048_576, 1),
+            **await query_latencies(repository, users, args)
+        })
+
+    columns = ["readings", "insert_s", "storage_mb", "index_mb", "p50_ms", "p95_ms"]
+    print(f"{'layout':<14}" + "".join(f"{c:>12}" for c in columns))
+    for row in rows:
+        print(f"{row['layout']:<14}" + "".join(f"{row[c]:>12}" for c in columns))
+    print(f"(range queries: {args.queries} x {args.range_days} days of heart rate for one user)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark regular vs time-series metric storage")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--interval-minutes", type=int, default=5, help="Heart-rate reading interval")
+    parser.add_argument("--granularity", default="minutes", choices=["seconds", "minutes", "hours"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--range-days", type=int, default=7)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="swasthwrap_bench")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
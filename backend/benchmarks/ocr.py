@@ -0,0 +1,94 @@
+"""
+Local OCR throughput per page for different worker counts.
+
+Renders synthetic scanned lab-report pages (or rasterizes a PDF), runs them
+through ``OCRService`` without the cache and prints seconds per page and
+pages per second. Needs pytesseract, Pillow and the tesseract binary; no
+database is needed.
+
+    python -m benchmarks.ocr --pages 12 --workers 1 2 4
+    python -m benchmarks.ocr --pdf scanned_report.pdf --dpi 200 --workers 2 4
+"""
+from typing import List, Callable
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.chunking import LAB_TESTS, PROSE
+from services.ocr_service import OCRService, Image, pdfium
+
+PAGE_SIZE = (2480, 3508)  # A4 at 300 dpi
+
+
+def synthetic_page(number: int, seed: int = 7):
+    """A white A4 page of lab rows and notes, drawn at scan resolution."""
+    from PIL import ImageDraw, ImageFont # type: ignore
+    rng = random.Random(seed + number)
+    image = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=42)
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    lines = [f"LABORATORY RESULTS - PAGE {number}", ""]
+    for name, unit, low, high in LAB_TESTS * 3:
+        lines.append(f"{name}: {round(rng.uniform(low, high), 1)} {unit} (ref {low}-{high})")
+    lines.append("")
+    lines.extend(rng.choice(PROSE) for _ in range(10))
+    y = 150
+    for line in lines:
+        draw.text((150, y), line, fill=0, font=font)
+        y += 64
+    return image
+
+
+async def measure(service: OCRService, numbers: List[int], load_image: Callable) -> dict:
+    started = time.perf_counter()
+    pages = await service._run(numbers, load_image)
+    elapsed = time.perf_counter() - started
+    per_page = sorted(page.seconds for page in pages)
+    return {
+        "workers": service.workers,
+        "pages": len(pages),
+        "wall_s": round(elapsed, 2),
+        "pages_per_s": round(len(pages) / elapsed, 2),
+        "median_page_s": round(per_page[len(per_page) // 2], 2),
+        "max_page_s": round(per_page[-1], 2),
+        "chars": sum(len(page.text) for page in pages),
+    }
+
+
+async def main(args) -> None:
+    results = []
+    for workers in args.workers:
+        service = OCRService(workers=workers, dpi=args.dpi, lang=args.lang)
+        if not service.available:
+            raise SystemExit("OCR is not available: install pytesseract and Pillow, and the tesseract binary")
+
+        if args.pdf:
+            with open(args.pdf, "rb") as f:
+                pdf = pdfium.PdfDocument(f.read())
+            numbers = list(range(1, min(len(pdf), args.pages) + 1))
+            results.append(await measure(service, numbers, lambda n: service._render(pdf, n)))
+            pdf.close()
+        else:
+            numbers = list(range(1, args.pages + 1))
+            results.append(await measure(service, numbers, lambda n: synthetic_page(n, args.seed)))
+        service.shutdown()
+
+    columns = ["pages", "wall_s", "pages_per_s", "median_page_s", "max_page_s", "chars"]
+    print(f"{'workers':<10}" + "".join(f"{c:>15}" for c in columns))
+    for result in results:
+        print(f"{result['workers']:<10}" + "".join(f"{result[c]:>15}" for c in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark local OCR throughput")
+    parser.add_argument("--pages", type=int, default=12, help="Synthetic pages, or the first N pages of --pdf")
+    parser.add_argument("--pdf", default=None, help="Rasterize and recognize this PDF instead")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--lang", default="eng")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,140 @@
+"""
+Bytes transferred per endpoint with and without repository projections.
+
+Builds representative documents for one user, BSON-encodes what each endpoint
+read before (whole documents) and what it reads now (the repository
+projections), and prints the totals. No database is needed.
+
+    python -m benchmarks.projection_bytes --metrics 365 --documents 40
+"""
+from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from bson import ObjectId, encode # type: ignore
+import argparse
+import random
+
+from repositories import (
+    condition_repository, document_repository, goal_repository,
+    health_tip_repository, intake_repository, metric_repository, user_repository
+)
+
+
+def project(doc: Dict[str, Any], projection: Dict[str, int]) -> Dict[str, Any]:
+    """Apply an inclusion projection the way the server does."""
+    keep = {field for field, flag in projection.items() if flag}
+    if projection.get("_id", 1):
+        keep.add("_id")
+    return {field: value for field, value in doc.items() if field in keep}
+
+
+def wire_bytes(docs: List[Dict[str, Any]], projection: Dict[str, int] = None) -> int:
+    if projection is not None:
+        docs = [project(doc, projection) for doc in docs]
+    return sum(len(encode(doc)) for doc in docs)
+
+
+def build_fixtures(user_id: str, metric_count: int, document_count: int) -> Dict[str, List[Dict[str, Any]]]:
+    now = datetime.utcnow()
+    user = {
+        "_id": ObjectId(user_id), "name": "Asha Verma", "email": "asha@example.com",
+        "password_hash": "$2b$12$" + "x" * 53, "language": "hi",
+        "interests": ["nutrition", "yoga", "diabetes care"], "health_score": 72, "streak": 9,
+        "upcoming_appointments": 1, "medications_due": 2, "avatar": "/avatars/" + "a" * 32 + ".png",
+        "phone": "+91 98765 43210", "blood_group": "B+", "address": "12 MG Road, Bengaluru, Karnataka 560001",
+        "emergency_contact": {"name": "Ravi Verma", "phone": "+91 98765 01234", "relationship": "spouse"},
+        "email_verified": True, "is_active": True, "data_version": 41, "created_at": now, "updated_at": now
+    }
+    metrics = []
+    for i in range(metric_count):
+        measured_at = now - timedelta(hours=i * 24)
+        if i % 2:
+            metric = {"metric_type": "blood_pressure", "value": "128/84", "unit": "mmHg", "systolic": 128, "diastolic": 84}
+        else:
+            metric = {"metric_type": "blood_sugar", "value": str(random.randint(90, 160)), "unit": "mg/dL"}
+        metrics.append({
+            "_id": ObjectId(), "user_id": user_id, **metric, "status": "normal",
+            "notes": "Measured after breakfast, felt fine", "measured_at": measured_at,
+            "device_used": "Omron HEM-7120", "location": "home", "created_at": measured_at
+        })
+    documents = [{
+        "_id": ObjectId(), "user_id": user_id, "document_name": f"lab_report_{i}.pdf",
+        "original_filename": f"Lab Report {i} - City Diagnostics.pdf",
+        "file_path": f"uploads/medical_documents/{user_id}/{ObjectId()}.pdf", "file_size": 482113,
+        "file_type": "pdf", "mime_type": "application/pdf", "category": "lab_report",
+        "document_date": now, "description": "Quarterly HbA1c and lipid panel",
+        "tags": ["hba1c", "lipids"], "status": "processed", "is_encrypted": True,
+        "encryption_key": "k" * 64, "extracted_text": "Patient report text " * 400,
+        "created_at": now, "updated_at": now
+    } for i in range(document_count)]
+    goals = [{
+        "_id": ObjectId(), "user_id": user_id, "goal_title": f"Walk {5 + i} km daily", "target_value": "10",
+        "current_value": "4", "unit": "km", "progress_percentage": 40.0, "deadline": now + timedelta(days=30),
+        "category": "fitness", "priority": "medium", "status": "active",
+        "notes": "Morning walks in the park", "created_at": now, "updated_at": now
+    } for i in range(6)]
+    conditions = [{
+        "_id": ObjectId(), "user_id": user_id, "name": name, "icd_code": "E11.9", "diagnosed_date": now,
+        "status": "active", "severity": "moderate", "notes": "Managed with medication and diet",
+        "diagnosed_by": "Dr. Iyer", "medications": ["Metformin 500mg", "Amlodipine 5mg"],
+        "last_updated": now, "created_at": now, "updated_at": now
+    } for name in ["Diabetes", "Hypertension"]]
+    intakes = [{
+        "_id": ObjectId(), "user_id": user_id, "medication_name": "Metformin",
+        "scheduled_time": now - timedelta(hours=12 * i), "taken_time": now - timedelta(hours=12 * i),
+        "taken": i % 5 != 0, "missed": i % 5 == 0, "notes": None, "created_at": now
+    } for i in range(180)]
+    tips = [{
+        "_id": ObjectId(), "en": "Drink at least 8 glasses of water daily. " * 3,
+        "hi": "रोज़ कम से कम 8 गिलास पानी पिएं। " * 3, "ta": "தினமும் குறைந்தது 8 கிளாஸ் தண்ணீர் குடிக்கவும். " * 3,
+        "category": "nutrition", "priority": 3, "conditions": ["diabetes"], "created_at": now, "is_active": True
+    } for _ in range(5)]
+    return {"user": [user], "metrics": metrics, "documents": documents, "goals": goals,
+            "conditions": conditions, "intakes": intakes, "tips": tips}
+
+
+def main(args) -> None:
+    random.seed(0)
+    fx = build_fixtures(str(ObjectId()), args.metrics, args.documents)
+    metrics_90d = fx["metrics"][:90]
+
+    # endpoint -> list of (full documents read, projection now used)
+    endpoints = {
+        "GET /api/dashboard/stats": [(fx["user"], user_repository.STATS_PROJECTION)],
+        "GET /api/dashboard/activity": [
+            (fx["metrics"][:5], metric_repository.SUMMARY_PROJECTION),
+            (fx["documents"][:5], document_repository.SUMMARY_PROJECTION),
+            (fx["goals"][:5], goal_repository.SUMMARY_PROJECTION)
+        ],
+        "GET /api/dashboard/reminders": [(fx["goals"][:3], goal_repository.DEADLINE_PROJECTION)],
+        "GET /api/dashboard/health-tips": [
+            (fx["conditions"], condition_repository.NAME_PROJECTION),
+            (fx["tips"], health_tip_repository.TIP_PROJECTION)
+        ],
+        "GET /api/analytics/health-trends": [
+            (metrics_90d, metric_repository.POINT_PROJECTION),
+            (fx["user"], {"_id": 0, "health_score": 1})
+        ],
+        "GET /api/analytics/medication-adherence": [
+            (fx["intakes"][:60], intake_repository.ADHERENCE_PROJECTION),
+            (fx["conditions"], condition_repository.NAME_PROJECTION)
+        ],
+        "GET /api/health/metrics": [(fx["metrics"], metric_repository.LIST_PROJECTION)],
+        "GET /api/health/documents": [(fx["documents"][:10], document_repository.LIST_PROJECTION)]
+    }
+
+    print(f"{'endpoint':<42}{'before':>12}{'after':>12}{'saved':>9}")
+    total_before = total_after = 0
+    for endpoint, reads in endpoints.items():
+        before = sum(wire_bytes(docs) for docs, _ in reads)
+        after = sum(wire_bytes(docs, projection) for docs, projection in reads)
+        total_before += before
+        total_after += after
+        print(f"{endpoint:<42}{before:>12,}{after:>12,}{(1 - after / before) * 100:>8.1f}%")
+    print(f"{'total':<42}{total_before:>12,}{total_after:>12,}{(1 - total_after / total_before) * 100:>8.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare BSON bytes per endpoint with and without projections")
+    parser.add_argument("--metrics", type=int, default=365, help="Health metrics for the user")
+    parser.add_argument("--documents", type=int, default=40, help="Medical documents for the user")
+    main(parser.parse_args())
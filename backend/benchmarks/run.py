@@ -0,0 +1,182 @@
+"""
+Load-test the API in process against seeded data and stubbed AI providers.
+
+    # mongomock-motor stand-in (pip install mongomock-motor)
+    python -m benchmarks.run --users 50 --requests 200 --concurrency 10
+
+    # local MongoDB; the benchmark database is dropped and re-seeded
+    python -m benchmarks.run --mongodb-url mongodb://localhost:27017 --output results.json
+
+    # slow, flaky provider: lognormal latency, 2% 500s, 60 requests/minute
+    python -m benchmarks.run --scenarios chat --openai-latency lognormal:800,0.5 \
+        --openai-error-rate 0.02 --openai-rpm 60
+
+    # fail (exit 1) if p95 or throughput regress more than 20% against a baseline
+    python -m benchmarks.run --baseline results.json --threshold 0.2
+
+Requests go through httpx's ASGI transport, so latencies cover the app and
+the database but not the network or uvicorn. OpenAI and Sarvam calls go over
+HTTP to local stub servers.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+# Settings are validated at import; benchmark runs never need real keys
+load_dotenv()
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "bench-openai-key")
+os.environ.setdefault("SARVAM_API_KEY", "bench-sarvam-key")
+
+import httpx # type: ignore
+
+import database
+from config import settings
+from benchmarks.runner import run_scenario, compare_results
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.seed import SeedScale, seed_database
+from benchmarks.stubs import (
+    StubServer, create_openai_stub, create_sarvam_stub, add_behavior_arguments, behavior_from_args
+)
+
+logger = logging.getLogger("benchmarks")
+
+
+async def _connect(args):
+    """Point the app's database handles at MongoDB or a mongomock stand-in."""
+    if args.mongodb_url:
+        settings.mongodb_url = args.mongodb_url
+        settings.database_name = args.database
+        await database.connect_to_mongo()
+        await database.db.client.drop_database(args.database) # type: ignore
+        return "mongodb"
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient # type: ignore
+    except ImportError:
+        sys.exit("mongomock-motor is not installed; install it or pass --mongodb-url")
+    client = AsyncMongoMockClient()
+    database.db.client = client
+    database.db.database = client[args.database]
+    database.db.read_database = client[args.database]
+    return "mongomock"
+
+
+async def main(args) -> int:
+    store = await _connect(args)
+    db = await database.get_database()
+
+    scale = SeedScale(
+        users=args.users,
+        metrics_per_user=args.metrics_per_user,
+        sessions_per_user=args.sessions_per_user,
+        messages_per_session=args.messages_per_session
+    )
+    users = await seed_database(db, scale, seed=args.seed)
+    logger.info(f"Seeded {len(users)} users into {store}")
+
+    # Start the stubs before the services are imported so they pick up the base URLs
+    openai_behavior = behavior_from_args(args, "openai-", seed=args.seed)
+    sarvam_behavior = behavior_from_args(args, "sarvam-", seed=args.seed)
+    openai_stub = StubServer(create_openai_stub(openai_behavior)).start()
+    sarvam_stub = StubServer(create_sarvam_stub(sarvam_behavior)).start()
+    settings.openai_base_url = f"{openai_stub.url}/v1"
+    settings.sarvam_base_url = sarvam_stub.url
+
+    from main import app
+
+    # Uploads are written relative to the working directory
+    workdir = tempfile.TemporaryDirectory(prefix="swasthwrap-bench-")
+    os.chdir(workdir.name)
+
+    scenario_names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "store": store,
+            "scale": vars(scale),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "openai_stub": {"latency": repr(openai_behavior.latency), "error_rate": openai_behavior.error_rate,
+                            "rate_limit_rate": openai_behavior.rate_limit_rate, "rpm": openai_behavior.rpm_limit},
+            "sarvam_stub": {"latency": repr(sarvam_behavior.latency), "error_rate": sarvam_behavior.error_rate,
+                            "rate_limit_rate": sarvam_behavior.rate_limit_rate, "rpm": sarvam_behavior.rpm_limit}
+        },
+        "scenarios": {}
+    }
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in scenario_names:
+                if name not in SCENARIOS:
+                    sys.exit(f"Unknown scenario '{name}'. Available: {', '.join(SCENARIOS)}")
+                # Login is dominated by bcrypt, so run fewer iterations
+                requests = max(1, args.requests // 10) if name == "login" else args.requests
+                results["scenarios"][name] = await run_scenario(
+                    SCENARIOS[name], client, users, requests, args.concurrency,
+                    warmup=args.warmup, seed=args.seed
+                )
+        async with httpx.AsyncClient() as stub_client:
+            results["meta"]["openai_stub"]["served"] = (await stub_client.get(f"{openai_stub.url}/_stub/stats")).json()
+            results["meta"]["sarvam_stub"]["served"] = (await stub_client.get(f"{sarvam_stub.url}/_stub/stats")).json()
+    finally:
+        openai_stub.stop()
+        sarvam_stub.stop()
+        workdir.cleanup()
+
+    print(f"\n{'scenario':<18}{'req':>6}{'err':>6}{'req/s':>10}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, r in results["scenarios"].items():
+        print(f"{name:<18}{r['requests']:>6}{r['errors']:>6}{r['throughput_rps']:>10}"
+              f"{r['p50_ms']:>10}{r['p90_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
+    print("(latencies in ms)")
+    print(f"OpenAI stub: {results['meta']['openai_stub']['served']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the SwasthWrap API benchmark suite")
+    parser.add_argument("--scenarios", default=None, help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Iterations per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed iterations per scenario")
+    parser.add_argument("--users", type=int, default=50, help="Seeded users")
+    parser.add_argument("--metrics-per-user", type=int, default=120)
+    parser.add_argument("--sessions-per-user", type=int, default=3)
+    parser.add_argument("--messages-per-session", type=int, default=10)
+    parser.add_argument("--mongodb-url", default=None, help="Use a real MongoDB instead of mongomock-motor")
+    parser.add_argument("--database", default="swasthwrap_bench", help="Database to (re)create for the run")
+    add_behavior_arguments(parser, "openai-")
+    add_behavior_arguments(parser, "sarvam-")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous results JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression as a fraction")
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("benchmarks").setLevel(logging.INFO)
+    cli_args = parser.parse_args()
+    if cli_args.mongodb_url and cli_args.database == settings.database_name:
+        sys.exit("Refusing to drop the application database; choose another --database")
+    sys.exit(asyncio.run(main(cli_args)))
@@ -0,0 +1,98 @@
+"""Load runner, latency statistics and baseline comparison."""
+from typing import List, Dict, Any, Callable, Awaitable
+import asyncio
+import logging
+import random
+import time
+
+from benchmarks.seed import BenchUser
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    values = sorted(latencies)
+    completed = len(values) + errors
+    return {
+        "requests": completed,
+        "errors": errors,
+        "error_rate": round(errors / completed, 4) if completed else 0.0,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p90_ms": round(percentile(values, 90) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0
+    }
+
+
+async def run_scenario(scenario: Callable[..., Awaitable[None]], client, users: List[BenchUser],
+                       requests: int, concurrency: int, warmup: int = 0, seed: int = 0) -> Dict[str, Any]:
+    """
+    Run ``requests`` iterations of a scenario with ``concurrency`` workers.
+
+    Each iteration picks a random seeded user; latency covers the whole
+    scenario, not individual HTTP calls.
+    """
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        try:
+            await scenario(client, rng.choice(users), rng)
+        except Exception:
+            pass
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+    first_error = None
+
+    async def worker():
+        nonlocal remaining, errors, first_error
+        while remaining > 0:
+            remaining -= 1
+            user = rng.choice(users)
+            started = time.perf_counter()
+            try:
+                await scenario(client, user, rng)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors += 1
+                first_error = first_error or e
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    if first_error is not None:
+        logger.warning(f"{errors} failed iterations, first error: {first_error}")
+    return summarize(latencies, errors, elapsed)
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compare scenario results against a baseline run.
+
+    Returns a list of regressions: p95 latency up, throughput down, or error
+    rate up by more than ``threshold`` (a fraction, e.g. 0.2 for 20%).
+    """
+    regressions = []
+    for name, result in current.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if base["p95_ms"] > 0 and result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']} ms -> {result['p95_ms']} ms")
+        if base["throughput_rps"] > 0 and result["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if result["error_rate"] > base["error_rate"] + threshold:
+            regressions.append(f"{name}: error rate {base['error_rate']} -> {result['error_rate']}")
+    return regressions
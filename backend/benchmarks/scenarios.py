@@ -0,0 +1,81 @@
+"""
+User journeys driven by the load runner.
+
+Each scenario performs the requests one user action makes (the dashboard
+page, for example, fires its four widget requests concurrently) and raises
+``ScenarioError`` on any non-2xx response.
+"""
+from typing import Callable, Dict, Awaitable
+import asyncio
+import random
+
+import httpx # type: ignore
+
+from benchmarks.seed import BenchUser, BENCH_PASSWORD, CHAT_PROMPTS
+
+LAB_REPORT = (
+    "CITY DIAGNOSTICS - LABORATORY REPORT\n"
+    "Fasting Blood Sugar: 112 mg/dL (70-100)\n"
+    "HbA1c: 6.4 % (4.0-5.6)\n"
+    "Total Cholesterol: 212 mg/dL (<200)\n"
+    "Hemoglobin: 13.6 g/dL (13.0-17.0)\n"
+).encode("utf-8") * 20
+
+
+class ScenarioError(Exception):
+    pass
+
+
+def _check(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise ScenarioError(f"{response.request.method} {response.request.url.path} -> {response.status_code}")
+
+
+async def login(client: httpx.AsyncClient, user: BenchUser, rng: random.Random) -> None:
+    _check(await client.post("/api/auth/login", json={"email": user.email, "password": BENCH_PASSWORD}))
+
+
+async def dashboard_load(client: httpx.AsyncClient, user: BenchUser, rng: random.Random) -> None:
+    responses = await asyncio.gather(
+        client.get("/api/dashboard/stats", headers=user.headers),
+        client.get("/api/dashboard/activity", headers=user.headers),
+        client.get("/api/dashboard/reminders", headers=user.headers),
+        client.get("/api/dashboard/health-tips", headers=user.headers),
+    )
+    for response in responses:
+        _check(response)
+
+
+async def chat_exchange(client: httpx.AsyncClient, user: BenchUser, rng: random.Random) -> None:
+    payload = {"message": rng.choice(CHAT_PROMPTS), "language": "en"}
+    if user.session_ids:
+        payload["session_id"] = rng.choice(user.session_ids)
+    _check(await client.post("/api/chat/message", json=payload, headers=user.headers))
+
+
+async def document_upload(client: httpx.AsyncClient, user: BenchUser, rng: random.Random) -> None:
+    _check(await client.post(
+        "/api/health/documents/upload",
+        files={"file": ("lab_report.txt", LAB_REPORT, "text/plain")},
+        data={"category": "laboratory", "tags": "bench,lab"},
+        headers=user.headers
+    ))
+
+
+async def analytics(client: httpx.AsyncClient, user: BenchUser, rng: random.Random) -> None:
+    period = rng.choice(["week", "month", "quarter"])
+    responses = await asyncio.gather(
+        client.get(f"/api/analytics/health-trends?period={period}", headers=user.headers),
+        client.get(f"/api/analytics/medication-adherence?period={period}", headers=user.headers),
+    )
+    for response in responses:
+        _check(response)
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, BenchUser, random.Random], Awaitable[None]]] = {
+    "login": login,
+    "dashboard": dashboard_load,
+    "chat": chat_exchange,
+    "document_upload": document_upload,
+    "analytics": analytics,
+}
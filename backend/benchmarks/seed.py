@@ -0,0 +1,157 @@
+"""
+Seed a database with realistic users, metrics, goals, intakes and chat history.
+
+Documents use the same shapes the services write, inserted in bulk so large
+scales seed quickly. Every user shares one password hash (bcrypt is slow) and
+gets a pre-issued access token.
+"""
+from typing import List, Dict, Any
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import random
+
+from utils.auth import get_password_hash, create_access_token
+
+BENCH_PASSWORD = "BenchPass1"
+
+METRIC_UNITS = {
+    "blood_pressure": "mmHg",
+    "blood_sugar": "mg/dL",
+    "heart_rate": "bpm",
+    "weight": "kg",
+}
+CHAT_PROMPTS = [
+    "What does my HbA1c result mean?",
+    "Is 130/85 blood pressure high?",
+    "Suggest a diet for managing diabetes",
+    "How much water should I drink daily?",
+]
+
+
+def _metric_value(metric_type: str, rng: random.Random) -> Dict[str, Any]:
+    if metric_type == "blood_pressure":
+        systolic, diastolic = rng.randint(105, 150), rng.randint(65, 95)
+        return {"value": f"{systolic}/{diastolic}", "systolic": systolic, "diastolic": diastolic}
+    if metric_type == "weight":
+        return {"value": f"{rng.uniform(50, 95):.1f}"}
+    low, high = {"blood_sugar": (80, 180), "heart_rate": (55, 105)}[metric_type]
+    return {"value": str(rng.randint(low, high))}
+
+
+@dataclass
+class SeedScale:
+    users: int = 50
+    metrics_per_user: int = 120
+    goals_per_user: int = 4
+    intakes_per_user: int = 60
+    sessions_per_user: int = 3
+    messages_per_session: int = 10
+
+
+@dataclass
+class BenchUser:
+    user_id: str
+    email: str
+    token: str
+    session_ids: List[str] = field(default_factory=list)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+async def _insert(collection, docs: List[Dict[str, Any]], batch: int = 5000) -> None:
+    for start in range(0, len(docs), batch):
+        await collection.insert_many(docs[start:start + batch], ordered=False)
+
+
+async def seed_database(db, scale: SeedScale, seed: int = 42) -> List[BenchUser]:
+    """Insert seed data for ``scale.users`` users and return their credentials."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = get_password_hash(BENCH_PASSWORD)
+
+    user_docs = [{
+        "name": f"Bench User {i}",
+        "email": f"bench{i}@example.com",
+        "password_hash": password_hash,
+        "language": rng.choice(["en", "hi", "ta"]),
+        "interests": rng.sample(["nutrition", "fitness", "diabetes", "sleep", "yoga"], 2),
+        "health_score": rng.randint(40, 95),
+        "streak": rng.randint(0, 30),
+        "upcoming_appointments": rng.randint(0, 2),
+        "medications_due": rng.randint(0, 3),
+        "email_verified": True,
+        "is_active": True,
+        "created_at": now - timedelta(days=rng.randint(30, 365)),
+        "updated_at": now
+    } for i in range(scale.users)]
+    result = await db.users.insert_many(user_docs)
+    user_ids = [str(inserted_id) for inserted_id in result.inserted_ids]
+
+    metric_types = list(METRIC_UNITS)
+    metrics, goals, intakes, sessions = [], [], [], []
+    for user_id in user_ids:
+        for j in range(scale.metrics_per_user):
+            metric_type = metric_types[j % len(metric_types)]
+            measured_at = now - timedelta(hours=j * 12, minutes=rng.randint(0, 59))
+            metrics.append({
+                "user_id": user_id, "metric_type": metric_type, "unit": METRIC_UNITS[metric_type],
+                **_metric_value(metric_type, rng),
+                "status": rng.choice(["normal", "normal", "normal", "high", "low"]),
+                "notes": None, "measured_at": measured_at, "created_at": measured_at
+            })
+        for j in range(scale.goals_per_user):
+            goals.append({
+                "user_id": user_id, "goal_title": f"Goal {j + 1}", "target_value": "10",
+                "current_value": str(rng.randint(0, 10)), "unit": "km",
+                "progress_percentage": float(rng.randint(0, 100)),
+                "deadline": now + timedelta(days=rng.randint(1, 60)), "category": "fitness",
+                "priority": "medium", "status": rng.choice(["active", "active", "completed"]),
+                "notes": None, "created_at": now - timedelta(days=j), "updated_at": now
+            })
+        for j in range(scale.intakes_per_user):
+            scheduled = now - timedelta(hours=j * 12)
+            taken = rng.random() < 0.8
+            intakes.append({
+                "user_id": user_id, "medication_name": rng.choice(["Metformin", "Amlodipine"]),
+                "scheduled_time": scheduled, "taken_time": scheduled if taken else None,
+                "taken": taken, "missed": not taken, "notes": None, "created_at": scheduled
+            })
+        for j in range(scale.sessions_per_user):
+            sessions.append({
+                "user_id": user_id, "title": f"Chat {j + 1}", "language": "en",
+                "created_at": now - timedelta(days=j), "updated_at": now - timedelta(days=j),
+                "message_count": scale.messages_per_session, "is_active": True
+            })
+
+    await _insert(db.health_metrics, metrics)
+    await _insert(db.health_goals, goals)
+    await _insert(db.medication_intakes, intakes)
+    session_ids: Dict[str, List[str]] = defaultdict(list)
+    if sessions:
+        session_result = await db.chat_sessions.insert_many(sessions)
+        messages = []
+        for session, session_id in zip(sessions, session_result.inserted_ids):
+            session_ids[session["user_id"]].append(str(session_id))
+            for k in range(scale.messages_per_session):
+                is_user = k % 2 == 0
+                messages.append({
+                    "session_id": str(session_id), "user_id": session["user_id"],
+                    "type": "user" if is_user else "ai",
+                    "content": rng.choice(CHAT_PROMPTS) if is_user else "Here is some general guidance. " * 8,
+                    "language": "en", "timestamp": session["created_at"] + timedelta(minutes=k),
+                    "confidence": None if is_user else 0.85, "has_file": False, "file_id": None
+                })
+        await _insert(db.chat_messages, messages)
+
+    return [
+        BenchUser(
+            user_id=user_id,
+            email=doc["email"],
+            token=create_access_token(data={"sub": user_id, "email": doc["email"]}),
+            session_ids=session_ids[user_id]
+        )
+        for user_id, doc in zip(user_ids, user_docs)
+    ]
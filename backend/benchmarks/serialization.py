@@ -0,0 +1,103 @@
+"""
+Rows per second serialized by the list endpoints, before and after the fast path.
+
+Builds projected rows like the ones ``GET /api/health/metrics``,
+``/api/health/documents`` and ``/api/chat/session/{id}`` read, then renders
+a response body three ways: a pydantic model per row passed through
+FastAPI's ``jsonable_encoder`` and ``JSONResponse`` (the previous path),
+plain dict rows through the same encoder, and dict rows rendered directly by
+``FastJSONResponse`` (orjson when installed). No database is needed.
+
+    python -m benchmarks.serialization --rows 10000
+    python -m benchmarks.serialization --rows 50000 --repeat 5
+"""
+from typing import List, Dict, Any, Callable
+from datetime import datetime, timedelta
+from bson import ObjectId # type: ignore
+import argparse
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder # type: ignore
+from fastapi.responses import JSONResponse # type: ignore
+
+from models.chat import ChatSessionMessagesResponse
+from models.health import HealthMetricResponse, MedicalDocumentResponse
+from utils import json_response
+from utils.json_response import FastJSONResponse
+
+
+def build_rows(count: int, seed: int = 7) -> Dict[str, List[Dict[str, Any]]]:
+    """Rows in each endpoint's response shape."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    metrics = [{
+        "date": (start + timedelta(minutes=i)).isoformat(), "type": "Heart Rate", "value": str(rng.randint(55, 110)),
+        "unit": "bpm", "status": "Normal", "notes": None
+    } for i in range(count)]
+    documents = []
+    for i in range(count):
+        doc_id = str(ObjectId())
+        documents.append({
+            "id": doc_id, "name": f"lab_report_{i}.pdf", "type": "application/pdf",
+            "date": (start + timedelta(days=i % 365)).isoformat(), "size": f"{rng.randint(80, 900)} KB",
+            "category": "Lab Report", "tags": ["blood work", "quarterly"], "status": "Analyzed",
+            "url": f"/api/health/documents/{doc_id}/download"
+        })
+    messages = [{
+        "id": str(ObjectId()), "type": "user" if i % 2 == 0 else "assistant",
+        "content": "How should I adjust my diet given my latest HbA1c result of 6.8%? " * 3,
+        "timestamp": (start + timedelta(seconds=30 * i)).isoformat(), "language": "en", "has_file": False
+    } for i in range(count)]
+    return {"metrics": metrics, "documents": documents, "messages": messages}
+
+
+def via_models(model) -> Callable[[List[Dict[str, Any]]], bytes]:
+    def render(rows: List[Dict[str, Any]]) -> bytes:
+        data = [model(**row) for row in rows]
+        return JSONResponse(jsonable_encoder({"data": data, "success": True})).body
+    return render
+
+
+def via_encoder(rows: List[Dict[str, Any]]) -> bytes:
+    return JSONResponse(jsonable_encoder({"data": rows, "success": True})).body
+
+
+def via_fast_response(rows: List[Dict[str, Any]]) -> bytes:
+    return FastJSONResponse({"data": rows, "success": True}).body
+
+
+def measure(render: Callable[[List[Dict[str, Any]]], bytes], rows: List[Dict[str, Any]], repeat: int) -> Dict[str, float]:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(render(rows))
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {"ms": best * 1000, "rows_per_s": len(rows) / best, "kb": size / 1024}
+
+
+def main(args) -> None:
+    rows = build_rows(args.rows, args.seed)
+    models = {"metrics": HealthMetricResponse, "documents": MedicalDocumentResponse, "messages": ChatSessionMessagesResponse}
+    encoder = "orjson" if json_response.orjson is not None else "json (orjson not installed)"
+    print(f"{args.rows:,} rows per endpoint, best of {args.repeat}; FastJSONResponse encoder: {encoder}\n")
+    print(f"{'endpoint':<12}{'path':<26}{'ms':>10}{'rows/s':>14}{'KB':>10}")
+    for endpoint, endpoint_rows in rows.items():
+        paths = [
+            ("model + jsonable_encoder", via_models(models[endpoint])),
+            ("dict + jsonable_encoder", via_encoder),
+            ("dict + FastJSONResponse", via_fast_response),
+        ]
+        for label, render in paths:
+            result = measure(render, endpoint_rows, args.repeat)
+            print(f"{endpoint:<12}{label:<26}{result['ms']:>10.1f}{result['rows_per_s']:>14,.0f}{result['kb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
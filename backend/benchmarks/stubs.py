@@ -0,0 +1,314 @@
+"""
+Local stand-ins for the OpenAI and Sarvam APIs.
+
+Each stub is a small FastAPI app served by uvicorn, so the services talk to it
+over real HTTP exactly as they would in production. Latency is drawn from a
+configurable distribution, and a seeded fraction of requests can fail with
+500s or 429s; an optional requests-per-minute limit returns 429 with
+``Retry-After`` once exceeded, like the real providers.
+
+Run standalone and point the app at it with the base URL settings:
+
+    python -m benchmarks.stubs --openai-port 8100 --sarvam-port 8200 \\
+        --latency lognormal:400,0.6 --error-rate 0.01 --rate-limit-rate 0.02 --rpm 120
+
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 SARVAM_BASE_URL=http://127.0.0.1:8200 python main.py
+"""
+from typing import Optional, List, Dict, Any
+from collections import deque
+from dataclasses import dataclass, field
+import asyncio
+import base64
+import json
+import math
+import random
+import socket
+import threading
+import time
+
+from fastapi import FastAPI, Request # type: ignore
+from fastapi.responses import JSONResponse, StreamingResponse # type: ignore
+import uvicorn # type: ignore
+
+STUB_REPLY = (
+    "Based on your readings your blood sugar is within the normal range. "
+    "Keep up regular exercise, stay hydrated and consult your doctor if symptoms persist."
+)
+
+
+class LatencyDistribution:
+    """
+    Response delay in milliseconds.
+
+    Specs: ``fixed:50``, ``uniform:20,80``, ``normal:100,20`` (mean, stddev),
+    ``lognormal:100,0.5`` (median, sigma) and ``exponential:100`` (mean).
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+    def __init__(self, kind: str = "fixed", params: Optional[List[float]] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Latency distribution must be one of: {', '.join(self.KINDS)}")
+        self.kind = kind
+        self.params = params or [0.0]
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, raw = spec.partition(":")
+        params = [float(p) for p in raw.split(",") if p] if raw else None
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(p[0]), p[1])
+        else:
+            value = rng.expovariate(1 / p[0])
+        return max(0.0, value)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(str(p) for p in self.params)}"
+
+
+@dataclass
+class StubBehavior:
+    latency: LatencyDistribution = field(default_factory=lambda: LatencyDistribution("fixed", [50.0]))
+    error_rate: float = 0.0  # fraction of requests answered with 500
+    rate_limit_rate: float = 0.0  # fraction answered with 429 regardless of load
+    rpm_limit: Optional[int] = None  # sliding-window requests per minute before 429s
+    retry_after_seconds: float = 1.0
+    stream_chunk_ms: float = 5.0  # delay between streamed chunks
+    seed: int = 0
+
+
+class StubState:
+    """Seeded randomness, rate-limit window and counters shared by a stub's endpoints."""
+
+    def __init__(self, behavior: StubBehavior):
+        self.behavior = behavior
+        self.rng = random.Random(behavior.seed)
+        self._window: deque = deque()
+        self.counts: Dict[str, int] = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+
+    def _over_rpm(self) -> bool:
+        if not self.behavior.rpm_limit:
+            return False
+        now = time.monotonic()
+        while self._window and now - self._window[0] > 60:
+            self._window.popleft()
+        if len(self._window) >= self.behavior.rpm_limit:
+            return True
+        self._window.append(now)
+        return False
+
+    async def begin(self) -> Optional[JSONResponse]:
+        """Apply latency and failure injection; returns an error response or None."""
+        self.counts["requests"] += 1
+        if self._over_rpm() or self.rng.random() < self.behavior.rate_limit_rate:
+            self.counts["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(self.behavior.retry_after_seconds)},
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+            )
+
+        await asyncio.sleep(self.behavior.latency.sample(self.rng) / 1000)
+
+        if self.rng.random() < self.behavior.error_rate:
+            self.counts["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Stub server error", "type": "server_error", "code": None}}
+            )
+        self.counts["ok"] += 1
+        return None
+
+
+def _add_stats_route(app: FastAPI, state: StubState) -> None:
+    @app.get("/_stub/stats")
+    async def stats():
+        return {**state.counts, "latency": repr(state.behavior.latency)}
+
+
+def create_openai_stub(behavior: Optional[StubBehavior] = None) -> FastAPI:
+    """OpenAI-compatible chat completions endpoint, including SSE streaming."""
+    state = StubState(behavior or StubBehavior())
+    app = FastAPI()
+    _add_stats_route(app, state)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = await state.begin()
+        if failure is not None:
+            return failure
+
+        model = body.get("model", "gpt-4")
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        completion_tokens = len(STUB_REPLY) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        created = int(time.time())
+
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": STUB_REPLY},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def events():
+            def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra) -> str:
+                payload = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+                    **extra
+                }
+                return f"data: {json.dumps(payload)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for word in STUB_REPLY.split(" "):
+                await asyncio.sleep(state.behavior.stream_chunk_ms / 1000)
+                yield chunk({"content": word + " "})
+            yield chunk({}, "stop")
+            if include_usage:
+                yield chunk(None, usage=usage) # type: ignore
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def create_sarvam_stub(behavior: Optional[StubBehavior] = None) -> FastAPI:
+    """Sarvam-compatible STT, TTS, translate and language detection endpoints."""
+    state = StubState(behavior or StubBehavior())
+    app = FastAPI()
+    _add_stats_route(app, state)
+    silent_wav = base64.b64encode(b"RIFF" + b"\x00" * 40).decode("ascii")
+
+    @app.post("/speech-to-text")
+    async def speech_to_text():
+        failure = await state.begin()
+        return failure or {"transcript": "what should my blood sugar be", "language_code": "en-IN"}
+
+    @app.post("/text-to-speech")
+    async def text_to_speech():
+        failure = await state.begin()
+        return failure or {"audios": [silent_wav]}
+
+    @app.post("/translate")
+    async def translate(request: Request):
+        body = await request.json()
+        failure = await state.begin()
+        return failure or {"translated_text": body.get("input", ""), "source_language_code": "en-IN"}
+
+    @app.post("/text-lid")
+    async def text_lid():
+        failure = await state.begin()
+        return failure or {"language_code": "en-IN", "script_code": "Latn"}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubServer:
+    """Run an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None):
+        self.port = port or _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stub server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def add_behavior_arguments(parser, prefix: str = "") -> None:
+    """Add the stub behaviour flags to an argparse parser."""
+    parser.add_argument(f"--{prefix}latency", default="fixed:50", help="Latency distribution, e.g. lognormal:400,0.6")
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument(f"--{prefix}rate-limit-rate", type=float, default=0.0, help="Fraction of random 429 responses")
+    parser.add_argument(f"--{prefix}rpm", type=int, default=None, help="Requests per minute before 429s")
+
+
+def behavior_from_args(args, prefix: str = "", seed: int = 0) -> StubBehavior:
+    key = prefix.replace("-", "_")
+    return StubBehavior(
+        latency=LatencyDistribution.parse(getattr(args, f"{key}latency")),
+        error_rate=getattr(args, f"{key}error_rate"),
+        rate_limit_rate=getattr(args, f"{key}rate_limit_rate"),
+        rpm_limit=getattr(args, f"{key}rpm"),
+        seed=seed
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run OpenAI- and Sarvam-compatible stub servers")
+    parser.add_argument("--openai-port", type=int, default=8100)
+    parser.add_argument("--sarvam-port", type=int, default=8200)
+    parser.add_argument("--seed", type=int, default=0)
+    add_behavior_arguments(parser)
+    cli_args = parser.parse_args()
+    stub_behavior = behavior_from_args(cli_args, seed=cli_args.seed)
+
+    openai_server = StubServer(create_openai_stub(stub_behavior), cli_args.openai_port).start()
+    sarvam_server = StubServer(create_sarvam_stub(stub_behavior), cli_args.sarvam_port).start()
+    print(f"OPENAI_BASE_URL={openai_server.url}/v1")
+    print(f"SARVAM_BASE_URL={sarvam_server.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        openai_server.stop()
+        sarvam_server.stop()
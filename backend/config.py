@@ -11,12 +11,37 @@ class Settings(BaseSettings):
     # Database
     mongodb_url: str
     database_name: str = "swasthwrap"
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 0
+    mongodb_max_idle_time_ms: Optional[int] = None
+    mongodb_wait_queue_timeout_ms: Optional[int] = None
+    mongodb_server_selection_timeout_ms: int = 30000
+    mongodb_compressors: Optional[str] = None  # e.g. "zstd,snappy"
+    mongodb_read_preference: str = "primary"
+    # Read preference for read-only analytics/dashboard queries, e.g. "secondaryPreferred"
+    mongodb_analytics_read_preference: Optional[str] = None
     
     # OpenAI
     openai_api_key: str
+    openai_base_url: Optional[str] = None  # OpenAI-compatible endpoint, e.g. a local stub
+    # Model per task; bulk chunk summaries and titles default to a cheaper, faster model
+    openai_chat_model: str = "gpt-4"
+    openai_chunk_map_model: str = "gpt-4o-mini"
+    openai_reduce_model: str = "gpt-4"
+    openai_health_insights_model: str = "gpt-4"
+    openai_title_model: str = "gpt-4o-mini"
+    openai_fallback_model: Optional[str] = "gpt-4o-mini"  # tried when a task's model keeps failing
+    # Client-side limits per process; split the account limits across workers
+    openai_requests_per_minute: int = 500
+    openai_tokens_per_minute: int = 30000
+    openai_max_queue_wait_seconds: float = 30.0
+    openai_max_retries: int = 4
+    openai_retry_base_delay: float = 0.5
+    openai_retry_max_delay: float = 20.0
     
     # Sarvam AI
     sarvam_api_key: str
+    sarvam_base_url: str = "https://api.sarvam.ai"
     
     # JWT
     secret_key: str = "your_secret_key_here_change_this_in_production"
@@ -28,7 +53,83 @@ class Settings(BaseSettings):
     api_port: int = 8000
     debug: bool = True
     backend_url: str = "http://localhost:8000"
-    
+
+    # Analytics cache
+    analytics_cache_enabled: bool = True
+    analytics_cache_ttl_seconds: int = 300
+    analytics_cache_max_entries: int = 2048
+
+    # Health score pipeline
+    health_score_debounce_seconds: float = 5.0
+    health_score_window_days: int = 30
+
+    # Activity feed log: written in batches, expired by a TTL index and capped per user
+    activity_log_flush_seconds: float = 1.0
+    activity_log_batch_size: int = 500
+    activity_log_retention_days: int = 90
+    activity_log_max_per_user: int = 200
+
+    # Background jobs (document analysis)
+    job_workers: int = 2  # concurrent jobs per app worker
+    job_poll_interval_seconds: float = 2.0
+    job_lease_seconds: int = 300  # a job whose worker stops renewing this is picked up again
+    job_max_attempts: int = 2
+
+    # Health metric storage: "collection", or "timeseries" for a MongoDB 5.0+ time-series
+    # collection (copy existing data with `python -m scripts.migrate_metrics_timeseries`)
+    metrics_storage: str = "collection"
+    metrics_timeseries_collection: str = "health_metrics_ts"
+    metrics_timeseries_granularity: str = "hours"  # "minutes" for per-minute device data
+
+    # Batch metric ingestion (device sync)
+    metrics_batch_max_rows: int = 100000  # per request
+    metrics_batch_write_size: int = 1000  # readings per bulk write
+
+    # Health record export (NDJSON); records read and written per batch
+    export_batch_size: int = 1000
+
+    # Document extraction; text past this many characters (~100k tokens) is not read
+    document_max_chars: int = 400000
+
+    # Local OCR for scanned PDFs and images; needs pytesseract and the tesseract binary
+    ocr_workers: int = 2  # concurrent tesseract processes
+    ocr_dpi: int = 300
+    ocr_lang: str = "eng"
+    ocr_max_pages: int = 50  # per document
+    ocr_cache_ttl_days: int = 30
+
+    # Store lab values found in analyzed health documents as health metrics
+    lab_extraction_enabled: bool = True
+
+    # Document chunking
+    document_chunk_tokens: int = 1000
+    document_chunk_overlap_tokens: int = 100
+
+    # Document retrieval
+    retrieval_top_k: int = 4  # chunks sent to the LLM for a question about a document
+    retrieval_embedding_model: Optional[str] = None  # e.g. "all-MiniLM-L6-v2"; needs sentence-transformers
+    # Document memory for follow-up chat messages in a session
+    session_memory_max_documents: int = 5
+    session_memory_chunks_per_document: int = 2
+    session_memory_max_chars: int = 6000
+
+    # Response compression and conditional GET (brotli needs the brotli package)
+    compression_enabled: bool = True
+    compression_min_bytes: int = 1024  # smaller bodies are sent as is
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4  # on the fly; precompressed variants use 11
+    static_precompress: bool = True  # write .br/.gz variants of saved text documents and WAV audio
+    etag_enabled: bool = True
+
+    # Metrics
+    metrics_enabled: bool = True
+    event_loop_lag_interval_seconds: float = 0.5
+
+    # Tracing
+    tracing_enabled: bool = True
+    tracing_export_path: Optional[str] = None  # JSON lines file, e.g. "logs/traces.jsonl"
+    tracing_waterfall: bool = False  # log a per-request waterfall (debug mode only)
+
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8"
@@ -48,6 +149,14 @@ class Settings(BaseSettings):
             raise ValueError("SARVAM_API_KEY must be set in environment variables")
         return v
     
+    @field_validator('mongodb_read_preference', 'mongodb_analytics_read_preference')
+    @classmethod
+    def validate_read_preference(cls, v):
+        valid = ["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"]
+        if v is not None and v not in valid:
+            raise ValueError(f"Read preference must be one of: {', '.join(valid)}")
+        return v
+    
     @field_validator('mongodb_url')
     @classmethod
     def validate_mongodb_url(cls, v):
@@ -0,0 +1,6 @@
+import os
+
+# Settings are read at import time; unit tests don't connect to anything
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SARVAM_API_KEY", "test")
@@ -1,14 +1,32 @@
-from fastapi import HTTPException, status # type: ignore
+from fastapi import HTTPException, status, Response # type: ignore
 from typing import Optional, List
 from services.analytics_service import AnalyticsService
 from models.dashboard import AnalyticsPeriod
+from utils.compression import unencoded_etag
+from utils.tracing import traced_class
 
 
+def _matching_etag(if_none_match: Optional[str], etag: Optional[str]) -> Optional[str]:
+    """The If-None-Match entry naming the current version, if any."""
+    if not if_none_match or not etag:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        # Compressed responses were sent as "<etag>-gzip" (or -br); those are this version too
+        if unencoded_etag(tag.removeprefix("W/")) == etag:
+            return tag
+    return None
+
+
+@traced_class
 class AnalyticsController:
     def __init__(self):
         self.analytics_service = AnalyticsService()
 
-    async def get_health_trends(self, user_id: str, period: str = "month", metrics: Optional[List[str]] = None):
+    async def get_health_trends(self, user_id: str, period: str = "month", metrics: Optional[List[str]] = None,
+                                if_none_match: Optional[str] = None, response: Optional[Response] = None):
         """Get health trends and analytics data"""
         try:
             # Validate and convert period to enum
@@ -21,7 +39,16 @@ class AnalyticsController:
 
             # Convert string to enum
             period_enum = AnalyticsPeriod(period)
+
+            # Short-circuit with 304 if the client already has this version
+            etag = await self.analytics_service.get_cache_etag(user_id, "health_trends", period_enum, metrics)
+            matched = _matching_etag(if_none_match, etag)
+            if matched:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self._cache_headers(matched))
+
             trends = await self.analytics_service.get_health_trends(user_id, period_enum, metrics)
+            if response is not None and etag:
+                response.headers.update(self._cache_headers(etag))
             return {
                 "data": trends,
                 "success": True
@@ -34,7 +61,8 @@ class AnalyticsController:
                 detail=f"Failed to get health trends: {str(e)}"
             )
 
-    async def get_medication_adherence(self, user_id: str, period: str = "month"):
+    async def get_medication_adherence(self, user_id: str, period: str = "month",
+                                       if_none_match: Optional[str] = None, response: Optional[Response] = None):
         """Get medication adherence statistics"""
         try:
             # Validate and convert period to enum
@@ -47,7 +75,16 @@ class AnalyticsController:
 
             # Convert string to enum
             period_enum = AnalyticsPeriod(period)
+
+            # Short-circuit with 304 if the client already has this version
+            etag = await self.analytics_service.get_cache_etag(user_id, "medication_adherence", period_enum)
+            matched = _matching_etag(if_none_match, etag)
+            if matched:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self._cache_headers(matched))
+
             adherence = await self.analytics_service.get_medication_adherence(user_id, period_enum)
+            if response is not None and etag:
+                response.headers.update(self._cache_headers(etag))
             return {
                 "data": adherence,
                 "success": True
@@ -59,3 +96,12 @@ class AnalyticsController:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to get medication adherence: {str(e)}"
             )
+
+    def _cache_headers(self, etag: str) -> dict:
+        """Validator headers for per-user analytics responses."""
+        return {
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
+            # Compressed bodies have their own ETag, so a 304 must say which representation it is for
+            "Vary": "Accept-Encoding"
+        }
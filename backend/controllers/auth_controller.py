@@ -10,10 +10,12 @@ from models.user import (
 from services.user_service import user_service
 from middlewares.auth import get_current_user
 from utils.auth import validate_password_strength
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
 
+@traced_class
 class AuthController:
     
     async def register(self, user_data: UserRegistration) -> dict:
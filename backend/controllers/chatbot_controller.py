@@ -1,29 +1,37 @@
 from fastapi import HTTPException, UploadFile, Depends, Form # type: ignore
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
+import asyncio
 import base64
 import logging
 
 from models.chat import (
     SendMessageRequest, SendMessageResponse,
-    ChatHistoryResponse, ChatSessionMessagesResponse,
+    ChatHistoryResponse,
     VoiceToTextRequest, VoiceToTextResponse,
     TextToSpeechRequest, TextToSpeechResponse,
     NewSessionRequest, NewSessionResponse, GreetingMessage,
     UploadDocumentResponse, MessageTypeEnum
 )
 from services.openai_service import openai_service
+from services.openai_scheduler import OpenAIUnavailableError
+from services.job_service import job_service
+from models.job import Job, JobTypeEnum, JobStatusResponse
 from services.sarvam_service import sarvam_service
 from services.chat_service import chat_service
 from services.file_service import file_service
 from middlewares.auth import get_current_user
 from models.user import User
+from utils.json_response import FastJSONResponse
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
 
+@traced_class
 class ChatbotController:
     def __init__(self):
-        pass
+        # Title refinements running after their response was sent; referenced so they aren't collected
+        self._title_tasks: Set[asyncio.Task] = set()
     
     async def send_message(
         self,
@@ -53,6 +61,9 @@ class ChatbotController:
                 language=request.language.value
             )
             
+            # Excerpts from documents analyzed earlier in this session (before this turn's uploads)
+            document_context = await chat_service.get_document_context(session_id, user_id, request.message)
+            
             # Process any uploaded files
             file_context = ""
             if request.files:
@@ -65,7 +76,7 @@ class ChatbotController:
                     )
                     
                     # Save document metadata
-                    await chat_service.save_document(
+                    doc_id = await chat_service.save_document(
                         user_id=user_id,
                         file_name=file_data.name,
                         file_size=file_size,
@@ -80,6 +91,10 @@ class ChatbotController:
                         doc_result = await document_service.process_document_for_chat(file_path)
                         
                         if doc_result["success"]:
+                            # Keep the chunks so later messages in this session can draw on them
+                            await chat_service.remember_document(
+                                doc_id, user_id, session_id, file_data.name, doc_result["chunks"]
+                            )
                             # Use the document text as additional context
                             if len(doc_result["text"]) > 2000:  # Large document
                                 # Create a summary for context
@@ -99,6 +114,11 @@ class ChatbotController:
             
             # Build conversation history for OpenAI
             messages = []
+            if document_context:
+                messages.append({
+                    "role": "system",
+                    "content": f"Documents the user shared earlier in this conversation:\n{document_context}"
+                })
             for msg in recent_messages[-5:]:  # Last 5 messages for context
                 role = "user" if msg.type == MessageTypeEnum.USER else "assistant"
                 messages.append({"role": role, "content": msg.content})
@@ -123,10 +143,10 @@ class ChatbotController:
                 confidence=ai_response["confidence"]
             )
             
-            # Update session title if it's the first exchange
+            # Title the session on the first exchange: a quick one now, a model-written one later
             if session.message_count == 0:
-                title = await self._generate_session_title(request.message)
-                await chat_service.update_session_title(session_id, user_id, title)
+                await chat_service.update_session_title(session_id, user_id, self._heuristic_title(request.message))
+                self._refine_session_title_later(session_id, user_id, request.message, request.language.value)
             
             return {
                 "data": SendMessageResponse(
@@ -137,6 +157,9 @@ class ChatbotController:
                 "success": True
             }
             
+        except OpenAIUnavailableError as e:
+            logger.warning(f"AI service unavailable in send_message: {e}")
+            raise self._unavailable(e)
         except Exception as e:
             logger.error(f"Error in send_message: {e}")
             raise HTTPException(status_code=500, detail="Failed to process message")
@@ -189,23 +212,12 @@ class ChatbotController:
             if not session:
                 raise HTTPException(status_code=404, detail="Session not found")
             
-            messages = await chat_service.get_session_messages(session_id, user_id)
-            
-            messages_data = []
-            for message in messages:
-                messages_data.append(ChatSessionMessagesResponse(
-                    id=str(message.id),
-                    type=message.type.value,
-                    content=message.content,
-                    timestamp=message.timestamp.isoformat(),
-                    language=message.language.value,
-                    has_file=message.has_file
-                ))
+            messages_data = await chat_service.get_session_message_rows(session_id, user_id)
             
-            return {
+            return FastJSONResponse({
                 "data": messages_data,
                 "success": True
-            }
+            })
             
         except Exception as e:
             logger.error(f"Error in get_session_messages: {e}")
@@ -434,9 +446,10 @@ class ChatbotController:
         session_id: Optional[str] = Form(None),
         query: Optional[str] = Form(None),
         language: str = Form("en"),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        background: bool = False
     ) -> Dict[str, Any]:
-        """Upload and analyze a document with AI"""
+        """Upload and analyze a document with AI; ``background`` queues the analysis as a job"""
         try:
             # Validate file type
             if not file_service.is_valid_document_file(file.filename):
@@ -468,13 +481,37 @@ class ChatbotController:
                     language=language
                 )
             
+            if background:
+                # Show the upload in the session now; the job adds the analysis when it finishes
+                user_message_id = await chat_service.add_document_upload_message(
+                    session_id, str(current_user.id), file_path, query, language
+                )
+                job_id = await job_service.enqueue(
+                    user_id=str(current_user.id),
+                    job_type=JobTypeEnum.DOCUMENT_ANALYSIS,
+                    payload={
+                        "user_id": str(current_user.id),
+                        "session_id": session_id,
+                        "file_path": file_path,
+                        "query": query,
+                        "language": language,
+                        "document_id": doc_id,
+                        "file_name": file.filename,
+                        "file_url": file_service.get_file_url(file_path),
+                        "user_message_id": user_message_id
+                    }
+                )
+                return self._job_queued_response(job_id, doc_id, session_id, file_service.get_file_url(file_path))
+            
             # Process document with AI
             result = await chat_service.process_document_message(
                 session_id=session_id,
                 user_id=str(current_user.id),
                 file_path=file_path,
                 user_query=query,
-                language=language
+                language=language,
+                document_id=doc_id,
+                original_name=file.filename
             )
             
             if result["success"]:
@@ -494,6 +531,9 @@ class ChatbotController:
                 
         except HTTPException:
             raise
+        except OpenAIUnavailableError as e:
+            logger.warning(f"AI service unavailable in upload_and_analyze_document: {e}")
+            raise self._unavailable(e)
         except Exception as e:
             logger.error(f"Error in upload_and_analyze_document: {e}")
             raise HTTPException(status_code=500, detail="Failed to process document")
@@ -503,9 +543,10 @@ class ChatbotController:
         file: UploadFile,
         session_id: Optional[str] = Form(None),
         language: str = Form("en"),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        background: bool = False
     ) -> Dict[str, Any]:
-        """Upload and analyze a health/medical document"""
+        """Upload and analyze a health/medical document; ``background`` queues the analysis as a job"""
         try:
             # Validate file type
             if not file_service.is_valid_document_file(file.filename):
@@ -537,12 +578,30 @@ class ChatbotController:
                     language=language
                 )
             
+            if background:
+                job_id = await job_service.enqueue(
+                    user_id=str(current_user.id),
+                    job_type=JobTypeEnum.HEALTH_DOCUMENT_ANALYSIS,
+                    payload={
+                        "user_id": str(current_user.id),
+                        "session_id": session_id,
+                        "file_path": file_path,
+                        "language": language,
+                        "document_id": doc_id,
+                        "file_name": file.filename,
+                        "file_url": file_service.get_file_url(file_path)
+                    }
+                )
+                return self._job_queued_response(job_id, doc_id, session_id, file_service.get_file_url(file_path))
+            
             # Get health-specific analysis
             result = await chat_service.get_health_document_analysis(
                 session_id=session_id,
                 user_id=str(current_user.id),
                 file_path=file_path,
-                language=language
+                language=language,
+                document_id=doc_id,
+                original_name=file.filename
             )
             
             if result["success"]:
@@ -552,6 +611,7 @@ class ChatbotController:
                         "session_id": session_id,
                         "health_analysis": result["analysis"],
                         "confidence": result["confidence"],
+                        "metrics_recorded": result["metrics_recorded"],
                         "document_info": result["document_info"],
                         "file_url": file_service.get_file_url(file_path)
                     },
@@ -562,11 +622,108 @@ class ChatbotController:
                 
         except HTTPException:
             raise
+        except OpenAIUnavailableError as e:
+            logger.warning(f"AI service unavailable in analyze_health_document: {e}")
+            raise self._unavailable(e)
         except Exception as e:
             logger.error(f"Error in analyze_health_document: {e}")
             raise HTTPException(status_code=500, detail="Failed to process health document")
 
-    async def _generate_session_title(self, first_message: str) -> str:
+    async def get_job_status(
+        self,
+        job_id: str,
+        current_user: User = Depends(get_current_user)
+    ) -> Dict[str, Any]:
+        """Get status and progress of a background document analysis job"""
+        try:
+            job = await job_service.get_job(job_id, str(current_user.id))
+            if not job:
+                raise HTTPException(status_code=404, detail="Job not found")
+            
+            return {
+                "data": self._job_status(job),
+                "success": True
+            }
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error in get_job_status: {e}")
+            raise HTTPException(status_code=500, detail="Failed to get job status")
+
+    async def list_jobs(
+        self,
+        limit: int = 20,
+        current_user: User = Depends(get_current_user)
+    ) -> Dict[str, Any]:
+        """List the user's recent background jobs"""
+        try:
+            jobs = await job_service.list_jobs(str(current_user.id), limit)
+            
+            return {
+                "data": [self._job_status(job) for job in jobs],
+                "success": True
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in list_jobs: {e}")
+            raise HTTPException(status_code=500, detail="Failed to list jobs")
+
+    def _job_status(self, job: Job) -> JobStatusResponse:
+        return JobStatusResponse(
+            job_id=job.id,
+            type=job.type.value,
+            status=job.status.value,
+            progress=job.progress,
+            stage=job.stage,
+            session_id=job.payload.get("session_id"),
+            result=job.result,
+            error=job.error,
+            attempts=job.attempts,
+            created_at=job.created_at.isoformat(),
+            started_at=job.started_at.isoformat() if job.started_at else None,
+            finished_at=job.finished_at.isoformat() if job.finished_at else None
+        )
+
+    def _job_queued_response(self, job_id: str, doc_id: str, session_id: str, file_url: str) -> Dict[str, Any]:
+        return {
+            "data": {
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/chat/jobs/{job_id}",
+                "document_id": doc_id,
+                "session_id": session_id,
+                "file_url": file_url
+            },
+            "success": True
+        }
+
+    def _unavailable(self, error: OpenAIUnavailableError) -> HTTPException:
+        """503 telling the client when to retry once the AI provider is saturated"""
+        return HTTPException(
+            status_code=503,
+            detail="AI service is busy, please try again shortly",
+            headers={"Retry-After": str(max(1, round(error.retry_after)))}
+        )
+
+    def _refine_session_title_later(self, session_id: str, user_id: str, first_message: str, language: str) -> None:
+        """Replace the heuristic title with a model-written one without holding up the response"""
+        task = asyncio.create_task(self._refine_session_title(session_id, user_id, first_message, language))
+        self._title_tasks.add(task)
+        task.add_done_callback(self._title_tasks.discard)
+
+    async def _refine_session_title(self, session_id: str, user_id: str, first_message: str, language: str) -> None:
+        try:
+            title = await openai_service.generate_session_title(first_message, language)
+            if title:
+                await chat_service.update_session_title(
+                    session_id, user_id, title[:50] + "..." if len(title) > 50 else title
+                )
+        except Exception as e:
+            # The heuristic title stays
+            logger.warning(f"Could not generate a session title: {e}")
+
+    def _heuristic_title(self, first_message: str) -> str:
         """Generate a session title based on the first message"""
         try:
             # Simple title generation - take first few words
@@ -3,8 +3,10 @@ from typing import Optional, List
 from services.dashboard_service import DashboardService
 from services.analytics_service import AnalyticsService
 from models.dashboard import ActivityType
+from utils.tracing import traced_class
 
 
+@traced_class
 class DashboardController:
     def __init__(self):
         self.dashboard_service = DashboardService()
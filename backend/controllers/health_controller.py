@@ -1,19 +1,31 @@
-from fastapi import HTTPException, status, Depends, UploadFile, File, Form, Query # type: ignore
-from typing import Optional, List
+from fastapi import HTTPException, status, Depends, UploadFile, File, Form, Query, Request # type: ignore
+from fastapi.responses import StreamingResponse, FileResponse # type: ignore
+from pydantic import ValidationError
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from datetime import date
+import json
 import logging
+import os
 
 from models.health import (
     MedicalConditionCreate, MedicalConditionUpdate,
-    HealthMetricCreate, HealthGoalCreate, HealthGoalProgressUpdate,
+    HealthMetricCreate, HealthMetricReading, HealthGoalCreate, HealthGoalProgressUpdate,
     MedicalDocumentUpload, DocumentCategory
 )
 from services.health_service import health_service
+from services.export_service import export_service, decode_cursor, InvalidExportCursor
+from config import settings
 from middlewares.auth import get_current_user
+from utils.json_response import FastJSONResponse
+from utils.static_files import file_etag
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
+MAX_REPORTED_ERRORS = 50
 
+
+@traced_class
 class HealthController:
 
     # Medical Conditions
@@ -95,17 +107,19 @@ class HealthController:
         metric_type: Optional[str] = Query(None),
         date_from: Optional[date] = Query(None),
         date_to: Optional[date] = Query(None),
-        current_user: str = Depends(get_current_user)
+        current_user: str = Depends(get_current_user),
+        max_points: Optional[int] = None,
+        downsample: str = "avg"
     ) -> dict:
         """Get user's health metrics."""
         try:
             metrics = await health_service.get_health_metrics(
-                current_user, metric_type, date_from, date_to
+                current_user, metric_type, date_from, date_to, max_points, downsample
             )
-            return {
-                "data": [metric.dict() for metric in metrics],
+            return FastJSONResponse({
+                "data": metrics,
                 "success": True
-            }
+            })
         except Exception as e:
             logger.error(f"Error getting health metrics: {e}")
             raise HTTPException(
@@ -141,6 +155,118 @@ class HealthController:
                 detail="Internal server error"
             )
 
+    async def ingest_health_metrics(self, request: Request, current_user: str) -> dict:
+        """
+        Add many readings at once, as a JSON array or streamed NDJSON (one reading per line).
+
+        Rows are validated individually; invalid rows are reported and skipped,
+        and readings already stored for the same type, time and device are ignored.
+        A JSON array over ``metrics_batch_max_rows`` is rejected with 413; an NDJSON
+        stream is read up to that many rows and the response is marked ``truncated``.
+        """
+        report: Dict[str, Any] = {"received": 0, "rejected": 0, "errors": [], "truncated": False}
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        if content_type in ("application/x-ndjson", "application/jsonl", "application/json-seq"):
+            rows = self._iter_ndjson(request)
+        elif content_type == "application/json":
+            rows = self._iter_json_array(request)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Send a JSON array (application/json) or NDJSON (application/x-ndjson)"
+            )
+
+        try:
+            counts = await health_service.ingest_health_metrics(current_user, self._validated_batches(rows, report))
+            return {
+                "data": {
+                    "received": report["received"],
+                    "inserted": counts["inserted"],
+                    "duplicates": counts["duplicates"],
+                    "rejected": report["rejected"],
+                    "errors": report["errors"],
+                    "truncated": report["truncated"]
+                },
+                "success": True,
+                "message": f"{counts['inserted']} health metric(s) added" + (
+                    f"; stopped after {settings.metrics_batch_max_rows} readings" if report["truncated"] else ""
+                )
+            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error ingesting health metrics: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Internal server error"
+            )
+
+    async def _validated_batches(
+        self,
+        rows: AsyncIterator[Tuple[int, Any]],
+        report: Dict[str, Any]
+    ) -> AsyncIterator[List[HealthMetricReading]]:
+        batch: List[HealthMetricReading] = []
+        async for row_number, row in rows:
+            if report["received"] >= settings.metrics_batch_max_rows:
+                # Earlier batches are already stored, so stop reading and report it instead of failing
+                report["truncated"] = True
+                break
+            report["received"] += 1
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append(HealthMetricReading.model_validate(row))
+            except (ValidationError, ValueError) as e:
+                report["rejected"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    message = "; ".join(
+                        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()[:3]
+                    ) if isinstance(e, ValidationError) else str(e)
+                    report["errors"].append({"row": row_number, "error": message})
+                continue
+            if len(batch) >= settings.metrics_batch_write_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def _iter_json_array(self, request: Request) -> AsyncIterator[Tuple[int, Any]]:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not valid JSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of readings")
+        if len(rows) > settings.metrics_batch_max_rows:
+            # The whole array is parsed already, so reject it before anything is written
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.metrics_batch_max_rows} readings per request"
+            )
+        for row_number, row in enumerate(rows, start=1):
+            yield row_number, row
+
+    async def _iter_ndjson(self, request: Request) -> AsyncIterator[Tuple[int, Any]]:
+        """Parse lines as they arrive so memory stays bounded by the write batch, not the upload."""
+        pending = b""
+        row_number = 0
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                row_number += 1
+                if line.strip():
+                    yield row_number, self._parse_line(line)
+        if pending.strip():
+            yield row_number + 1, self._parse_line(pending)
+
+    def _parse_line(self, line: bytes) -> Any:
+        try:
+            return json.loads(line)
+        except ValueError:
+            return ValueError("Line is not valid JSON")
+
     # Health Goals
     async def get_health_goals(self, current_user: str = Depends(get_current_user)) -> dict:
         """Get user's health goals."""
@@ -225,7 +351,7 @@ class HealthController:
         """Get user's uploaded medical documents."""
         try:
             result = await health_service.get_medical_documents(current_user, category, page, limit)
-            return result
+            return FastJSONResponse(result)
         except Exception as e:
             logger.error(f"Error getting medical documents: {e}")
             raise HTTPException(
@@ -304,6 +430,25 @@ class HealthController:
                 detail="Internal server error"
             )
 
+    async def download_medical_document(self, document_id: str, current_user: str) -> FileResponse:
+        """Serve a medical document's file; Range requests resume or seek within it."""
+        document = await health_service.get_medical_document_file(current_user, document_id)
+        if not document or not os.path.isfile(document["file_path"]):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found"
+            )
+
+        return FileResponse(
+            document["file_path"],
+            media_type=document.get("mime_type") or "application/octet-stream",
+            filename=document.get("original_filename") or document["document_name"],
+            headers={
+                "ETag": file_etag(os.stat(document["file_path"])),
+                "Cache-Control": "private, no-cache"
+            }
+        )
+
     async def delete_medical_document(
         self,
         document_id: str,
@@ -331,6 +476,25 @@ class HealthController:
                 detail="Internal server error"
             )
 
+    # Export
+    async def export_health_record(self, cursor: Optional[str], gzip: bool, current_user: str) -> StreamingResponse:
+        """Stream the user's full health record as NDJSON, resuming after ``cursor`` if given."""
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except InvalidExportCursor as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        filename = "health-record.ndjson.gz" if gzip else "health-record.ndjson"
+        return StreamingResponse(
+            export_service.stream_user_export(current_user, cursor, compress=gzip),
+            media_type="application/gzip" if gzip else "application/x-ndjson",
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "Cache-Control": "no-store"
+            }
+        )
+
 
 # Create controller instance
 health_controller = HealthController()
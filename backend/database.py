@@ -1,25 +1,216 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase # type: ignore
+from pymongo import monitoring, ReadPreference # type: ignore
 from pymongo.errors import ConnectionFailure # type: ignore
 import logging
-from typing import Optional
+import threading
+from typing import Optional, Dict, Any
+
+from utils.metrics import mongodb_command_duration
+from utils.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+# Upper bounds (ms) for the checkout wait-time histogram
+POOL_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Collect connection pool checkout and wait-time statistics.
+
+    Pymongo calls these hooks from its own threads, so counters are guarded
+    by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.wait_ms_sum = 0.0
+        self.wait_ms_max = 0.0
+        self.wait_buckets = [0] * len(POOL_WAIT_BUCKETS_MS)
+        self.pools_cleared = 0
+
+    def _observe_wait(self, duration_s: float) -> None:
+        wait_ms = duration_s * 1000
+        self.wait_ms_sum += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        for i, bound in enumerate(POOL_WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                self.wait_buckets[i] += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+            self._observe_wait(getattr(event, "duration", 0.0) or 0.0)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self._observe_wait(getattr(event, "duration", 0.0) or 0.0)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checkins += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Point-in-time copy of the pool statistics."""
+        with self._lock:
+            observed = self.checkouts + sum(self.checkout_failures.values())
+            return {
+                "connections_open": self.connections_created - self.connections_closed,
+                "connections_created": self.connections_created,
+                "connections_in_use": self.checkouts - self.checkins,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pools_cleared": self.pools_cleared,
+                "wait_ms_avg": round(self.wait_ms_sum / observed, 3) if observed else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 3),
+                "wait_ms_sum": round(self.wait_ms_sum, 3),
+                "wait_ms_buckets": dict(zip(POOL_WAIT_BUCKETS_MS, self.wait_buckets)),
+                "wait_count": observed
+            }
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Record MongoDB command latency by command name."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongodb_command_duration.observe(event.duration_micros / 1_000_000, command=event.command_name, outcome="success")
+
+    def failed(self, event):
+        mongodb_command_duration.observe(event.duration_micros / 1_000_000, command=event.command_name, outcome="error")
+
+
+class TracingCommandListener(monitoring.CommandListener):
+    """
+    Record each MongoDB command as a span of the request that issued it.
+
+    Motor copies the caller's context into its executor threads, so the
+    current span is visible here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[Any, Any] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        span = tracer.start_span(f"mongodb.{event.command_name}", {
+            "db.system": "mongodb",
+            "db.name": event.database_name,
+            "db.operation": event.command_name,
+            "db.collection": collection if isinstance(collection, str) else None
+        })
+        if span.is_recording:
+            with self._lock:
+                self._spans[(event.connection_id, event.request_id)] = span
+
+    def succeeded(self, event):
+        with self._lock:
+            span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            span.end()
+
+    def failed(self, event):
+        with self._lock:
+            span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            span.set_status("ERROR", str(event.failure.get("errmsg", "")))
+            span.end()
+
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
     database: Optional[AsyncIOMotorDatabase] = None
+    read_database: Optional[AsyncIOMotorDatabase] = None
+    pool_stats: PoolStatsListener = PoolStatsListener()
+    command_metrics: CommandMetricsListener = CommandMetricsListener()
+    command_tracing: TracingCommandListener = TracingCommandListener()
 
 
 db = Database()
 
 
+def build_client_options(settings) -> Dict[str, Any]:
+    """Translate settings into AsyncIOMotorClient keyword arguments."""
+    options: Dict[str, Any] = {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "readPreference": settings.mongodb_read_preference,
+        "event_listeners": [db.pool_stats],
+    }
+    if settings.metrics_enabled:
+        options["event_listeners"].append(db.command_metrics)
+    if settings.tracing_enabled:
+        options["event_listeners"].append(db.command_tracing)
+    if settings.mongodb_max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.mongodb_max_idle_time_ms
+    if settings.mongodb_wait_queue_timeout_ms is not None:
+        options["waitQueueTimeoutMS"] = settings.mongodb_wait_queue_timeout_ms
+    if settings.mongodb_compressors:
+        options["compressors"] = settings.mongodb_compressors
+    return options
+
+
 async def connect_to_mongo():
     """Create database connection"""
     try:
         from config import settings
-        db.client = AsyncIOMotorClient(settings.mongodb_url)
+        db.client = AsyncIOMotorClient(settings.mongodb_url, **build_client_options(settings))
         db.database = db.client[settings.database_name] # type: ignore
+
+        # Read-only analytics/dashboard queries can be routed elsewhere (e.g. secondaries)
+        if settings.mongodb_analytics_read_preference:
+            db.read_database = db.client.get_database( # type: ignore
+                settings.database_name,
+                read_preference=READ_PREFERENCES[settings.mongodb_analytics_read_preference]
+            )
+        else:
+            db.read_database = db.database
         
         # Test the connection
         if db.client is not None:
@@ -46,3 +237,15 @@ async def get_database() -> AsyncIOMotorDatabase:
     if db.database is None:
         raise RuntimeError("Database not initialized. Call connect_to_mongo() first.")
     return db.database
+
+
+async def get_read_database() -> AsyncIOMotorDatabase:
+    """Get database instance for read-only analytics/dashboard queries"""
+    if db.read_database is None:
+        return await get_database()
+    return db.read_database
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Get connection pool statistics"""
+    return db.pool_stats.snapshot()
@@ -1,11 +1,24 @@
 from fastapi import FastAPI # type: ignore
 from fastapi.middleware.cors import CORSMiddleware # type: ignore
-from fastapi.staticfiles import StaticFiles # type: ignore
+from fastapi.responses import PlainTextResponse # type: ignore
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 
-from database import connect_to_mongo, close_mongo_connection
+from config import settings
+from database import connect_to_mongo, close_mongo_connection, get_pool_stats
+from middlewares.compression import CompressionMiddleware
+from middlewares.etag import ConditionalGetMiddleware
+from middlewares.metrics import MetricsMiddleware
+from middlewares.tracing import TracingMiddleware
+from utils.metrics import registry, record_pool_stats, monitor_event_loop_lag
+from utils.static_files import CompressedStaticFiles
+from utils.tracing import configure_tracing
+from services.activity_log_service import activity_log_service
+from services.health_score_service import health_score_service
+from services.job_service import job_service
+from services.ocr_service import ocr_service
 from routes.auth_routes import router as auth_router
 from routes.health_routes import router as health_router
 from routes.dashboard_routes import router as dashboard_router
@@ -28,11 +41,24 @@ async def lifespan(app: FastAPI):
         logger.info("Database connected successfully")
     except Exception as e:
         logger.error(f"Failed to connect to database: {e}")
+
+    lag_monitor = None
+    if settings.metrics_enabled:
+        lag_monitor = asyncio.create_task(monitor_event_loop_lag(settings.event_loop_lag_interval_seconds))
+
+    if settings.job_workers > 0:
+        job_service.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down SwasthWrap Backend...")
+    if lag_monitor is not None:
+        lag_monitor.cancel()
+    await job_service.stop()
+    ocr_service.shutdown()
+    await health_score_service.flush()
+    await activity_log_service.flush()
     await close_mongo_connection()
 
 
@@ -53,6 +79,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression runs inside the ETag middleware, so ETags name the encoded bytes
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_bytes,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality
+    )
+if settings.etag_enabled:
+    app.add_middleware(ConditionalGetMiddleware)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+configure_tracing(settings)
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(health_router)
@@ -64,7 +108,7 @@ app.include_router(chat_router, tags=["chat"])
 uploads_dir = "uploads"
 if not os.path.exists(uploads_dir):
     os.makedirs(uploads_dir, exist_ok=True)
-app.mount("/static", StaticFiles(directory=uploads_dir), name="static")
+app.mount("/static", CompressedStaticFiles(directory=uploads_dir), name="static")
 
 
 @app.get("/")
@@ -86,9 +130,30 @@ async def health_check():
     }
 
 
+@app.get("/health/database")
+async def database_health():
+    """Connection pool statistics for sizing pools across workers"""
+    return {
+        "pool": get_pool_stats(),
+        "config": {
+            "max_pool_size": settings.mongodb_max_pool_size,
+            "min_pool_size": settings.mongodb_min_pool_size,
+            "wait_queue_timeout_ms": settings.mongodb_wait_queue_timeout_ms,
+            "read_preference": settings.mongodb_read_preference,
+            "analytics_read_preference": settings.mongodb_analytics_read_preference
+        }
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for this worker"""
+    record_pool_stats(get_pool_stats())
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
-    from config import settings
     
     uvicorn.run(
         "main:app",
@@ -0,0 +1,115 @@
+from utils.compression import StreamCompressor, accepted_encodings, compress, encoded_etag, is_compressible
+
+
+def _header(headers, name: bytes):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli response compression negotiated from Accept-Encoding.
+
+    Only 200 responses with a compressible content type are encoded. Bodies
+    sent in one piece are compressed when at least ``minimum_size`` bytes;
+    streamed bodies are compressed chunk by chunk, flushing each one. File
+    responses (``Accept-Ranges``) and already-encoded ones pass through, since
+    ranges address the stored bytes. Pure ASGI, so streams stay streams.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        request_encoding = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                request_encoding = value.decode("latin-1")
+                break
+        encodings = accepted_encodings(request_encoding)
+        if not encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = encodings[0]
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                passthrough = (
+                    message["status"] != 200
+                    or not is_compressible(_header(headers, b"content-type"))
+                    or _header(headers, b"content-encoding") is not None
+                    or _header(headers, b"accept-ranges") is not None
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None and start_message is not None:
+                if not more_body:
+                    # Whole body in one message: compress it in one go, or send as is if small
+                    if len(body) < self.minimum_size:
+                        await send(start_message)
+                    else:
+                        body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                        await send(self._encoded_start(start_message, encoding, len(body)))
+                    start_message = None
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                compressor = StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                await send(self._encoded_start(start_message, encoding, None))
+                start_message = None
+
+            if more_body:
+                chunk = compressor.compress(body) if body else b""
+            else:
+                chunk = compressor.finish(body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _encoded_start(self, message, encoding: str, content_length):
+        headers = []
+        vary = None
+        for key, value in message.get("headers", []):
+            name = key.lower()
+            if name == b"content-length":
+                continue
+            if name == b"vary":
+                vary = value
+                continue
+            if name == b"etag":
+                value = encoded_etag(value.decode("latin-1"), encoding).encode("latin-1")
+            headers.append((key, value))
+
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+            vary = vary + b", Accept-Encoding"
+        headers.append((b"vary", vary))
+        headers.append((b"content-encoding", encoding.encode()))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return {**message, "headers": headers}
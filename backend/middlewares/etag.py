@@ -0,0 +1,95 @@
+import hashlib
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ConditionalGetMiddleware:
+    """
+    Strong ETags and ``304 Not Modified`` for GET requests.
+
+    A 200 response sent in one piece without an ETag gets one from a hash of
+    its body; responses that bring their own (files) keep it. When the
+    request's If-None-Match matches, the body is dropped and a 304 is sent.
+    Streamed and ``no-store`` responses are passed through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = None
+        for key, value in scope["headers"]:
+            if key == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+                break
+
+        start_message = None
+        state = "start"  # start -> buffering | passthrough | not_modified
+
+        async def send_wrapper(message):
+            nonlocal start_message, state
+            if message["type"] == "http.response.start":
+                headers = {
+                    key.decode("latin-1").lower(): value.decode("latin-1") for key, value in message.get("headers", [])
+                }
+                if message["status"] != 200 or "no-store" in headers.get("cache-control", ""):
+                    state = "passthrough"
+                elif "etag" in headers:
+                    if if_none_match and _etag_matches(if_none_match, headers["etag"]):
+                        state = "not_modified"
+                        await send(self._not_modified(message))
+                        return
+                    state = "passthrough"
+                else:
+                    state = "buffering"
+                    start_message = message
+                    return
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if state == "not_modified":
+                if not message.get("more_body", False):
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            if state == "passthrough":
+                await send(message)
+                return
+
+            # buffering: only a body sent in one piece gets an ETag
+            state = "passthrough"
+            if message.get("more_body", False):
+                await send(start_message)
+                await send(message)
+                return
+            etag = '"' + hashlib.blake2b(message.get("body", b""), digest_size=16).hexdigest() + '"'
+            start_message = {**start_message, "headers": [*start_message.get("headers", []), (b"etag", etag.encode())]}
+            if if_none_match and _etag_matches(if_none_match, etag):
+                await send(self._not_modified(start_message))
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _not_modified(self, message):
+        # RFC 9110 15.4.5: keep the validators and caching headers, drop the content headers
+        keep = {b"etag", b"cache-control", b"vary", b"expires", b"date", b"content-location", b"last-modified"}
+        headers = [
+            (key, value) for key, value in message.get("headers", [])
+            if key.lower() in keep or key.lower().startswith(b"access-control-")
+        ]
+        return {"type": "http.response.start", "status": 304, "headers": headers}
@@ -0,0 +1,51 @@
+import time
+
+from utils.metrics import http_request_duration, http_requests_in_progress
+
+# Path prefix -> router label; anything else is "other" to keep label cardinality bounded
+ROUTER_PREFIXES = (
+    ("/api/auth", "auth"),
+    ("/api/health", "health"),
+    ("/api/dashboard", "dashboard"),
+    ("/api/analytics", "analytics"),
+    ("/api/chat", "chat"),
+)
+
+
+def router_for_path(path: str) -> str:
+    for prefix, router in ROUTER_PREFIXES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return router
+    return "other"
+
+
+class MetricsMiddleware:
+    """Record request latency per router (pure ASGI so streaming responses aren't buffered)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        router = router_for_path(scope["path"])
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_progress.inc(router=router)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.inc(-1, router=router)
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                router=router, method=scope["method"], status=str(status_code)
+            )
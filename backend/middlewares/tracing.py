@@ -0,0 +1,54 @@
+import re
+import uuid
+
+from utils.tracing import tracer, REQUEST_ID_HEADER
+
+# Accept caller-supplied request IDs only if they are short and header-safe
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+def route_template(path: str, path_params: dict) -> str:
+    """Replace path parameter values with their names, e.g. /goals/{goal_id}."""
+    for name, value in path_params.items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+class TracingMiddleware:
+    """Start a trace per request and echo its request ID in the response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        request_id = headers.get(REQUEST_ID_HEADER.lower(), "")
+        if not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        method = scope["method"]
+        with tracer.start_trace(
+            f"{method} {scope['path']}", request_id, headers.get("traceparent"),
+            {"http.method": method, "http.target": scope["path"]}
+        ) as root:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (REQUEST_ID_HEADER.lower().encode("latin-1"), request_id.encode("latin-1"))
+                    ]
+                    root.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        root.set_status("ERROR")
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+            # Name the span by route template once routing has filled in path params
+            path_params = scope.get("path_params")
+            if path_params and root.is_recording:
+                root.name = f"{method} {route_template(scope['path'], path_params)}"
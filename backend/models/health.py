@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Literal
+from typing import List, Optional, Literal, Union
 from datetime import datetime, date
 from bson import ObjectId
 from enum import Enum
@@ -125,6 +125,18 @@ class HealthMetricCreate(BaseModel):
     location: Optional[str] = None
 
 
+class HealthMetricReading(BaseModel):
+    """One reading in a batch upload, e.g. a wearable or device sync."""
+    metric_type: MetricType
+    value: Union[str, int, float]
+    unit: str
+    measured_at: datetime  # full timestamp; readings are deduplicated on it
+    systolic: Optional[int] = None
+    diastolic: Optional[int] = None
+    notes: Optional[str] = None
+    device_used: Optional[str] = None
+
+
 class HealthMetric(BaseModel):
     id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
     user_id: str
@@ -138,6 +150,8 @@ class HealthMetric(BaseModel):
     measured_at: datetime
     device_used: Optional[str] = None
     location: Optional[str] = None
+    source_document_id: Optional[str] = None  # set for values read from an uploaded report
+    source_hash: Optional[str] = None  # SHA-256 of that report's file, the same for every upload of it
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     class Config:
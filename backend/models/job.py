@@ -0,0 +1,55 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+from bson import ObjectId # type: ignore
+from enum import Enum
+
+
+class JobTypeEnum(str, Enum):
+    DOCUMENT_ANALYSIS = "document_analysis"
+    HEALTH_DOCUMENT_ANALYSIS = "health_document_analysis"
+
+
+class JobStatusEnum(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class Job(BaseModel):
+    id: Optional[str] = Field(default=None, alias="_id")
+    user_id: str
+    type: JobTypeEnum
+    status: JobStatusEnum = JobStatusEnum.QUEUED
+    payload: Dict[str, Any] = {}
+    progress: int = 0
+    stage: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+
+
+# Response Models
+class JobStatusResponse(BaseModel):
+    job_id: str
+    type: str
+    status: str
+    progress: int
+    stage: Optional[str] = None
+    session_id: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
@@ -0,0 +1,20 @@
+from motor.motor_asyncio import AsyncIOMotorCollection # type: ignore
+
+from database import get_database, get_read_database
+
+
+class BaseRepository:
+    """
+    Thin per-collection data access with explicit projections.
+
+    Each use case asks only for the fields it needs and gets back a small
+    typed result object instead of the whole BSON document.
+    """
+
+    collection_name: str = ""
+
+    async def _collection(self, read_only: bool = False) -> AsyncIOMotorCollection:
+        """Get the collection, using the read-only handle for analytics/dashboard reads."""
+        db = await (get_read_database() if read_only else get_database())
+        return db[self.collection_name]
+
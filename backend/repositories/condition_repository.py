@@ -0,0 +1,19 @@
+from typing import List
+
+from repositories.base import BaseRepository
+
+NAME_PROJECTION = {"_id": 0, "name": 1}
+
+
+class ConditionRepository(BaseRepository):
+    collection_name = "medical_conditions"
+
+    async def get_condition_names(self, user_id: str) -> List[str]:
+        """Lower-cased condition names for personalization."""
+        collection = await self._collection(read_only=True)
+        cursor = collection.find({"user_id": user_id}, NAME_PROJECTION)
+        return [doc["name"].lower() async for doc in cursor if doc.get("name")]
+
+
+# Create singleton instance
+condition_repository = ConditionRepository()
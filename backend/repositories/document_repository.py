@@ -0,0 +1,41 @@
+from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from datetime import datetime
+
+from repositories.base import BaseRepository
+
+SUMMARY_PROJECTION = {"_id": 0, "document_name": 1, "created_at": 1}
+# Fields rendered by MedicalDocumentResponse; file_path, encryption_key etc. stay on the server
+LIST_PROJECTION = {
+    "document_name": 1, "file_type": 1, "document_date": 1, "file_size": 1,
+    "category": 1, "tags": 1, "status": 1
+}
+
+
+@dataclass(slots=True)
+class DocumentSummary:
+    document_name: str
+    created_at: datetime
+
+
+class DocumentRepository(BaseRepository):
+    collection_name = "medical_documents"
+
+    async def get_recent(self, user_id: str, limit: int) -> List[DocumentSummary]:
+        """Most recently uploaded documents for the activity feed."""
+        collection = await self._collection(read_only=True)
+        cursor = collection.find({"user_id": user_id}, SUMMARY_PROJECTION).sort("created_at", -1).limit(limit)
+        return [DocumentSummary(document_name=doc["document_name"], created_at=doc["created_at"]) async for doc in cursor]
+
+    async def list_page(self, user_id: str, category: Optional[str], skip: int, limit: int) -> List[Dict[str, Any]]:
+        """One page of documents with only the listed fields."""
+        collection = await self._collection()
+        query: Dict[str, Any] = {"user_id": user_id}
+        if category:
+            query["category"] = category.lower()
+        cursor = collection.find(query, LIST_PROJECTION).sort("created_at", -1).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+
+# Create singleton instance
+document_repository = DocumentRepository()
@@ -0,0 +1,40 @@
+from typing import List, Any
+from dataclasses import dataclass
+from datetime import datetime
+
+from repositories.base import BaseRepository
+
+SUMMARY_PROJECTION = {"_id": 0, "goal_title": 1, "created_at": 1}
+DEADLINE_PROJECTION = {"_id": 0, "goal_title": 1, "deadline": 1}
+
+
+@dataclass(slots=True)
+class GoalSummary:
+    goal_title: str
+    created_at: datetime
+
+
+@dataclass(slots=True)
+class GoalDeadline:
+    goal_title: str
+    deadline: Any = None
+
+
+class GoalRepository(BaseRepository):
+    collection_name = "health_goals"
+
+    async def get_recent(self, user_id: str, limit: int) -> List[GoalSummary]:
+        """Most recently created goals for the activity feed."""
+        collection = await self._collection(read_only=True)
+        cursor = collection.find({"user_id": user_id}, SUMMARY_PROJECTION).sort("created_at", -1).limit(limit)
+        return [GoalSummary(goal_title=doc["goal_title"], created_at=doc["created_at"]) async for doc in cursor]
+
+    async def get_active_deadlines(self, user_id: str, limit: int) -> List[GoalDeadline]:
+        """Active goals with their deadlines for reminders."""
+        collection = await self._collection(read_only=True)
+        cursor = collection.find({"user_id": user_id, "status": "active"}, DEADLINE_PROJECTION).limit(limit)
+        return [GoalDeadline(goal_title=doc["goal_title"], deadline=doc.get("deadline")) async for doc in cursor]
+
+
+# Create singleton instance
+goal_repository = GoalRepository()
@@ -0,0 +1,23 @@
+from typing import List, Dict, Any, Optional
+
+from repositories.base import BaseRepository
+
+# Fields rendered by HealthTipResponse plus the conditions used for filtering
+TIP_PROJECTION = {"en": 1, "hi": 1, "ta": 1, "category": 1, "priority": 1, "conditions": 1}
+
+
+class HealthTipRepository(BaseRepository):
+    collection_name = "health_tips"
+
+    async def get_active(self, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """Highest-priority active tips."""
+        collection = await self._collection(read_only=True)
+        query: Dict[str, Any] = {"is_active": True}
+        if category:
+            query["category"] = category
+        cursor = collection.find(query, TIP_PROJECTION).sort("priority", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+
+# Create singleton instance
+health_tip_repository = HealthTipRepository()
@@ -0,0 +1,39 @@
+from typing import List
+from dataclasses import dataclass
+from datetime import datetime
+
+from repositories.base import BaseRepository
+
+ADHERENCE_PROJECTION = {"_id": 0, "medication_name": 1, "taken": 1}
+
+
+@dataclass(slots=True)
+class IntakeRecord:
+    medication_name: str
+    taken: bool = False
+
+
+class IntakeRepository(BaseRepository):
+    collection_name = "medication_intakes"
+
+    async def get_records(self, user_id: str, start: datetime, end: datetime) -> List[IntakeRecord]:
+        """Intakes scheduled in the range, for adherence."""
+        collection = await self._collection(read_only=True)
+        cursor = collection.find(
+            {"user_id": user_id, "scheduled_time": {"$gte": start, "$lte": end}},
+            ADHERENCE_PROJECTION
+        )
+        return [IntakeRecord(medication_name=doc["medication_name"], taken=doc.get("taken", False)) async for doc in cursor]
+
+    async def get_taken_flags(self, user_id: str, start: datetime) -> List[bool]:
+        """Chronological taken/missed flags since start, for streaks."""
+        collection = await self._collection(read_only=True)
+        cursor = collection.find(
+            {"user_id": user_id, "scheduled_time": {"$gte": start}},
+            {"_id": 0, "taken": 1}
+        ).sort("scheduled_time", 1)
+        return [doc.get("taken", False) async for doc in cursor]
+
+
+# Create singleton instance
+intake_repository = IntakeRepository()
@@ -0,0 +1,334 @@
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime
+from pymongo import UpdateOne, ASCENDING, DESCENDING # type: ignore
+from pymongo.errors import BulkWriteError # type: ignore
+import logging
+
+from config import settings
+from repositories.base import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROJECTION = {"_id": 0, "metric_type": 1, "value": 1, "unit": 1, "created_at": 1}
+POINT_PROJECTION = {"_id": 0, "metric_type": 1, "value": 1, "systolic": 1, "measured_at": 1}
+# A device reading is the same reading if these match
+READING_KEY = ("user_id", "metric_type", "measured_at", "device_used")
+# Marks readings stored by a device sync; only these are unique per READING_KEY
+DEVICE_SYNC = "device_sync"
+READING_INDEX = "device_reading_key"
+# Mongo's duplicate key error, raised when another upsert stored the reading first
+DUPLICATE_KEY = 11000
+# Fields rendered by HealthMetricResponse
+LIST_PROJECTION = {"_id": 0, "metric_type": 1, "value": 1, "unit": 1, "status": 1, "notes": 1, "measured_at": 1}
+# Stored under the time-series metaField, so each bucket holds one user's readings of one type
+META_FIELDS = ("user_id", "metric_type")
+
+
+@dataclass(slots=True)
+class MetricSummary:
+    metric_type: str
+    value: str
+    unit: str
+    created_at: datetime
+
+
+@dataclass(slots=True)
+class MetricBucket:
+    metric_type: str
+    start: datetime
+    count: int
+    unit: str
+    value: Optional[float] = None  # average of the numeric values
+    systolic: Optional[float] = None
+    diastolic: Optional[float] = None
+
+
+@dataclass(slots=True)
+class MetricPoint:
+    metric_type: str
+    value: str
+    measured_at: datetime
+    systolic: Optional[int] = None
+
+
+class MetricRepository(BaseRepository):
+    """
+    Health metric readings in a regular collection or a time-series one.
+
+    With ``metrics_storage = "timeseries"`` readings live in a MongoDB
+    time-series collection (timeField ``measured_at``, metaField ``meta`` =
+    user_id + metric_type). Filters, projections, sorts and documents are
+    translated here, so callers always see flat readings.
+
+    Synced device readings (``source`` = DEVICE_SYNC) are unique per
+    READING_KEY; manual entries are not. In a regular collection a partial
+    unique index enforces that, so concurrent syncs can't store a reading
+    twice; time-series collections don't support unique indexes, so there
+    duplicates are only skipped on a best-effort lookup before inserting.
+    """
+
+    def __init__(self, storage: str = "collection", timeseries_collection: str = "health_metrics_ts",
+                 granularity: str = "hours"):
+        self.timeseries = storage == "timeseries"
+        self.collection_name = timeseries_collection if self.timeseries else "health_metrics"
+        self.granularity = granularity
+        self._collection_ready = False
+
+    async def _collection(self, read_only: bool = False):
+        if not self._collection_ready:
+            await self.ensure_collection()
+        return await super()._collection(read_only)
+
+    async def ensure_collection(self) -> None:
+        """Create the collection (time-series if configured), the user/time index and the reading key index."""
+        collection = await super()._collection()
+        if self.timeseries and self.collection_name not in await collection.database.list_collection_names():
+            await collection.database.create_collection(
+                self.collection_name,
+                timeseries={"timeField": "measured_at", "metaField": "meta", "granularity": self.granularity}
+            )
+        await collection.create_index([(self.field("user_id"), ASCENDING), ("measured_at", ASCENDING)])
+        if not self.timeseries:
+            try:
+                keys = [(field, ASCENDING) for field in READING_KEY]
+                # Superseded by READING_INDEX: it also covered manual entries that name a device
+                legacy = "_".join(f"{field}_1" for field in READING_KEY)
+                if legacy in await collection.index_information():
+                    await collection.drop_index(legacy)
+                # Manual and report entries may repeat a time and device, so only synced readings are unique
+                await collection.create_index(
+                    keys, name=READING_INDEX, unique=True, partialFilterExpression={"source": DEVICE_SYNC}
+                )
+            except Exception as e:
+                # e.g. duplicates stored before the index existed; remove them and restart
+                logger.warning(f"Could not create the unique health metric reading index: {e}")
+        self._collection_ready = True
+
+    def field(self, name: str) -> str:
+        """Stored path of a reading field."""
+        return f"meta.{name}" if self.timeseries and name in META_FIELDS else name
+
+    def _translate(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.timeseries:
+            return spec
+        return {self.field(name): value for name, value in spec.items()}
+
+    def to_storage(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.timeseries:
+            return doc
+        stored = {name: value for name, value in doc.items() if name not in META_FIELDS}
+        stored["meta"] = {name: doc.get(name) for name in META_FIELDS}
+        return stored
+
+    def from_storage(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        if self.timeseries and "meta" in doc:
+            doc.update(doc.pop("meta"))
+        return doc
+
+    def build_query(self, user_id: str, metric_types: Optional[List[str]] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build a user/type/time-range filter."""
+        query: Dict[str, Any] = {self.field("user_id"): user_id}
+        if metric_types:
+            query[self.field("metric_type")] = metric_types[0] if len(metric_types) == 1 else {"$in": metric_types}
+        if start or end:
+            range_query: Dict[str, Any] = {}
+            if start:
+                range_query["$gte"] = start
+            if end:
+                range_query["$lte"] = end
+            query["measured_at"] = range_query
+        return query
+
+    async def get_recent(self, user_id: str, limit: int) -> List[MetricSummary]:
+        """Most recently recorded metrics for the activity feed."""
+        collection = await self._collection(read_only=True)
+        cursor = collection.find(
+            {self.field("user_id"): user_id}, self._translate(SUMMARY_PROJECTION)
+        ).sort("created_at", -1).limit(limit)
+        return [
+            MetricSummary(metric_type=doc["metric_type"], value=doc["value"], unit=doc["unit"], created_at=doc["created_at"])
+            async for doc in self._flat(cursor)
+        ]
+
+    async def get_points(self, user_id: str, start: datetime, end: datetime,
+                         metric_types: Optional[List[str]] = None) -> List[MetricPoint]:
+        """Chronological data points for trend analytics."""
+        collection = await self._collection(read_only=True)
+        cursor = collection.find(
+            self.build_query(user_id, metric_types, start, end), self._translate(POINT_PROJECTION)
+        ).sort("measured_at", 1)
+        return [
+            MetricPoint(metric_type=doc["metric_type"], value=doc["value"], measured_at=doc["measured_at"], systolic=doc.get("systolic"))
+            async for doc in self._flat(cursor)
+        ]
+
+    async def list_for_user(self, user_id: str, metric_types: Optional[List[str]] = None,
+                            start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Newest-first readings with only the listed fields."""
+        collection = await self._collection()
+        cursor = collection.find(
+            self.build_query(user_id, metric_types, start, end), self._translate(LIST_PROJECTION)
+        ).sort("measured_at", -1)
+        return [doc async for doc in self._flat(cursor)]
+
+    async def get_time_range(self, user_id: str, metric_types: Optional[List[str]] = None,
+                             start: Optional[datetime] = None, end: Optional[datetime] = None
+                             ) -> Optional[Tuple[datetime, datetime]]:
+        """First and last measured_at of the matching readings."""
+        collection = await self._collection(read_only=True)
+        query = self.build_query(user_id, metric_types, start, end)
+        first = await collection.find_one(query, {"_id": 0, "measured_at": 1}, sort=[("measured_at", ASCENDING)])
+        if first is None:
+            return None
+        last = await collection.find_one(query, {"_id": 0, "measured_at": 1}, sort=[("measured_at", DESCENDING)])
+        return first["measured_at"], last["measured_at"]
+
+    async def get_buckets(self, user_id: str, unit: str, bin_size: int, metric_types: Optional[List[str]] = None,
+                          start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[MetricBucket]:
+        """Per-type averages over $dateTrunc time buckets, newest first (MongoDB 5.0+)."""
+        collection = await self._collection(read_only=True)
+        is_blood_pressure = {"$eq": [f"${self.field('metric_type')}", "blood_pressure"]}
+
+        def pressure_part(field: str, index: int) -> Dict[str, Any]:
+            # Readings saved with only "120/80" have no systolic/diastolic fields; read them from the value
+            from_value = {"$convert": {
+                "input": {"$arrayElemAt": [{"$split": [{"$toString": "$value"}, "/"]}, index]},
+                "to": "double", "onError": None, "onNull": None
+            }}
+            return {"$avg": {"$ifNull": [f"${field}", {"$cond": [is_blood_pressure, from_value, None]}]}}
+
+        pipeline = [
+            {"$match": self.build_query(user_id, metric_types, start, end)},
+            {"$group": {
+                "_id": {
+                    "metric_type": f"${self.field('metric_type')}",
+                    "start": {"$dateTrunc": {"date": "$measured_at", "unit": unit, "binSize": bin_size}}
+                },
+                # Values are stored as strings; ones that aren't numbers (e.g. "120/80") average as null
+                "value": {"$avg": {"$convert": {"input": "$value", "to": "double", "onError": None, "onNull": None}}},
+                "systolic": pressure_part("systolic", 0),
+                "diastolic": pressure_part("diastolic", 1),
+                "unit": {"$last": "$unit"},
+                "count": {"$sum": 1}
+            }},
+            {"$sort": {"_id.start": -1}}
+        ]
+        return [
+            MetricBucket(
+                metric_type=row["_id"]["metric_type"], start=row["_id"]["start"], count=row["count"],
+                unit=row["unit"], value=row["value"], systolic=row["systolic"], diastolic=row["diastolic"]
+            )
+            async for row in collection.aggregate(pipeline)
+        ]
+
+    async def iter_since(self, start: datetime, projection: Dict[str, int], batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        """Every user's readings since ``start``, sorted by user and then time."""
+        collection = await self._collection()
+        cursor = collection.find({"measured_at": {"$gte": start}}, self._translate(projection)).sort(
+            [(self.field("user_id"), ASCENDING), ("measured_at", ASCENDING)]
+        ).batch_size(batch_size)
+        async for doc in self._flat(cursor):
+            yield doc
+
+    async def iter_for_user(self, user_id: str, after: Any, batch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        """All of a user's readings in ``_id`` order, after ``after`` if given."""
+        collection = await self._collection(read_only=True)
+        query: Dict[str, Any] = {self.field("user_id"): user_id}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        # Time-series collections have no _id index, so the sort may need to spill to disk
+        cursor = collection.find(query, allow_disk_use=True).sort("_id", ASCENDING).batch_size(batch_size)
+        async for doc in self._flat(cursor):
+            yield doc
+
+    async def count_by_user(self, user_ids: List[str], start: datetime) -> Dict[str, Tuple[int, int]]:
+        """(readings, readings with normal status) per user since ``start``."""
+        collection = await self._collection()
+        pipeline = [
+            {"$match": {self.field("user_id"): {"$in": user_ids}, "measured_at": {"$gte": start}}},
+            {"$group": {
+                "_id": f"${self.field('user_id')}",
+                "total": {"$sum": 1},
+                "good": {"$sum": {"$cond": [{"$eq": ["$status", "normal"]}, 1, 0]}}
+            }}
+        ]
+        return {row["_id"]: (row["total"], row["good"]) async for row in collection.aggregate(pipeline)}
+
+    async def insert(self, doc: Dict[str, Any]) -> Any:
+        collection = await self._collection()
+        result = await collection.insert_one(self.to_storage(doc))
+        return result.inserted_id
+
+    async def replace_for_source(self, user_id: str, source_hash: str, source_document_id: str,
+                                 docs: List[Dict[str, Any]]) -> None:
+        """Replace the readings imported from one report, from this upload or any earlier one of the same file."""
+        collection = await self._collection()
+        await collection.delete_many({
+            self.field("user_id"): user_id,
+            # Readings imported before source_hash was stored only carry the document ID
+            "$or": [{"source_hash": source_hash}, {"source_document_id": source_document_id}]
+        })
+        if docs:
+            await collection.insert_many([self.to_storage(doc) for doc in docs], ordered=False)
+
+    async def upsert_readings(self, docs: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Insert readings that aren't stored yet, in one unordered bulk write.
+
+        Returns (inserted, duplicates); existing readings are left untouched.
+        """
+        if not docs:
+            return 0, 0
+        collection = await self._collection()
+        if self.timeseries:
+            return await self._insert_new_readings(collection, docs)
+        operations = [
+            UpdateOne(self._reading_filter(doc), {"$setOnInsert": doc}, upsert=True)
+            for doc in docs
+        ]
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent sync inserted some of these readings between our match and insert
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                raise
+            return e.details.get("nUpserted", 0), e.details.get("nMatched", 0) + len(errors)
+        return result.upserted_count, result.matched_count
+
+    def _reading_filter(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        # Matches the partial index, so a manual entry never counts as the synced reading
+        return {**{field: doc.get(field) for field in READING_KEY}, "source": DEVICE_SYNC}
+
+    async def _insert_new_readings(self, collection, docs: List[Dict[str, Any]]) -> Tuple[int, int]:
+        # Time-series collections can't upsert or have unique indexes: look up the batch's keys,
+        # then insert the rest. Best effort, since a concurrent sync can insert in between
+        users = list({doc["user_id"] for doc in docs})
+        times = [doc["measured_at"] for doc in docs]
+        cursor = collection.find(
+            {
+                self.field("user_id"): {"$in": users},
+                "measured_at": {"$gte": min(times), "$lte": max(times)},
+                "source": DEVICE_SYNC
+            },
+            {"_id": 0, "meta": 1, "measured_at": 1, "device_used": 1}
+        )
+        existing = {tuple(doc.get(field) for field in READING_KEY) async for doc in self._flat(cursor)}
+        new_docs = [doc for doc in docs if tuple(doc.get(field) for field in READING_KEY) not in existing]
+        if new_docs:
+            await collection.insert_many([self.to_storage(doc) for doc in new_docs], ordered=False)
+        return len(new_docs), len(docs) - len(new_docs)
+
+    async def _flat(self, cursor) -> AsyncIterator[Dict[str, Any]]:
+        async for doc in cursor:
+            yield self.from_storage(doc)
+
+
+# Create singleton instance
+metric_repository = MetricRepository(
+    storage=settings.metrics_storage,
+    timeseries_collection=settings.metrics_timeseries_collection,
+    granularity=settings.metrics_timeseries_granularity
+)
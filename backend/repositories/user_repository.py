@@ -0,0 +1,44 @@
+from typing import Optional
+from dataclasses import dataclass
+from bson import ObjectId # type: ignore
+
+from repositories.base import BaseRepository
+
+STATS_PROJECTION = {"_id": 0, "health_score": 1, "streak": 1}
+
+
+@dataclass(slots=True)
+class UserStats:
+    health_score: int = 0
+    streak: int = 0
+
+
+class UserRepository(BaseRepository):
+    collection_name = "users"
+
+    async def get_stats(self, user_id: str) -> UserStats:
+        """Health score and streak for the dashboard."""
+        collection = await self._collection(read_only=True)
+        doc = await collection.find_one({"_id": ObjectId(user_id)}, STATS_PROJECTION)
+        if not doc:
+            return UserStats()
+        return UserStats(health_score=doc.get("health_score", 0), streak=doc.get("streak", 0))
+
+    async def get_health_score(self, user_id: str) -> Optional[int]:
+        """Current health score, or None if the user doesn't exist."""
+        collection = await self._collection(read_only=True)
+        doc = await collection.find_one({"_id": ObjectId(user_id)}, {"_id": 0, "health_score": 1})
+        return doc.get("health_score", 0) if doc else None
+
+    async def claim_activity_backfill(self, user_id: str) -> bool:
+        """Flag the user's activity feed as backfilled; True only for the first caller."""
+        collection = await self._collection()
+        result = await collection.update_one(
+            {"_id": ObjectId(user_id), "activity_backfilled": {"$ne": True}},
+            {"$set": {"activity_backfilled": True}}
+        )
+        return result.modified_count == 1
+
+
+# Create singleton instance
+user_repository = UserRepository()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query # type: ignore
+from fastapi import APIRouter, Depends, Query, Request, Response # type: ignore
 from typing import Optional, List
 from controllers.analytics_controller import AnalyticsController
 from middlewares.auth import get_current_user
@@ -10,18 +10,30 @@ analytics_controller = AnalyticsController()
 
 @router.get("/health-trends")
 async def get_health_trends(
+    request: Request,
+    response: Response,
     period: str = Query(default="month", regex="^(week|month|quarter|year)$"),
     metrics: Optional[List[str]] = Query(default=None),
     current_user: User = Depends(get_current_user)
 ):
     """Get health trends and analytics data"""
-    return await analytics_controller.get_health_trends(str(current_user.id), period, metrics)
+    return await analytics_controller.get_health_trends(
+        str(current_user.id), period, metrics,
+        if_none_match=request.headers.get("if-none-match"),
+        response=response
+    )
 
 
 @router.get("/medication-adherence")
 async def get_medication_adherence(
+    request: Request,
+    response: Response,
     period: str = Query(default="month", regex="^(week|month|quarter)$"),
     current_user: User = Depends(get_current_user)
 ):
     """Get medication adherence statistics"""
-    return await analytics_controller.get_medication_adherence(str(current_user.id), period)
+    return await analytics_controller.get_medication_adherence(
+        str(current_user.id), period,
+        if_none_match=request.headers.get("if-none-match"),
+        response=response
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, Query # type: ignore
+from fastapi import APIRouter, Depends, UploadFile, File, Form, Query, Response # type: ignore
 from typing import Dict, Any
 
 from controllers.chatbot_controller import chatbot_controller
@@ -7,6 +7,7 @@ from models.chat import (
 )
 from middlewares.auth import get_current_user
 from models.user import User
+from utils.json_response import FastJSONResponse
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
@@ -30,7 +31,7 @@ async def get_chat_history(
     return await chatbot_controller.get_chat_history(page, limit, current_user)
 
 
-@router.get("/session/{session_id}")
+@router.get("/session/{session_id}", response_class=FastJSONResponse)
 async def get_session_messages(
     session_id: str,
     current_user: User = Depends(get_current_user)
@@ -96,26 +97,54 @@ async def start_new_session(
 
 @router.post("/analyze-document")
 async def analyze_document(
+    response: Response,
     file: UploadFile = File(...),
     session_id: str = Form(None),
     query: str = Form(None),
     language: str = Form(default="en"),
+    background: bool = Form(default=False),
     current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
-    """Upload and analyze document with AI"""
-    return await chatbot_controller.upload_and_analyze_document(
-        file, session_id, query, language, current_user
+    """Upload and analyze document with AI; with ``background`` returns 202 and a job to poll"""
+    result = await chatbot_controller.upload_and_analyze_document(
+        file, session_id, query, language, current_user, background
     )
+    if background:
+        response.status_code = 202
+    return result
 
 
 @router.post("/analyze-health-document")
 async def analyze_health_document(
+    response: Response,
     file: UploadFile = File(...),
     session_id: str = Form(None),
     language: str = Form(default="en"),
+    background: bool = Form(default=False),
     current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
-    """Upload and analyze health/medical document"""
-    return await chatbot_controller.analyze_health_document(
-        file, session_id, language, current_user
+    """Upload and analyze health/medical document; with ``background`` returns 202 and a job to poll"""
+    result = await chatbot_controller.analyze_health_document(
+        file, session_id, language, current_user, background
     )
+    if background:
+        response.status_code = 202
+    return result
+
+
+@router.get("/jobs")
+async def list_jobs(
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """List recent background document analysis jobs"""
+    return await chatbot_controller.list_jobs(limit, current_user)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Get status, progress and (when done) the result of a background job"""
+    return await chatbot_controller.get_job_status(job_id, current_user)
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, Query # type: ignore
-from typing import Optional
+from fastapi import APIRouter, Depends, UploadFile, File, Form, Query, Request # type: ignore
+from typing import Optional, Literal
 from datetime import date
 
 from controllers.health_controller import health_controller
 from middlewares.auth import get_current_user
+from models.user import User
 from models.health import (
     MedicalConditionCreate, MedicalConditionUpdate,
     HealthMetricCreate, HealthGoalCreate, HealthGoalProgressUpdate
 )
+from utils.json_response import FastJSONResponse
 
 # Create router
 router = APIRouter(prefix="/api/health", tags=["health"])
@@ -15,87 +17,100 @@ router = APIRouter(prefix="/api/health", tags=["health"])
 
 # Medical Conditions Routes
 @router.get("/conditions")
-async def get_medical_conditions(current_user: str = Depends(get_current_user)):
+async def get_medical_conditions(current_user: User = Depends(get_current_user)):
     """Get user's medical conditions."""
-    return await health_controller.get_medical_conditions(current_user)
+    return await health_controller.get_medical_conditions(str(current_user.id))
 
 
 @router.post("/conditions")
 async def create_medical_condition(
     condition_data: MedicalConditionCreate,
-    current_user: str = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Add a new medical condition."""
-    return await health_controller.create_medical_condition(condition_data, current_user)
+    return await health_controller.create_medical_condition(condition_data, str(current_user.id))
 
 
 @router.put("/conditions/{condition_id}")
 async def update_medical_condition(
     condition_id: str,
     update_data: MedicalConditionUpdate,
-    current_user: str = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Update an existing medical condition."""
-    return await health_controller.update_medical_condition(condition_id, update_data, current_user)
+    return await health_controller.update_medical_condition(condition_id, update_data, str(current_user.id))
 
 
 # Health Metrics Routes
-@router.get("/metrics")
+@router.get("/metrics", response_class=FastJSONResponse)
 async def get_health_metrics(
     metric_type: Optional[str] = Query(None),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
-    current_user: str = Depends(get_current_user)
+    max_points: Optional[int] = Query(None, ge=10, le=5000, description="Downsample each metric type to at most this many points"),
+    downsample: Literal["avg", "lttb"] = Query("avg", description="avg: time-bucket averages; lttb: shape-preserving readings"),
+    current_user: User = Depends(get_current_user)
 ):
-    """Get user's health metrics."""
-    return await health_controller.get_health_metrics(metric_type, date_from, date_to, current_user)
+    """Get user's health metrics, optionally downsampled for charts."""
+    return await health_controller.get_health_metrics(
+        metric_type, date_from, date_to, str(current_user.id), max_points, downsample
+    )
 
 
 @router.post("/metrics")
 async def create_health_metric(
     metric_data: HealthMetricCreate,
-    current_user: str = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Add a new health metric reading."""
-    return await health_controller.create_health_metric(metric_data, current_user)
+    return await health_controller.create_health_metric(metric_data, str(current_user.id))
+
+
+@router.post("/metrics/batch")
+async def ingest_health_metrics(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """Add many readings at once (device sync) as a JSON array or NDJSON stream."""
+    return await health_controller.ingest_health_metrics(request, str(current_user.id))
 
 
 # Health Goals Routes
 @router.get("/goals")
-async def get_health_goals(current_user: str = Depends(get_current_user)):
+async def get_health_goals(current_user: User = Depends(get_current_user)):
     """Get user's health goals."""
-    return await health_controller.get_health_goals(current_user)
+    return await health_controller.get_health_goals(str(current_user.id))
 
 
 @router.post("/goals")
 async def create_health_goal(
     goal_data: HealthGoalCreate,
-    current_user: str = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Create a new health goal."""
-    return await health_controller.create_health_goal(goal_data, current_user)
+    return await health_controller.create_health_goal(goal_data, str(current_user.id))
 
 
 @router.put("/goals/{goal_id}/progress")
 async def update_health_goal_progress(
     goal_id: str,
     progress_data: HealthGoalProgressUpdate,
-    current_user: str = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Update progress on a health goal."""
-    return await health_controller.update_health_goal_progress(goal_id, progress_data, current_user)
+    return await health_controller.update_health_goal_progress(goal_id, progress_data, str(current_user.id))
 
 
 # Medical Documents Routes
-@router.get("/documents")
+@router.get("/documents", response_class=FastJSONResponse)
 async def get_medical_documents(
     category: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
-    current_user: str = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Get user's uploaded medical documents."""
-    return await health_controller.get_medical_documents(category, page, limit, current_user)
+    return await health_controller.get_medical_documents(category, page, limit, str(current_user.id))
 
 
 @router.post("/documents/upload")
@@ -105,18 +120,38 @@ async def upload_medical_document(
     tags: str = Form(""),
     description: Optional[str] = Form(None),
     document_date: Optional[date] = Form(None),
-    current_user: str = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Upload a medical document."""
     return await health_controller.upload_medical_document(
-        file, category, tags, description, document_date, current_user
+        file, category, tags, description, document_date, str(current_user.id)
     )
 
 
+@router.get("/documents/{document_id}/download")
+async def download_medical_document(
+    document_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Download a medical document (supports Range and If-None-Match)."""
+    return await health_controller.download_medical_document(document_id, str(current_user.id))
+
+
 @router.delete("/documents/{document_id}")
 async def delete_medical_document(
     document_id: str,
-    current_user: str = Depends(get_current_user)
+    current_user: User = Depends(get_current_user)
 ):
     """Delete a medical document."""
-    return await health_controller.delete_medical_document(document_id, current_user)
+    return await health_controller.delete_medical_document(document_id, str(current_user.id))
+
+
+# Export Routes
+@router.get("/export")
+async def export_health_record(
+    cursor: Optional[str] = Query(None, description="Resume after this record (the last cursor received)"),
+    gzip: bool = Query(False, description="Compress the stream with gzip"),
+    current_user: User = Depends(get_current_user)
+):
+    """Download conditions, metrics, goals, document details and chat history as NDJSON."""
+    return await health_controller.export_health_record(cursor, gzip, str(current_user.id))
@@ -0,0 +1,100 @@
+"""
+Copy ``health_metrics`` into a time-series collection.
+
+Reads the source in ``_id`` order and writes batches into the time-series
+collection (created if missing), recording progress in ``migrations`` so an
+interrupted run continues where it stopped. The source is left as is; set
+``METRICS_STORAGE=timeseries`` once the counts match.
+
+    python -m scripts.migrate_metrics_timeseries
+    python -m scripts.migrate_metrics_timeseries --batch-size 10000 --granularity minutes
+    python -m scripts.migrate_metrics_timeseries --restart   # drop the target and start over
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import database
+from config import settings
+from repositories.metric_repository import MetricRepository
+
+logger = logging.getLogger("scripts.migrate_metrics_timeseries")
+
+MIGRATION_ID = "health_metrics_timeseries"
+
+
+async def migrate(args) -> int:
+    await database.connect_to_mongo()
+    db = await database.get_database()
+    source = db[args.source]
+    target_repository = MetricRepository(
+        storage="timeseries", timeseries_collection=args.target, granularity=args.granularity
+    )
+
+    if args.restart:
+        await db[args.target].drop()
+        await db.migrations.delete_one({"_id": MIGRATION_ID})
+    await target_repository.ensure_collection()
+    target = db[args.target]
+
+    progress = await db.migrations.find_one({"_id": MIGRATION_ID}) or {}
+    last_id = progress.get("last_id")
+    copied = progress.get("copied", 0)
+    total = await source.count_documents({})
+    if last_id is not None:
+        logger.info(f"Resuming after {last_id} ({copied:,} of {total:,} already copied)")
+        # A batch written just before an interruption isn't in the progress record yet
+        try:
+            await target.delete_many({"_id": {"$gt": last_id}})
+        except Exception as e:
+            logger.warning(f"Could not clear a partially copied batch (needs MongoDB 7.0+): {e}")
+
+    started = time.perf_counter()
+    copied_now = 0
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = await source.find(query).sort("_id", 1).limit(args.batch_size).to_list(length=args.batch_size)
+        if not batch:
+            break
+        # measured_at is the time field, so readings without it can't be stored
+        docs = [target_repository.to_storage(doc) for doc in batch if doc.get("measured_at") is not None]
+        if docs:
+            await target.insert_many(docs, ordered=False)
+        skipped = len(batch) - len(docs)
+        if skipped:
+            logger.warning(f"Skipped {skipped} reading(s) without measured_at")
+
+        last_id = batch[-1]["_id"]
+        copied += len(docs)
+        copied_now += len(docs)
+        await db.migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"last_id": last_id, "copied": copied, "source": args.source, "target": args.target}},
+            upsert=True
+        )
+        elapsed = time.perf_counter() - started
+        logger.info(f"{copied:,}/{total:,} copied ({copied_now / elapsed:,.0f} readings/s)")
+
+    target_total = await target.count_documents({})
+    logger.info(f"Done: {args.source} has {total:,} readings, {args.target} has {target_total:,}")
+    if target_total < total:
+        logger.warning("The target has fewer readings than the source; check the skipped-reading warnings")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Copy health_metrics into a MongoDB time-series collection")
+    parser.add_argument("--source", default="health_metrics")
+    parser.add_argument("--target", default=settings.metrics_timeseries_collection)
+    parser.add_argument("--granularity", default=settings.metrics_timeseries_granularity,
+                        choices=["seconds", "minutes", "hours"])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--restart", action="store_true", help="Drop the target and start from the beginning")
+    raise SystemExit(asyncio.run(migrate(parser.parse_args())))
@@ -0,0 +1,166 @@
+from typing import Optional, List, Dict, Any
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING # type: ignore
+import asyncio
+import logging
+
+from config import settings
+from database import get_database
+from models.dashboard import ActivityLog, ActivityType
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogService:
+    """
+    Write-behind buffer for ``activity_logs``.
+
+    ``log`` only appends to an in-memory buffer. The first entry starts a
+    timer; everything buffered when it fires (or once ``batch_size`` entries
+    are waiting) is written with one ``insert_many``. Readers merge entries
+    not written yet, so a user sees their own activity immediately.
+
+    Entries expire through a TTL index on ``timestamp``, and each flush trims
+    the users it wrote to their newest ``max_per_user`` entries.
+    """
+
+    def __init__(self, flush_seconds: float = 1.0, batch_size: int = 500,
+                 retention_days: int = 90, max_per_user: int = 200):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.max_per_user = max_per_user
+        # While the database is unreachable, keep at most this many entries
+        self.max_buffered = batch_size * 20
+        self._buffer: List[Dict[str, Any]] = []
+        self._in_flight: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushing = False
+        self._indexes_created = False
+
+    async def _get_collections(self):
+        """Get database collections."""
+        db = await get_database()
+        return {
+            'activity_logs': db.activity_logs
+        }
+
+    async def ensure_indexes(self, collections: Dict) -> None:
+        if self._indexes_created:
+            return
+        await collections['activity_logs'].create_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])
+        try:
+            await collections['activity_logs'].create_index(
+                [("timestamp", ASCENDING)], expireAfterSeconds=self.retention_days * 86400
+            )
+        except Exception as e:
+            # e.g. the index exists with another retention; change it with collMod
+            logger.warning(f"Could not create the activity log TTL index: {e}")
+        self._indexes_created = True
+
+    def log(self, user_id: str, activity_type: ActivityType, content: str,
+            data: Optional[Dict[str, Any]] = None, timestamp: Optional[datetime] = None) -> None:
+        """Queue an activity entry; it is written with the next batch."""
+        activity_log = ActivityLog(
+            user_id=user_id,
+            activity_type=activity_type,
+            activity_content=content,
+            activity_data=data or {},
+            timestamp=timestamp or datetime.utcnow()
+        )
+        self._buffer.append(activity_log.dict(by_alias=True))
+        self._schedule_flush(immediate=len(self._buffer) >= self.batch_size)
+
+    def pending(self, user_id: str) -> List[Dict[str, Any]]:
+        """Entries for ``user_id`` not yet written, newest first."""
+        entries = [entry for entry in self._in_flight + self._buffer if entry["user_id"] == user_id]
+        return sorted(entries, key=lambda entry: entry["timestamp"], reverse=True)
+
+    def _schedule_flush(self, immediate: bool = False) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            # A running flush keeps going until the buffer is empty
+            if self._flushing or not immediate:
+                return
+            self._flush_task.cancel()
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self._flush_pending() if immediate else self._flush_later()
+            )
+        except RuntimeError:
+            # No running loop (e.g. called from a script); written on the next flush()
+            pass
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_seconds)
+        await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        self._flushing = True
+        try:
+            await self._write_buffer()
+        finally:
+            self._flushing = False
+
+    async def _write_buffer(self) -> None:
+        while self._buffer:
+            batch = self._buffer[:self.batch_size]
+            del self._buffer[:len(batch)]
+            self._in_flight = batch
+            try:
+                await self._write(batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} activity log entries: {e}")
+                # Put the batch back for the next flush, dropping the oldest entries past the limit
+                self._buffer[:0] = batch
+                dropped = len(self._buffer) - self.max_buffered
+                if dropped > 0:
+                    del self._buffer[:dropped]
+                    logger.warning(f"Dropped {dropped} activity log entries while the database was unavailable")
+                if self._buffer:
+                    self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+                return
+            finally:
+                self._in_flight = []
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        collections = await self._get_collections()
+        await self.ensure_indexes(collections)
+        await collections['activity_logs'].insert_many(batch, ordered=False)
+        await asyncio.gather(*(
+            self._trim(collections['activity_logs'], user_id)
+            for user_id in {entry["user_id"] for entry in batch}
+        ))
+
+    async def _trim(self, collection, user_id: str) -> None:
+        """Keep only a user's newest ``max_per_user`` entries."""
+        # Timestamps are stored to the millisecond, so entries logged together tie; _id breaks the tie
+        order = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+        cursor = collection.find({"user_id": user_id}, {"timestamp": 1}).sort(order).skip(self.max_per_user).limit(1)
+        first_dropped = await cursor.to_list(length=1)
+        if first_dropped:
+            timestamp, last_id = first_dropped[0]["timestamp"], first_dropped[0]["_id"]
+            await collection.delete_many({
+                "user_id": user_id,
+                "$or": [{"timestamp": {"$lt": timestamp}}, {"timestamp": timestamp, "_id": {"$lte": last_id}}]
+            })
+
+    async def flush(self) -> None:
+        """Write everything buffered now (used on shutdown)."""
+        task = self._flush_task
+        self._flush_task = None
+        if task is not None and not task.done():
+            if self._flushing:
+                # Let the batch being written finish rather than lose it
+                await asyncio.wait([task])
+            else:
+                task.cancel()
+        await self._flush_pending()
+
+
+# Global instance
+activity_log_service = ActivityLogService(
+    flush_seconds=settings.activity_log_flush_seconds,
+    batch_size=settings.activity_log_batch_size,
+    retention_days=settings.activity_log_retention_days,
+    max_per_user=settings.activity_log_max_per_user
+)
@@ -1,6 +1,5 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
-from bson import ObjectId # type: ignore
 import logging
 from collections import defaultdict
 
@@ -9,31 +8,103 @@ from models.dashboard import (
     TrendDirection, HealthScoreAnalytics, MetricAnalytics, MetricDataPoint,
     MedicationAdherence, AdherenceStreaks
 )
-from database import get_database
+from database import get_read_database
+from services.cache_service import analytics_cache
+from services.health_score_service import health_score_service
+from repositories.user_repository import user_repository
+from repositories.metric_repository import metric_repository
+from repositories.intake_repository import intake_repository
+from repositories.condition_repository import condition_repository
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
 
+def extract_metric_value(metric_type: str, value: Any, systolic: Optional[int] = None) -> float:
+    """Extract a numeric value from a stored metric for trend calculation."""
+    try:
+        if metric_type == "blood_pressure" and systolic:
+            return float(systolic)
+        # Try to extract numeric value from string
+        value_str = str(value).split('/')[0]  # For BP like "120/80"
+        return float(''.join(filter(lambda x: x.isdigit() or x == '.', value_str)))
+    except:
+        return 0
+
+
+def calculate_trend(values: List[float]) -> TrendDirection:
+    """Calculate trend direction from values."""
+    if len(values) < 2:
+        return TrendDirection.STABLE
+    
+    # Simple trend calculation: compare first half with second half
+    mid = len(values) // 2
+    first_half_avg = sum(values[:mid]) / mid
+    second_half_avg = sum(values[mid:]) / (len(values) - mid)
+    
+    change_percent = ((second_half_avg - first_half_avg) / first_half_avg * 100) if first_half_avg > 0 else 0
+    
+    if change_percent > 5:
+        return TrendDirection.UP
+    elif change_percent < -5:
+        return TrendDirection.DOWN
+    else:
+        return TrendDirection.STABLE
+
+
+def calculate_streaks(taken_flags: List[bool]) -> Tuple[int, int]:
+    """Calculate (current, longest) adherence streaks from chronologically sorted intakes."""
+    longest_streak = 0
+    temp_streak = 0
+    
+    for taken in taken_flags:
+        if taken:
+            temp_streak += 1
+            longest_streak = max(longest_streak, temp_streak)
+        else:
+            temp_streak = 0
+    
+    # Current streak is the ongoing streak at the end
+    current_streak = temp_streak if taken_flags and taken_flags[-1] else 0
+    return current_streak, longest_streak
+
+
+@traced_class
 class AnalyticsService:
     
     async def _get_collections(self):
         """Get database collections."""
-        db = await get_database()
+        db = await get_read_database()
         return {
             'users': db.users,
-            'health_metrics': db.health_metrics,
             'health_goals': db.health_goals,
             'medication_intakes': db.medication_intakes,
             'medications': db.medications,
             'activity_logs': db.activity_logs
         }
 
+    async def get_cache_etag(self, user_id: str, kind: str, period: AnalyticsPeriod,
+                             metrics: Optional[List[str]] = None) -> Optional[str]:
+        """Get the ETag for an analytics result without computing it."""
+        version = await analytics_cache.get_version(user_id)
+        if version is None:
+            return None
+        cache_key = analytics_cache.make_key(user_id, kind, period.value, metrics)
+        return analytics_cache.make_etag(cache_key, version)
+
     async def get_health_trends(self, user_id: str, period: AnalyticsPeriod = AnalyticsPeriod.MONTH, 
                               metrics: Optional[List[str]] = None) -> HealthTrendsResponse:
         """Get health trends and analytics data."""
         try:
+            # Serve from cache when the user's data hasn't changed
+            version = await analytics_cache.get_version(user_id)
+            cache_key = analytics_cache.make_key(user_id, "health_trends", period.value, metrics)
+            cached = analytics_cache.get(cache_key, version)
+            if cached is not None:
+                return cached
+
             collections = await self._get_collections()
-            
+
             # Calculate date range based on period
             end_date = datetime.utcnow()
             if period == AnalyticsPeriod.WEEK:
@@ -51,11 +122,13 @@ class AnalyticsService:
             # Get metrics analytics
             metrics_analytics = await self._get_metrics_analytics(user_id, start_date, end_date, metrics, collections)
             
-            return HealthTrendsResponse(
+            trends = HealthTrendsResponse(
                 healthScore=health_score_analytics,
                 metrics=metrics_analytics
             )
-            
+            analytics_cache.set(cache_key, version, trends)
+            return trends
+
         except Exception as e:
             logger.error(f"Error getting health trends: {e}")
             return HealthTrendsResponse(
@@ -68,12 +141,22 @@ class AnalyticsService:
         """Calculate health score analytics."""
         try:
             # Get current health score
-            user = await collections['users'].find_one({"_id": ObjectId(user_id)})
-            current_score = user.get("health_score", 0) if user else 0
-            
-            # Calculate trend based on recent activities and metrics
-            # For now, we'll use a simple algorithm based on goal completion and metric trends
-            
+            current_score = await user_repository.get_health_score(user_id) or 0
+            
+            # Prefer the recorded score history for the trend
+            history = await health_score_service.get_score_history(user_id, since=start_date)
+            if history:
+                baseline = history[0].get("previous_score", history[0]["score"])
+                change = ((current_score - baseline) / baseline * 100) if baseline > 0 else float(current_score - baseline)
+                if change > 1:
+                    trend = TrendDirection.UP
+                elif change < -1:
+                    trend = TrendDirection.DOWN
+                else:
+                    trend = TrendDirection.STABLE
+                return HealthScoreAnalytics(current=float(current_score), trend=trend, change=round(change, 1))
+
+            # No score changes in the period; fall back to goal completion
             # Check goal completion rate in period
             total_goals = await collections['health_goals'].count_documents({
                 "user_id": user_id,
@@ -113,25 +196,16 @@ class AnalyticsService:
                                    metric_types: Optional[List[str]], collections: Dict) -> List[MetricAnalytics]:
         """Get metrics analytics."""
         try:
-            # Build query
-            query = {
-                "user_id": user_id,
-                "measured_at": {"$gte": start_date, "$lte": end_date}
-            }
-            
-            if metric_types:
-                # Convert display names to database field names
-                db_metric_types = [mt.lower().replace(" ", "_") for mt in metric_types]
-                query["metric_type"] = {"$in": db_metric_types}
+            # Convert display names to database field names
+            db_metric_types = [mt.lower().replace(" ", "_") for mt in metric_types] if metric_types else None
             
             # Get metrics
-            cursor = collections['health_metrics'].find(query).sort("measured_at", 1)
-            metrics = await cursor.to_list(length=None)
+            metrics = await metric_repository.get_points(user_id, start_date, end_date, db_metric_types)
             
             # Group by metric type
             grouped_metrics = defaultdict(list)
             for metric in metrics:
-                grouped_metrics[metric["metric_type"]].append(metric)
+                grouped_metrics[metric.metric_type].append(metric)
             
             # Calculate analytics for each metric type
             analytics = []
@@ -140,25 +214,17 @@ class AnalyticsService:
                 values = []
                 
                 for metric in metric_list:
-                    date_str = metric["measured_at"].strftime("%Y-%m-%d")
+                    date_str = metric.measured_at.strftime("%Y-%m-%d")
                     
                     # Extract numeric value for trend calculation
-                    try:
-                        if metric_type == "blood_pressure" and metric.get("systolic"):
-                            value = float(metric["systolic"])
-                        else:
-                            # Try to extract numeric value from string
-                            value_str = str(metric["value"]).split('/')[0]  # For BP like "120/80"
-                            value = float(''.join(filter(lambda x: x.isdigit() or x == '.', value_str)))
-                    except:
-                        value = 0
+                    value = extract_metric_value(metric_type, metric.value, metric.systolic)
                     
                     data_points.append(MetricDataPoint(date=date_str, value=value))
                     values.append(value)
                 
                 # Calculate trend and average
                 if len(values) >= 2:
-                    trend = self._calculate_trend(values)
+                    trend = calculate_trend(values)
                     average = sum(values) / len(values)
                 else:
                     trend = TrendDirection.STABLE
@@ -177,30 +243,18 @@ class AnalyticsService:
             logger.error(f"Error getting metrics analytics: {e}")
             return []
 
-    def _calculate_trend(self, values: List[float]) -> TrendDirection:
-        """Calculate trend direction from values."""
-        if len(values) < 2:
-            return TrendDirection.STABLE
-        
-        # Simple trend calculation: compare first half with second half
-        mid = len(values) // 2
-        first_half_avg = sum(values[:mid]) / mid
-        second_half_avg = sum(values[mid:]) / (len(values) - mid)
-        
-        change_percent = ((second_half_avg - first_half_avg) / first_half_avg * 100) if first_half_avg > 0 else 0
-        
-        if change_percent > 5:
-            return TrendDirection.UP
-        elif change_percent < -5:
-            return TrendDirection.DOWN
-        else:
-            return TrendDirection.STABLE
-
     async def get_medication_adherence(self, user_id: str, period: AnalyticsPeriod = AnalyticsPeriod.MONTH) -> MedicationAdherenceResponse:
         """Get medication adherence statistics."""
         try:
+            # Serve from cache when the user's data hasn't changed
+            version = await analytics_cache.get_version(user_id)
+            cache_key = analytics_cache.make_key(user_id, "medication_adherence", period.value)
+            cached = analytics_cache.get(cache_key, version)
+            if cached is not None:
+                return cached
+
             collections = await self._get_collections()
-            
+
             # Calculate date range
             end_date = datetime.utcnow()
             if period == AnalyticsPeriod.WEEK:
@@ -211,23 +265,21 @@ class AnalyticsService:
                 start_date = end_date - timedelta(days=30)
             
             # Get medication intake records
-            intake_cursor = collections['medication_intakes'].find({
-                "user_id": user_id,
-                "scheduled_time": {"$gte": start_date, "$lte": end_date}
-            })
-            intakes = await intake_cursor.to_list(length=None)
+            intakes = await intake_repository.get_records(user_id, start_date, end_date)
             
             if not intakes:
                 # Generate sample data if no records exist
-                return await self._generate_sample_adherence_data(user_id, collections)
+                sample = await self._generate_sample_adherence_data(user_id, collections)
+                analytics_cache.set(cache_key, version, sample)
+                return sample
             
             # Group by medication
             medication_stats = defaultdict(lambda: {"taken": 0, "missed": 0, "total": 0})
             
             for intake in intakes:
-                med_name = intake["medication_name"]
+                med_name = intake.medication_name
                 medication_stats[med_name]["total"] += 1
-                if intake.get("taken", False):
+                if intake.taken:
                     medication_stats[med_name]["taken"] += 1
                 else:
                     medication_stats[med_name]["missed"] += 1
@@ -254,12 +306,14 @@ class AnalyticsService:
             # Calculate streaks
             streaks = await self._calculate_medication_streaks(user_id, collections)
             
-            return MedicationAdherenceResponse(
+            adherence = MedicationAdherenceResponse(
                 overallAdherence=overall_adherence,
                 medications=medications,
                 streaks=streaks
             )
-            
+            analytics_cache.set(cache_key, version, adherence)
+            return adherence
+
         except Exception as e:
             logger.error(f"Error getting medication adherence: {e}")
             return MedicationAdherenceResponse(
@@ -272,16 +326,16 @@ class AnalyticsService:
         """Generate sample adherence data when no records exist."""
         try:
             # Check if user has any medical conditions to create realistic sample data
-            conditions = await collections['medical_conditions'].find({"user_id": user_id}).to_list(length=None)
+            condition_names = await condition_repository.get_condition_names(user_id)
             
             sample_medications = []
-            if any("diabetes" in condition["name"].lower() for condition in conditions):
+            if any("diabetes" in name for name in condition_names):
                 sample_medications.extend([
                     MedicationAdherence(name="Metformin", adherence=85.0, missed=3, taken=17),
                     MedicationAdherence(name="Insulin", adherence=95.0, missed=1, taken=19)
                 ])
             
-            if any("hypertension" in condition["name"].lower() or "blood pressure" in condition["name"].lower() for condition in conditions):
+            if any("hypertension" in name or "blood pressure" in name for name in condition_names):
                 sample_medications.append(
                     MedicationAdherence(name="Lisinopril", adherence=90.0, missed=2, taken=18)
                 )
@@ -315,32 +369,9 @@ class AnalyticsService:
         try:
             # Get recent intake records (last 60 days)
             start_date = datetime.utcnow() - timedelta(days=60)
-            cursor = collections['medication_intakes'].find({
-                "user_id": user_id,
-                "scheduled_time": {"$gte": start_date}
-            }).sort("scheduled_time", 1)
-            
-            intakes = await cursor.to_list(length=None)
-            
-            if not intakes:
-                return AdherenceStreaks(current=0, longest=0)
-            
-            # Calculate streaks
-            current_streak = 0
-            longest_streak = 0
-            temp_streak = 0
-            
-            for intake in intakes:
-                if intake.get("taken", False):
-                    temp_streak += 1
-                    longest_streak = max(longest_streak, temp_streak)
-                else:
-                    temp_streak = 0
-            
-            # Current streak is the ongoing streak at the end
-            if intakes and intakes[-1].get("taken", False):
-                current_streak = temp_streak
+            taken_flags = await intake_repository.get_taken_flags(user_id, start_date)
             
+            current_streak, longest_streak = calculate_streaks(taken_flags)
             return AdherenceStreaks(current=current_streak, longest=longest_streak)
             
         except Exception as e:
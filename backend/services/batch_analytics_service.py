@@ -0,0 +1,281 @@
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
+from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pymongo import ReplaceOne, ASCENDING # type: ignore
+import asyncio
+import logging
+import os
+import time
+
+from database import get_database
+from repositories.metric_repository import metric_repository
+from services.analytics_service import extract_metric_value, calculate_trend, calculate_streaks
+from services.health_score_service import score_from_inputs
+
+logger = logging.getLogger(__name__)
+
+# Fields needed from each collection; everything else stays on the server
+METRIC_PROJECTION = {"_id": 0, "user_id": 1, "metric_type": 1, "value": 1, "systolic": 1, "status": 1, "measured_at": 1}
+INTAKE_PROJECTION = {"_id": 0, "user_id": 1, "medication_name": 1, "taken": 1, "scheduled_time": 1}
+
+
+def compute_user_analytics(user_id: str, metrics: List[Dict[str, Any]], intakes: List[Dict[str, Any]],
+                           goals: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Compute trends, adherence and health-score inputs for one user.
+
+    Pure function so it can run in a worker process. ``metrics`` and
+    ``intakes`` must already be sorted chronologically.
+    """
+    # Metric trends
+    grouped_values: Dict[str, List[float]] = defaultdict(list)
+    normal_count = 0
+    for metric in metrics:
+        grouped_values[metric["metric_type"]].append(extract_metric_value(metric["metric_type"], metric["value"], metric.get("systolic")))
+        if metric.get("status") == "normal":
+            normal_count += 1
+
+    metric_trends = []
+    for metric_type, values in grouped_values.items():
+        metric_trends.append({
+            "type": metric_type,
+            "count": len(values),
+            "average": sum(values) / len(values),
+            "latest": values[-1],
+            "trend": calculate_trend(values).value
+        })
+
+    # Medication adherence
+    medication_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"taken": 0, "missed": 0})
+    for intake in intakes:
+        stats = medication_stats[intake["medication_name"]]
+        if intake.get("taken", False):
+            stats["taken"] += 1
+        else:
+            stats["missed"] += 1
+
+    medications = []
+    total_taken = 0
+    for name, stats in medication_stats.items():
+        total = stats["taken"] + stats["missed"]
+        medications.append({
+            "name": name,
+            "taken": stats["taken"],
+            "missed": stats["missed"],
+            "adherence": stats["taken"] / total * 100 if total > 0 else 0
+        })
+        total_taken += stats["taken"]
+
+    current_streak, longest_streak = calculate_streaks([intake.get("taken", False) for intake in intakes])
+
+    score_inputs = {
+        "metrics_total": len(metrics),
+        "metrics_normal": normal_count,
+        "goals_total": goals.get("total", 0),
+        "goals_completed": goals.get("completed", 0),
+        "intakes_total": len(intakes),
+        "intakes_taken": total_taken
+    }
+
+    return {
+        "user_id": user_id,
+        "metrics": metric_trends,
+        "adherence": {
+            "overall": total_taken / len(intakes) * 100 if intakes else 0,
+            "medications": medications,
+            "streaks": {"current": current_streak, "longest": longest_streak}
+        },
+        "score_inputs": score_inputs,
+        "health_score": score_from_inputs(score_inputs)
+    }
+
+
+def compute_chunk(chunk: List[Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, int]]]) -> List[Dict[str, Any]]:
+    """Compute analytics for a chunk of users (runs in a worker process)."""
+    return [compute_user_analytics(user_id, metrics, intakes, goals) for user_id, metrics, intakes, goals in chunk]
+
+
+async def _iter_grouped_by_user(cursor) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Group consecutive documents of a user-sorted cursor by user_id."""
+    current_user: Optional[str] = None
+    group: List[Dict[str, Any]] = []
+    async for doc in cursor:
+        if doc["user_id"] != current_user:
+            if group:
+                yield current_user, group # type: ignore
+            current_user = doc["user_id"]
+            group = []
+        group.append(doc)
+    if group:
+        yield current_user, group # type: ignore
+
+
+class BatchAnalyticsService:
+    """
+    Offline engine that computes analytics for every user in one pass.
+
+    ``health_metrics`` and ``medication_intakes`` are streamed with cursors
+    sorted by user and merge-joined, so only one user's rows per collection are
+    held at a time. Users are handed to a process pool in chunks and results
+    are upserted into ``precomputed_analytics``.
+    """
+
+    def __init__(self, window_days: int = 90, chunk_size: int = 500,
+                 workers: Optional[int] = None, batch_size: int = 1000):
+        self.window_days = window_days
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+    async def _get_collections(self):
+        """Get database collections."""
+        db = await get_database()
+        return {
+            'medication_intakes': db.medication_intakes,
+            'health_goals': db.health_goals,
+            'precomputed_analytics': db.precomputed_analytics
+        }
+
+    async def ensure_indexes(self, collections: Dict) -> None:
+        """Create the indexes the user-sorted scans rely on."""
+        await metric_repository.ensure_collection()
+        await collections['medication_intakes'].create_index([("user_id", ASCENDING), ("scheduled_time", ASCENDING)])
+        await collections['precomputed_analytics'].create_index([("user_id", ASCENDING)], unique=True)
+
+    async def _load_goal_counts(self, collections: Dict) -> Dict[str, Dict[str, int]]:
+        """Aggregate goal totals per user on the server."""
+        pipeline = [
+            {"$group": {
+                "_id": "$user_id",
+                "total": {"$sum": 1},
+                "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+            }}
+        ]
+        counts = {}
+        async for row in collections['health_goals'].aggregate(pipeline):
+            counts[row["_id"]] = {"total": row["total"], "completed": row["completed"]}
+        return counts
+
+    async def _iter_users(self, collections: Dict, start_date: datetime,
+                          goal_counts: Dict[str, Dict[str, int]]):
+        """Merge-join the user-sorted metric and intake streams."""
+        metrics_cursor = metric_repository.iter_since(start_date, METRIC_PROJECTION, self.batch_size)
+        intakes_cursor = collections['medication_intakes'].find(
+            {"scheduled_time": {"$gte": start_date}}, INTAKE_PROJECTION
+        ).sort([("user_id", ASCENDING), ("scheduled_time", ASCENDING)]).batch_size(self.batch_size)
+
+        metric_groups = _iter_grouped_by_user(metrics_cursor)
+        intake_groups = _iter_grouped_by_user(intakes_cursor)
+        next_metric = await anext(metric_groups, None)
+        next_intake = await anext(intake_groups, None)
+        seen = set()
+
+        while next_metric is not None or next_intake is not None:
+            metric_user = next_metric[0] if next_metric else None
+            intake_user = next_intake[0] if next_intake else None
+
+            if intake_user is None or (metric_user is not None and metric_user < intake_user):
+                user_id, metrics, intakes = metric_user, next_metric[1], [] # type: ignore
+                next_metric = await anext(metric_groups, None)
+            elif metric_user is None or intake_user < metric_user:
+                user_id, metrics, intakes = intake_user, [], next_intake[1] # type: ignore
+                next_intake = await anext(intake_groups, None)
+            else:
+                user_id, metrics, intakes = metric_user, next_metric[1], next_intake[1] # type: ignore
+                next_metric = await anext(metric_groups, None)
+                next_intake = await anext(intake_groups, None)
+
+            seen.add(user_id)
+            yield user_id, metrics, intakes, goal_counts.get(user_id, {})
+
+        # Users with goals but no metrics or intakes in the window
+        for user_id, goals in goal_counts.items():
+            if user_id not in seen:
+                yield user_id, [], [], goals
+
+    async def _write_results(self, collections: Dict, results: List[Dict[str, Any]], computed_at: datetime) -> None:
+        """Upsert a chunk of results into the precomputed collection."""
+        if not results:
+            return
+        operations = []
+        for result in results:
+            result["computed_at"] = computed_at
+            result["window_days"] = self.window_days
+            operations.append(ReplaceOne({"user_id": result["user_id"]}, result, upsert=True))
+        await collections['precomputed_analytics'].bulk_write(operations, ordered=False)
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the batch job and return throughput statistics."""
+        collections = await self._get_collections()
+        await self.ensure_indexes(collections)
+
+        started = time.perf_counter()
+        computed_at = datetime.utcnow()
+        start_date = computed_at - timedelta(days=self.window_days)
+        goal_counts = await self._load_goal_counts(collections)
+
+        loop = asyncio.get_running_loop()
+        users_processed = 0
+        chunk: List[Tuple] = []
+        pending: List[asyncio.Future] = []
+
+        async def drain(max_pending: int) -> None:
+            nonlocal users_processed
+            while len(pending) > max_pending:
+                results = await pending.pop(0)
+                await self._write_results(collections, results, computed_at)
+                users_processed += len(results)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            async for row in self._iter_users(collections, start_date, goal_counts):
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    pending.append(loop.run_in_executor(pool, compute_chunk, chunk))
+                    chunk = []
+                    # Bound memory: keep at most two chunks in flight per worker
+                    await drain(self.workers * 2)
+
+            if chunk:
+                pending.append(loop.run_in_executor(pool, compute_chunk, chunk))
+            await drain(0)
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "users": users_processed,
+            "elapsed_seconds": round(elapsed, 3),
+            "users_per_second": round(users_processed / elapsed, 1) if elapsed > 0 else 0.0,
+            "workers": self.workers,
+            "chunk_size": self.chunk_size,
+            "window_days": self.window_days
+        }
+        logger.info(f"Batch analytics complete: {stats}")
+        return stats
+
+
+async def _main(args) -> None:
+    from database import connect_to_mongo, close_mongo_connection
+
+    await connect_to_mongo()
+    try:
+        service = BatchAnalyticsService(
+            window_days=args.days,
+            chunk_size=args.chunk_size,
+            workers=args.workers
+        )
+        stats = await service.run()
+        print(f"Processed {stats['users']} users in {stats['elapsed_seconds']}s "
+              f"({stats['users_per_second']} users/s, {stats['workers']} workers)")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compute analytics for all users into precomputed_analytics")
+    parser.add_argument("--days", type=int, default=90, help="Analytics window in days")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users per worker task")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
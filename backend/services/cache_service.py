@@ -0,0 +1,118 @@
+from typing import Optional, List, Dict, Any, Tuple
+from collections import OrderedDict
+from datetime import datetime
+from bson import ObjectId # type: ignore
+import hashlib
+import logging
+import time
+
+from config import settings
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsCache:
+    """
+    In-process result cache for per-user analytics.
+
+    Entries are stamped with the user's ``data_version`` (stored on the user
+    document so every worker sees the same value). Writes that affect analytics
+    bump the version, which makes every cached entry for that user stale.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: int = 300, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple, Tuple[int, float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, user_id: str, kind: str, period: str, metrics: Optional[List[str]] = None) -> Tuple:
+        """Build a cache key; metric names are normalized the same way the queries do."""
+        metric_key = tuple(sorted({m.lower().replace(" ", "_") for m in metrics})) if metrics else ()
+        return (user_id, kind, period, metric_key)
+
+    def make_etag(self, key: Tuple, version: int) -> str:
+        """Strong ETag for a cached analytics payload."""
+        # Include the current day so period windows roll over even without writes
+        day = datetime.utcnow().strftime("%Y-%m-%d")
+        digest = hashlib.sha1(f"{key!r}:{version}:{day}".encode("utf-8")).hexdigest()
+        return f'"{digest}"'
+
+    async def get_version(self, user_id: str) -> Optional[int]:
+        """Get the user's current data version, or None if it can't be read."""
+        try:
+            db = await get_database()
+            user = await db.users.find_one({"_id": ObjectId(user_id)}, {"data_version": 1})
+            if not user:
+                return None
+            return int(user.get("data_version", 0))
+        except Exception as e:
+            logger.error(f"Error reading analytics data version: {e}")
+            return None
+
+    async def bump_version(self, user_id: str) -> None:
+        """Invalidate cached analytics for a user after a write."""
+        try:
+            db = await get_database()
+            await db.users.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$inc": {"data_version": 1}}
+            )
+        except Exception as e:
+            logger.error(f"Error bumping analytics data version: {e}")
+        finally:
+            self._drop_user(user_id)
+
+    def get(self, key: Tuple, version: Optional[int]) -> Optional[Any]:
+        """Return a cached value if it matches the version and hasn't expired."""
+        if not self.enabled or version is None:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        entry_version, stored_at, value = entry
+        if entry_version != version or time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Tuple, version: Optional[int], value: Any) -> None:
+        """Store a value computed at the given version."""
+        if not self.enabled or version is None:
+            return
+
+        self._entries[key] = (version, time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _drop_user(self, user_id: str) -> None:
+        """Drop this worker's entries for a user (other workers rely on the version check)."""
+        for key in [k for k in self._entries if k[0] == user_id]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Global instance
+analytics_cache = AnalyticsCache(
+    max_entries=settings.analytics_cache_max_entries,
+    ttl_seconds=settings.analytics_cache_ttl_seconds,
+    enabled=settings.analytics_cache_enabled
+)
@@ -1,7 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase # type: ignore
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Awaitable
 from datetime import datetime
 from bson import ObjectId # type: ignore
+import asyncio
 import logging
 
 from database import get_database
@@ -9,12 +10,33 @@ from models.chat import (
     ChatMessage, ChatSession, ChatDocument,
     MessageTypeEnum, LanguageEnum
 )
+from models.job import JobTypeEnum
 from services.document_service import document_service
+from services.file_service import file_service
 from services.openai_service import openai_service
+from services.openai_scheduler import OpenAIUnavailableError
+from services.job_service import job_service
+from services.retrieval_service import retrieval_service
+from services.lab_extractor import lab_value_extractor
+from services.health_service import health_service
+from config import settings
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
+# Fields rendered by ChatSessionMessagesResponse
+MESSAGE_ROW_PROJECTION = {"type": 1, "content": 1, "timestamp": 1, "language": 1, "has_file": 1}
 
+# progress(percent, stage)
+ProgressCallback = Callable[[int, str], Awaitable[None]]
+
+
+async def _report(progress: Optional[ProgressCallback], percent: int, stage: str) -> None:
+    if progress is not None:
+        await progress(percent, stage)
+
+
+@traced_class
 class ChatService:
     def __init__(self):
         self.db: AsyncIOMotorDatabase = None
@@ -137,6 +159,37 @@ class ChatService:
         except Exception as e:
             logger.error(f"Error getting session messages: {e}")
             return []
+
+    async def get_session_message_rows(
+        self,
+        session_id: str,
+        user_id: str,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get messages for a session as rows shaped like ChatSessionMessagesResponse"""
+        try:
+            db = await self.get_db()
+            
+            cursor = db.chat_messages.find(
+                {"session_id": session_id, "user_id": user_id},
+                MESSAGE_ROW_PROJECTION
+            ).sort("timestamp", 1).limit(limit)
+            
+            return [
+                {
+                    "id": str(message["_id"]),
+                    "type": message["type"],
+                    "content": message["content"],
+                    "timestamp": message["timestamp"].isoformat(),
+                    "language": message["language"],
+                    "has_file": message.get("has_file", False)
+                }
+                async for message in cursor
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error getting session message rows: {e}")
+            return []
     
     async def get_user_sessions(
         self,
@@ -258,6 +311,8 @@ class ChatService:
                 "_id": ObjectId(file_id),
                 "user_id": user_id
             })
+            if result.deleted_count > 0:
+                await retrieval_service.delete_document(file_id, user_id)
             
             return result.deleted_count > 0
             
@@ -284,17 +339,44 @@ class ChatService:
             logger.error(f"Error updating session title: {e}")
             return False
     
-    async def process_document_message(
+    async def add_document_upload_message(
         self,
         session_id: str,
         user_id: str,
         file_path: str,
         user_query: Optional[str] = None,
         language: str = "en"
+    ) -> str:
+        """Add the user's "I've uploaded a document" message to a session"""
+        file_name = file_path.split('/')[-1]
+        user_content = f"I've uploaded a document: {file_name}"
+        if user_query:
+            user_content += f". {user_query}"
+
+        return await self.add_message(
+            session_id=session_id,
+            user_id=user_id,
+            content=user_content,
+            message_type=MessageTypeEnum.USER,
+            language=language
+        )
+
+    async def process_document_message(
+        self,
+        session_id: str,
+        user_id: str,
+        file_path: str,
+        user_query: Optional[str] = None,
+        language: str = "en",
+        user_message_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        document_id: Optional[str] = None,
+        original_name: Optional[str] = None
     ) -> Dict[str, Any]:
         """Process a document and create AI response"""
         try:
             # Extract text from document
+            await _report(progress, 5, "extracting")
             logger.info(f"Processing document: {file_path}")
             doc_result = await document_service.process_document_for_chat(file_path)
             
@@ -304,21 +386,24 @@ class ChatService:
                     "error": doc_result.get("error", "Failed to process document")
                 }
             
-            # Add user message about document upload
-            file_name = file_path.split('/')[-1]
-            user_content = f"I've uploaded a document: {file_name}"
-            if user_query:
-                user_content += f". {user_query}"
+            # Add user message about document upload (background jobs add it when queued)
+            if user_message_id is None:
+                user_message_id = await self.add_document_upload_message(
+                    session_id, user_id, file_path, user_query, language
+                )
             
-            user_message_id = await self.add_message(
-                session_id=session_id,
-                user_id=user_id,
-                content=user_content,
-                message_type=MessageTypeEnum.USER,
-                language=language
-            )
+            # Index the chunks so this and later questions only send the relevant ones
+            file_name = file_path.split('/')[-1]
+            chunks = doc_result["chunks"]
+            selected = list(range(len(chunks)))
+            index = await self.remember_document(document_id, user_id, session_id, original_name or file_name, chunks)
+            if user_query and len(chunks) > settings.retrieval_top_k:
+                # Nothing matched: fall back to reading the whole document
+                selected = await retrieval_service.search(index, user_query, settings.retrieval_top_k) or selected
+                chunks = [chunks[i] for i in selected]
             
             # Process document with OpenAI
+            await _report(progress, 20, "analyzing")
             if len(doc_result["chunks"]) == 1:
                 # Single chunk - process directly
                 ai_result = await openai_service.analyze_document(
@@ -329,9 +414,22 @@ class ChatService:
             else:
                 # Multiple chunks - process in chunks
                 ai_result = await openai_service.process_document_chunks(
-                    chunks=doc_result["chunks"],
+                    chunks=chunks,
                     query=user_query,
-                    language=language
+                    language=language,
+                    on_chunk=self._chunk_progress(progress)
+                )
+            
+            # Keep the analysis with the chunks for follow-up questions
+            await _report(progress, 95, "saving")
+            if document_id and user_query:
+                # Answers to the question only cover the retrieved chunks; don't keep them as summaries
+                await retrieval_service.save_answer(document_id, user_query, ai_result.get("content"))
+            elif document_id:
+                await retrieval_service.save_summaries(
+                    document_id,
+                    ai_result.get("content"),
+                    {selected[cs["chunk_index"]]: cs["summary"] for cs in ai_result.get("chunk_summaries", [])}
                 )
             
             # Add AI response message
@@ -359,10 +457,14 @@ class ChatService:
                 "document_info": {
                     "word_count": doc_result.get("word_count", 0),
                     "chunks_processed": doc_result.get("chunk_count", 1),
+                    "chunks_analyzed": len(chunks),
                     "file_type": doc_result.get("file_type", "unknown")
                 }
             }
             
+        except OpenAIUnavailableError:
+            # Let the controller answer 503 with Retry-After
+            raise
         except Exception as e:
             logger.error(f"Error processing document message: {e}")
             return {
@@ -375,11 +477,15 @@ class ChatService:
         session_id: str,
         user_id: str,
         file_path: str,
-        language: str = "en"
+        language: str = "en",
+        progress: Optional[ProgressCallback] = None,
+        document_id: Optional[str] = None,
+        original_name: Optional[str] = None
     ) -> Dict[str, Any]:
         """Get health-specific analysis of medical documents"""
         try:
             # Extract text from document
+            await _report(progress, 5, "extracting")
             doc_result = await document_service.process_document_for_chat(file_path)
             
             if not doc_result["success"]:
@@ -388,13 +494,30 @@ class ChatService:
                     "error": doc_result.get("error", "Failed to process document")
                 }
             
+            file_name = file_path.split('/')[-1]
+            if document_id:
+                await self.remember_document(
+                    document_id, user_id, session_id, original_name or file_name, doc_result["chunks"]
+                )
+            
+            # Structured readings come straight from the text, not from the LLM
+            metrics_recorded = 0
+            if document_id and settings.lab_extraction_enabled:
+                lab_values = await asyncio.to_thread(lab_value_extractor.extract, doc_result["text"])
+                metrics_recorded = await health_service.import_lab_values(
+                    user_id, lab_values, document_id, await file_service.content_hash(file_path),
+                    original_name or file_name
+                )
+            
             # Get health insights
+            await _report(progress, 20, "analyzing")
             if len(doc_result["text"]) > 8000:  # Large document
                 # Use chunked processing for large documents
                 health_result = await openai_service.process_document_chunks(
                     chunks=doc_result["chunks"],
                     query="Provide health insights and key medical information from this document",
-                    language=language
+                    language=language,
+                    on_chunk=self._chunk_progress(progress)
                 )
             else:
                 # Process directly for smaller documents
@@ -404,11 +527,20 @@ class ChatService:
                 )
             
             # Save analysis as a message
-            file_name = file_path.split('/')[-1]
+            await _report(progress, 95, "saving")
+            if document_id:
+                await retrieval_service.save_summaries(
+                    document_id,
+                    health_result.get("content"),
+                    {cs["chunk_index"]: cs["summary"] for cs in health_result.get("chunk_summaries", [])}
+                )
+            content = health_result.get("content", "Analysis completed.")
+            if metrics_recorded:
+                content += f"\n\nI've added {metrics_recorded} reading(s) from this report to your health metrics."
             ai_message_id = await self.add_message(
                 session_id=session_id,
                 user_id=user_id,
-                content=health_result.get("content", "Analysis completed."),
+                content=content,
                 message_type=MessageTypeEnum.AI,
                 language=language,
                 confidence=health_result.get("confidence", 0.8)
@@ -419,9 +551,13 @@ class ChatService:
                 "message_id": ai_message_id,
                 "analysis": health_result.get("content", ""),
                 "confidence": health_result.get("confidence", 0.8),
+                "metrics_recorded": metrics_recorded,
                 "document_info": doc_result
             }
             
+        except OpenAIUnavailableError:
+            # Let the controller answer 503 with Retry-After
+            raise
         except Exception as e:
             logger.error(f"Error in health document analysis: {e}")
             return {
@@ -429,6 +565,163 @@ class ChatService:
                 "error": str(e)
             }
 
+    async def remember_document(
+        self,
+        document_id: Optional[str],
+        user_id: str,
+        session_id: Optional[str],
+        file_name: str,
+        chunks: List[str]
+    ):
+        """Index a document's chunks and, if it has an ID, store them as session memory"""
+        index = await retrieval_service.build_index(chunks)
+        if document_id:
+            await retrieval_service.save_index(document_id, user_id, chunks, index, session_id, file_name)
+        return index
+
+    async def get_document_context(self, session_id: str, user_id: str, query: str) -> str:
+        """
+        Excerpts from documents already analyzed in this session that are
+        relevant to ``query``, for follow-up questions without re-uploading
+        """
+        try:
+            documents = await retrieval_service.get_session_documents(
+                session_id, user_id, limit=settings.session_memory_max_documents
+            )
+            if not documents:
+                return ""
+
+            budget = settings.session_memory_max_chars
+            sections = []
+            for document in documents:
+                parts = [f"[Document: {document.file_name or 'uploaded document'}]"]
+                if document.summary:
+                    parts.append(f"Earlier analysis: {document.summary[:500]}")
+                elif document.answer:
+                    parts.append(f"Earlier question: {document.question[:200]}\nEarlier answer: {document.answer[:500]}")
+                remaining = budget - sum(len(part) for part in parts)
+                selected = await retrieval_service.search(
+                    document.index, query, settings.session_memory_chunks_per_document
+                )
+                for i in selected:
+                    excerpt = document.chunks[i]
+                    # Prefer the raw text; fall back to the chunk's summary when it doesn't fit
+                    if len(excerpt) > remaining and document.chunk_summaries and i in document.chunk_summaries:
+                        excerpt = document.chunk_summaries[i]
+                    excerpt = excerpt[:max(0, remaining)]
+                    if excerpt:
+                        parts.append(f"Excerpt: {excerpt}")
+                        remaining -= len(excerpt)
+                section = "\n".join(parts)[:budget]
+                sections.append(section)
+                budget -= len(section)
+                if budget <= 0:
+                    break
+
+            return "\n\n".join(sections)
+
+        except Exception as e:
+            logger.error(f"Error building document context: {e}")
+            return ""
+
+    def _chunk_progress(self, progress: Optional[ProgressCallback]):
+        """Map per-chunk progress onto the 20-90% "analyzing" range of a job"""
+        if progress is None:
+            return None
+
+        async def on_chunk(done: int, total: int) -> None:
+            await progress(20 + int(70 * done / total), f"analyzing chunk {done}/{total}")
+
+        return on_chunk
+
+    async def run_document_analysis_job(
+        self,
+        payload: Dict[str, Any],
+        progress: ProgressCallback
+    ) -> Dict[str, Any]:
+        """Job handler for queued ``analyze-document`` uploads"""
+        result = await self.process_document_message(
+            session_id=payload["session_id"],
+            user_id=payload["user_id"],
+            file_path=payload["file_path"],
+            user_query=payload.get("query"),
+            language=payload.get("language", "en"),
+            user_message_id=payload.get("user_message_id"),
+            progress=progress,
+            document_id=payload.get("document_id"),
+            original_name=payload.get("file_name")
+        )
+        if not result["success"]:
+            raise RuntimeError(result.get("error", "Failed to analyze document"))
+
+        return {
+            "document_id": payload.get("document_id"),
+            "session_id": payload["session_id"],
+            "message_id": result["ai_message_id"],
+            "analysis": result["content"],
+            "confidence": result["confidence"],
+            "document_info": result["document_info"],
+            "file_url": payload.get("file_url")
+        }
+
+    async def run_health_document_job(
+        self,
+        payload: Dict[str, Any],
+        progress: ProgressCallback
+    ) -> Dict[str, Any]:
+        """Job handler for queued ``analyze-health-document`` uploads"""
+        result = await self.get_health_document_analysis(
+            session_id=payload["session_id"],
+            user_id=payload["user_id"],
+            file_path=payload["file_path"],
+            language=payload.get("language", "en"),
+            progress=progress,
+            document_id=payload.get("document_id"),
+            original_name=payload.get("file_name")
+        )
+        if not result["success"]:
+            raise RuntimeError(result.get("error", "Failed to analyze health document"))
+
+        document_info = result["document_info"]
+        return {
+            "document_id": payload.get("document_id"),
+            "session_id": payload["session_id"],
+            "message_id": result["message_id"],
+            "health_analysis": result["analysis"],
+            "confidence": result["confidence"],
+            "metrics_recorded": result["metrics_recorded"],
+            # Chunks and full text stay out of the job document
+            "document_info": {
+                "word_count": document_info.get("word_count", 0),
+                "chunks_processed": document_info.get("chunk_count", 1),
+                "file_type": document_info.get("file_type", "unknown")
+            },
+            "file_url": payload.get("file_url")
+        }
+
+    async def notify_document_job_failed(self, payload: Dict[str, Any], error: str) -> None:
+        """Tell the user in their chat session that a queued analysis gave up"""
+        file_name = payload["file_path"].split('/')[-1]
+        await self.add_message(
+            session_id=payload["session_id"],
+            user_id=payload["user_id"],
+            content=f"Sorry, I couldn't analyze {file_name}. Please try uploading it again.",
+            message_type=MessageTypeEnum.AI,
+            language=payload.get("language", "en"),
+            confidence=0.0
+        )
+
 
 # Global instance
 chat_service = ChatService()
+
+job_service.register(
+    JobTypeEnum.DOCUMENT_ANALYSIS,
+    chat_service.run_document_analysis_job,
+    on_failure=chat_service.notify_document_job_failed
+)
+job_service.register(
+    JobTypeEnum.HEALTH_DOCUMENT_ANALYSIS,
+    chat_service.run_health_document_job,
+    on_failure=chat_service.notify_document_job_failed
+)
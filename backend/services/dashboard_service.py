@@ -9,22 +9,30 @@ from models.dashboard import (
     HealthTipResponse, HealthTrendsResponse, MedicationAdherenceResponse,
     AnalyticsPeriod, Language, TrendDirection, HealthScoreAnalytics,
     MetricAnalytics, MetricDataPoint, MedicationAdherence, AdherenceStreaks,
-    ActivityLog, Reminder, HealthTip, MedicationIntake
+    Reminder, HealthTip, MedicationIntake
 )
-from database import get_database
+from database import get_read_database
+from repositories.user_repository import user_repository
+from repositories.metric_repository import metric_repository
+from repositories.goal_repository import goal_repository
+from repositories.document_repository import document_repository
+from repositories.condition_repository import condition_repository
+from repositories.health_tip_repository import health_tip_repository
+from services.activity_log_service import activity_log_service
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
 
+@traced_class
 class DashboardService:
     
     async def _get_collections(self):
         """Get database collections."""
-        db = await get_database()
+        db = await get_read_database()
         return {
             'users': db.users,
             'medical_conditions': db.medical_conditions,
-            'health_metrics': db.health_metrics,
             'health_goals': db.health_goals,
             'medical_documents': db.medical_documents,
             'chat_sessions': db.chat_sessions,
@@ -61,9 +69,7 @@ class DashboardService:
             }) if 'medications' in collections else 0
             
             # Get user's health score and streak
-            user = await collections['users'].find_one({"_id": ObjectId(user_id)})
-            health_score = user.get("health_score", 0) if user else 0
-            streak = user.get("streak", 0) if user else 0
+            user_stats = await user_repository.get_stats(user_id)
             
             # Count upcoming appointments (next 7 days)
             next_week = datetime.utcnow() + timedelta(days=7)
@@ -86,8 +92,8 @@ class DashboardService:
                 chatSessions=chat_sessions,
                 healthGoalsAchieved=health_goals_achieved,
                 medicationsTracked=medications_tracked,
-                healthScore=health_score,
-                streak=streak,
+                healthScore=user_stats.health_score,
+                streak=user_stats.streak,
                 upcomingAppointments=upcoming_appointments,
                 medicationsDue=medications_due
             )
@@ -102,12 +108,16 @@ class DashboardService:
             activities = []
             collections = await self._get_collections()
             
-            # Get activity logs
+            # Get activity logs, including entries still waiting to be written
             cursor = collections['activity_logs'].find({"user_id": user_id}).sort("timestamp", -1).limit(limit)
-            activity_logs = await cursor.to_list(length=limit)
-            
-            for log in activity_logs:
-                relative_time = self._get_relative_time(log["timestamp"])
+            stored = await cursor.to_list(length=limit)
+            # A batch being written can already be readable, so drop entries seen twice
+            activity_logs = list({log["_id"]: log for log in activity_log_service.pending(user_id) + stored}.values())
+            activity_logs.sort(key=self._occurred_at, reverse=True)
+            
+            for log in activity_logs[:limit]:
+                occurred_at = self._occurred_at(log)
+                relative_time = self._get_relative_time(occurred_at)
                 icon = self._get_activity_icon(log["activity_type"])
                 
                 activities.append(ActivityItem(
@@ -115,12 +125,21 @@ class DashboardService:
                     content=log["activity_content"],
                     time=relative_time,
                     icon=icon,
-                    timestamp=log["timestamp"]
+                    timestamp=occurred_at
                 ))
             
-            # If no activity logs, generate from other collections
-            if not activities:
+            # No activity logs yet (history from before they were kept): build the feed from
+            # other collections once and store it, so later reads only need activity_logs.
+            # The flag on the user document makes this happen once across workers and restarts.
+            if not activities and await user_repository.claim_activity_backfill(user_id):
                 activities = await self._generate_activity_from_data(user_id, limit, collections)
+                now = datetime.utcnow()
+                for activity in activities:
+                    # Stamped now so the TTL index doesn't expire old history right away
+                    activity_log_service.log(
+                        user_id, activity.type, activity.content,
+                        {"backfilled": True, "occurred_at": activity.timestamp}, now
+                    )
             
             return activities[:limit]
             
@@ -128,45 +147,46 @@ class DashboardService:
             logger.error(f"Error getting recent activity: {e}")
             return []
 
+    def _occurred_at(self, log: Dict[str, Any]) -> datetime:
+        # Backfilled entries are stored as of the backfill but show when it happened
+        return log.get("activity_data", {}).get("occurred_at", log["timestamp"])
+
     async def _generate_activity_from_data(self, user_id: str, limit: int, collections: Dict) -> List[ActivityItem]:
         """Generate activity items from existing data when no activity logs exist."""
         activities = []
         
         try:
             # Recent health metrics
-            cursor = collections['health_metrics'].find({"user_id": user_id}).sort("created_at", -1).limit(3)
-            metrics = await cursor.to_list(length=3)
+            metrics = await metric_repository.get_recent(user_id, 3)
             for metric in metrics:
                 activities.append(ActivityItem(
                     type=ActivityType.METRIC,
-                    content=f"Recorded {metric['metric_type'].replace('_', ' ').title()}: {metric['value']} {metric['unit']}",
-                    time=self._get_relative_time(metric["created_at"]),
+                    content=f"Recorded {metric.metric_type.replace('_', ' ').title()}: {metric.value} {metric.unit}",
+                    time=self._get_relative_time(metric.created_at),
                     icon="📊",
-                    timestamp=metric["created_at"]
+                    timestamp=metric.created_at
                 ))
             
             # Recent goals
-            cursor = collections['health_goals'].find({"user_id": user_id}).sort("created_at", -1).limit(2)
-            goals = await cursor.to_list(length=2)
+            goals = await goal_repository.get_recent(user_id, 2)
             for goal in goals:
                 activities.append(ActivityItem(
                     type=ActivityType.GOAL,
-                    content=f"Set goal: {goal['goal_title']}",
-                    time=self._get_relative_time(goal["created_at"]),
+                    content=f"Set goal: {goal.goal_title}",
+                    time=self._get_relative_time(goal.created_at),
                     icon="🎯",
-                    timestamp=goal["created_at"]
+                    timestamp=goal.created_at
                 ))
             
             # Recent documents
-            cursor = collections['medical_documents'].find({"user_id": user_id}).sort("created_at", -1).limit(2)
-            documents = await cursor.to_list(length=2)
+            documents = await document_repository.get_recent(user_id, 2)
             for doc in documents:
                 activities.append(ActivityItem(
                     type=ActivityType.UPLOAD,
-                    content=f"Uploaded document: {doc['document_name']}",
-                    time=self._get_relative_time(doc["created_at"]),
+                    content=f"Uploaded document: {doc.document_name}",
+                    time=self._get_relative_time(doc.created_at),
                     icon="📄",
-                    timestamp=doc["created_at"]
+                    timestamp=doc.created_at
                 ))
             
             # Sort by timestamp
@@ -221,10 +241,10 @@ class DashboardService:
         
         try:
             # Check for active goals
-            goals = await collections['health_goals'].find({"user_id": user_id, "status": "active"}).to_list(length=3)
+            goals = await goal_repository.get_active_deadlines(user_id, 3)
             for goal in goals:
-                if goal.get("deadline"):
-                    deadline = goal["deadline"]
+                if goal.deadline:
+                    deadline = goal.deadline
                     if isinstance(deadline, str):
                         deadline = datetime.fromisoformat(deadline)
                     elif isinstance(deadline, date):
@@ -233,7 +253,7 @@ class DashboardService:
                     if deadline > datetime.utcnow():
                         reminders.append(ReminderResponse(
                             type="goal",
-                            title=f"Check progress: {goal['goal_title']}",
+                            title=f"Check progress: {goal.goal_title}",
                             time=self._format_reminder_time(deadline),
                             urgent=False,
                             timestamp=deadline.isoformat()
@@ -251,17 +271,10 @@ class DashboardService:
             collections = await self._get_collections()
             
             # Get user's medical conditions for personalization
-            user_conditions = await collections['medical_conditions'].find({"user_id": user_id}).to_list(length=None)
-            condition_names = [condition["name"].lower() for condition in user_conditions]
-            
-            # Build query
-            query: Dict[str, Any] = {"is_active": True}
-            if category:
-                query["category"] = category
+            condition_names = await condition_repository.get_condition_names(user_id)
             
             # Get tips
-            cursor = collections['health_tips'].find(query).sort("priority", -1).limit(10)
-            tips = await cursor.to_list(length=10)
+            tips = await health_tip_repository.get_active(category, 10)
             
             # If no tips in DB, create default ones
             if not tips:
@@ -397,19 +410,9 @@ class DashboardService:
 
     # Log activity for tracking
     async def log_activity(self, user_id: str, activity_type: ActivityType, content: str, data: Optional[Dict[str, Any]] = None):
-        """Log user activity."""
+        """Log user activity; written in the next batch, not on the request path."""
         try:
-            collections = await self._get_collections()
-            
-            activity_log = ActivityLog(
-                user_id=user_id,
-                activity_type=activity_type,
-                activity_content=content,
-                activity_data=data or {}
-            )
-            
-            await collections['activity_logs'].insert_one(activity_log.dict(by_alias=True))
-            
+            activity_log_service.log(user_id, activity_type, content, data)
         except Exception as e:
             logger.error(f"Error logging activity: {e}")
 
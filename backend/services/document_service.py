@@ -1,9 +1,17 @@
 import io
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator, List, Iterable
+from dataclasses import dataclass
 from pathlib import Path
 import aiofiles
 
+from config import settings
+from services.text_chunker import TextChunker, tiktoken_counter
+from services.ocr_service import ocr_service
+from utils.metrics import document_extraction_duration, document_pages
+from utils.tracing import traced_class
+
 # PDF processing
 try:
     import PyPDF2
@@ -20,15 +28,29 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+IMAGE_FORMATS = {'.jpg', '.jpeg', '.png'}
+
+
+@dataclass
+class PageText:
+    number: int  # 1-based
+    text: str
+    method: str  # "pdfplumber", "pypdf2", "ocr" or "empty"
+
 
+@traced_class
 class DocumentService:
     def __init__(self):
         self.supported_formats = {
             '.pdf': self.extract_pdf_text,
             '.docx': self.extract_docx_text,
             '.doc': self.extract_docx_text,
-            '.txt': self.extract_txt_text
+            '.txt': self.extract_txt_text,
+            '.jpg': self.extract_image_text,
+            '.jpeg': self.extract_image_text,
+            '.png': self.extract_image_text
         }
+        self.count_tokens = tiktoken_counter()
 
     async def extract_text_from_file(self, file_path: str) -> Dict[str, Any]:
         """Extract text from various document formats"""
@@ -41,22 +63,49 @@ class DocumentService:
                     "error": f"Unsupported file format: {file_extension}",
                     "success": False
                 }
+            if file_extension in IMAGE_FORMATS and not ocr_service.available:
+                return {
+                    "text": "",
+                    "error": "Text can't be read from images: local OCR (tesseract) is not installed",
+                    "success": False
+                }
 
             # Read file content
             async with aiofiles.open(file_path, 'rb') as file:
                 content = await file.read()
 
             # Extract text based on file type
-            extractor = self.supported_formats[file_extension]
-            text = await extractor(content)
-
-            return {
+            max_chars = settings.document_max_chars
+            pdf_result = None
+            with document_extraction_duration.time(file_type=file_extension.lstrip('.')):
+                if file_extension == '.pdf':
+                    pdf_result = await self.extract_pdf_pages(content, max_chars)
+                    pages = [page.text for page in pdf_result["pages"] if page.text]
+                    text = "\n\n".join(pages)
+                else:
+                    extractor = self.supported_formats[file_extension]
+                    text = await extractor(content)
+
+            if pdf_result is not None:
+                # The budget was applied to the page texts; the page separators don't count towards it
+                truncated = pdf_result["truncated"]
+            else:
+                truncated = len(text) > max_chars
+                text = text[:max_chars]
+            result = {
                 "text": text,
                 "word_count": len(text.split()),
                 "char_count": len(text),
+                "truncated": truncated,
                 "success": True,
                 "file_type": file_extension
             }
+            if pdf_result is not None:
+                # Per-page text lets the chunker treat page breaks as block boundaries
+                result["pages"] = pages
+                result["page_count"] = pdf_result["page_count"]
+                result["pages_extracted"] = len(pdf_result["pages"])
+            return result
 
         except Exception as e:
             logger.error(f"Error extracting text from {file_path}: {e}")
@@ -66,41 +115,122 @@ class DocumentService:
                 "success": False
             }
 
-    async def extract_pdf_text(self, content: bytes) -> str:
-        """Extract text from PDF using multiple methods"""
-        text = ""
-        
-        try:
-            # Method 1: Try pdfplumber first (better for complex layouts)
-            if pdfplumber:
-                try:
-                    with pdfplumber.open(io.BytesIO(content)) as pdf:
-                        for page in pdf.pages:
-                            page_text = page.extract_text()
-                            if page_text:
-                                text += page_text + "\n"
-                    
-                    if text.strip():
-                        return text.strip()
-                except Exception as e:
-                    logger.warning(f"pdfplumber extraction failed: {e}")
-
-            # Method 2: Fallback to PyPDF2
-            if PyPDF2 and not text.strip():
-                try:
-                    pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-                    for page in pdf_reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                except Exception as e:
-                    logger.warning(f"PyPDF2 extraction failed: {e}")
-
-            return text.strip()
+    def iter_pdf_pages(self, content: bytes) -> Iterator[PageText]:
+        """
+        Yield each page's text as it is extracted.
+
+        pdfplumber handles complex layouts better, so it goes first; PyPDF2 is
+        only opened, lazily, for pages where pdfplumber finds no text.
+        """
+        plumber = None
+        if pdfplumber:
+            try:
+                plumber = pdfplumber.open(io.BytesIO(content))
+            except Exception as e:
+                logger.warning(f"pdfplumber could not open PDF: {e}")
+
+        fallback_reader = None
+
+        def fallback_text(index: int) -> str:
+            nonlocal fallback_reader
+            if PyPDF2 is None:
+                return ""
+            if fallback_reader is None:
+                fallback_reader = PyPDF2.PdfReader(io.BytesIO(content))
+            return fallback_reader.pages[index].extract_text() or ""
 
+        try:
+            if plumber is not None:
+                page_count = len(plumber.pages)
+            elif PyPDF2 is not None:
+                fallback_text(0)
+                page_count = len(fallback_reader.pages) # type: ignore
+            else:
+                raise ImportError("No PDF library available")
+
+            for index in range(page_count):
+                text, method = "", "empty"
+                if plumber is not None:
+                    try:
+                        page = plumber.pages[index]
+                        text = page.extract_text() or ""
+                        page.close()  # release the page's parsed objects
+                        method = "pdfplumber"
+                    except Exception as e:
+                        logger.warning(f"pdfplumber failed on page {index + 1}: {e}")
+
+                if not text.strip():
+                    try:
+                        text = fallback_text(index)
+                        method = "pypdf2"
+                    except Exception as e:
+                        logger.warning(f"PyPDF2 failed on page {index + 1}: {e}")
+
+                text = text.strip()
+                yield PageText(number=index + 1, text=text, method=method if text else "empty")
+        finally:
+            if plumber is not None:
+                plumber.close()
+
+    def _collect_pdf_pages(self, content: bytes, max_chars: Optional[int]) -> Dict[str, Any]:
+        pages: List[PageText] = []
+        total_chars = 0
+        truncated = False
+        page_count = 0
+        for page in self.iter_pdf_pages(content):
+            page_count = page.number
+            if max_chars is not None and total_chars + len(page.text) > max_chars:
+                # Budget reached: keep what fits and stop parsing the rest
+                page.text = page.text[:max_chars - total_chars]
+                pages.append(page)
+                truncated = True
+                break
+            pages.append(page)
+            total_chars += len(page.text)
+        return {"pages": pages, "page_count": page_count, "truncated": truncated}
+
+    def _apply_char_budget(self, pages: List[PageText], max_chars: int) -> bool:
+        """Cut ``pages`` in place to ``max_chars`` in total; True if anything was cut."""
+        total_chars = 0
+        for index, page in enumerate(pages):
+            if total_chars + len(page.text) > max_chars:
+                page.text = page.text[:max_chars - total_chars]
+                del pages[index + 1:]
+                return True
+            total_chars += len(page.text)
+        return False
+
+    async def extract_pdf_pages(self, content: bytes, max_chars: Optional[int] = None) -> Dict[str, Any]:
+        """Extract PDF text page by page, stopping once ``max_chars`` is reached"""
+        try:
+            # Parsing is CPU-bound; keep it off the event loop
+            result = await asyncio.to_thread(self._collect_pdf_pages, content, max_chars)
         except Exception as e:
             logger.error(f"PDF text extraction failed: {e}")
-            return ""
+            return {"pages": [], "page_count": 0, "truncated": False}
+
+        # Scanned pages have no text layer; recognize just those locally
+        empty = {page.number: page for page in result["pages"] if page.method == "empty"}
+        for ocr_page in await ocr_service.ocr_pdf_pages(content, list(empty)):
+            if ocr_page.text:
+                empty[ocr_page.number].text = ocr_page.text
+                empty[ocr_page.number].method = "ocr"
+        if empty and max_chars is not None:
+            # Scanned pages counted as empty while parsing, so the budget is applied again with their text
+            result["truncated"] = self._apply_char_budget(result["pages"], max_chars) or result["truncated"]
+        for page in result["pages"]:
+            document_pages.inc(method=page.method)
+        return result
+
+    async def extract_pdf_text(self, content: bytes) -> str:
+        """Extract text from PDF, page by page with a per-page fallback"""
+        result = await self.extract_pdf_pages(content)
+        return "\n\n".join(page.text for page in result["pages"] if page.text)
+
+    async def extract_image_text(self, content: bytes) -> str:
+        """Extract text from a scanned report or photo with local OCR"""
+        page = await ocr_service.ocr_image(content)
+        return page.text if page else ""
 
     async def extract_docx_text(self, content: bytes) -> str:
         """Extract text from Word documents"""
@@ -146,30 +276,28 @@ class DocumentService:
             logger.error(f"Text file extraction failed: {e}")
             return ""
 
-    def chunk_text(self, text: str, max_chunk_size: int = 4000) -> list[str]:
-        """Split text into chunks for processing"""
-        if len(text) <= max_chunk_size:
-            return [text]
-
-        chunks = []
-        words = text.split()
-        current_chunk = []
-        current_size = 0
-
-        for word in words:
-            word_size = len(word) + 1  # +1 for space
-            if current_size + word_size > max_chunk_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_size = word_size
-            else:
-                current_chunk.append(word)
-                current_size += word_size
-
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-
-        return chunks
+    def chunk_text(
+        self,
+        text: str,
+        target_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None
+    ) -> list[str]:
+        """Split text into chunks of about ``target_tokens`` along paragraph, section and table boundaries"""
+        chunker = TextChunker(
+            target_tokens=target_tokens or settings.document_chunk_tokens,
+            overlap_tokens=settings.document_chunk_overlap_tokens if overlap_tokens is None else overlap_tokens,
+            count_tokens=self.count_tokens
+        )
+        return chunker.chunk(text) or [text]
+
+    def chunk_pages(self, pages: Iterable[str]) -> list[str]:
+        """Chunk page texts without joining them first; page breaks count as block boundaries"""
+        chunker = TextChunker(
+            target_tokens=settings.document_chunk_tokens,
+            overlap_tokens=settings.document_chunk_overlap_tokens,
+            count_tokens=self.count_tokens
+        )
+        return chunker.chunk_pages(pages) or [""]
 
     async def process_document_for_chat(self, file_path: str) -> Dict[str, Any]:
         """Process document and prepare it for chat integration"""
@@ -186,7 +314,10 @@ class DocumentService:
             summary = self.create_document_summary(text)
             
             # Chunk the text for processing
-            chunks = self.chunk_text(text)
+            if "pages" in extraction_result:
+                chunks = self.chunk_pages(extraction_result["pages"])
+            else:
+                chunks = self.chunk_text(text)
 
             return {
                 "success": True,
@@ -196,6 +327,8 @@ class DocumentService:
                 "chunk_count": len(chunks),
                 "word_count": extraction_result["word_count"],
                 "char_count": extraction_result["char_count"],
+                "page_count": extraction_result.get("page_count"),
+                "truncated": extraction_result.get("truncated", False),
                 "file_type": extraction_result["file_type"]
             }
 
@@ -0,0 +1,127 @@
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+from datetime import datetime
+from bson import ObjectId # type: ignore
+import logging
+import zlib
+
+from database import get_read_database
+from repositories.metric_repository import metric_repository
+from config import settings
+from utils.json_response import dumps
+from utils.metrics import export_records
+from utils.tracing import traced_class
+
+logger = logging.getLogger(__name__)
+
+# Exported in this order; a cursor names the collection and the last _id written
+EXPORT_COLLECTIONS = (
+    "medical_conditions", "health_metrics", "health_goals",
+    "medical_documents", "chat_sessions", "chat_messages"
+)
+# Stored file locations and keys stay on the server
+EXCLUDED_FIELDS = {
+    "medical_documents": ("file_path", "encryption_key"),
+}
+
+
+class InvalidExportCursor(ValueError):
+    pass
+
+
+def encode_cursor(collection: str, last_id: Any) -> str:
+    return f"{collection}:{last_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Any]:
+    """(collection, last _id) from a cursor written by encode_cursor."""
+    collection, _, last_id = cursor.partition(":")
+    if collection not in EXPORT_COLLECTIONS or not last_id:
+        raise InvalidExportCursor(f"Invalid export cursor: {cursor}")
+    return collection, ObjectId(last_id) if ObjectId.is_valid(last_id) else last_id
+
+
+@traced_class
+class ExportService:
+    """
+    Streams a user's health record as NDJSON.
+
+    Each collection is read with a server-side cursor in ``_id`` order, one
+    batch at a time, so memory stays bounded by the batch size. Every record
+    line carries a cursor; passing the last one received resumes the export
+    right after that record. The final line is ``{"complete": true, ...}``,
+    so a client can tell a finished export from an interrupted one.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+
+    async def stream_user_export(self, user_id: str, cursor: Optional[str] = None,
+                                 compress: bool = False) -> AsyncIterator[bytes]:
+        """NDJSON lines for ``user_id``, a batch per chunk, optionally as one gzip stream."""
+        lines = self._iter_batches(user_id, *(decode_cursor(cursor) if cursor else (None, None)))
+        if not compress:
+            async for chunk in lines:
+                yield chunk
+            return
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+        async for chunk in lines:
+            # Flush per batch so a client receives (and can resume from) whole records
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+    async def _iter_batches(self, user_id: str, resume_collection: Optional[str],
+                            resume_after: Any) -> AsyncIterator[bytes]:
+        counts: Dict[str, int] = {}
+        collections = EXPORT_COLLECTIONS
+        if resume_collection:
+            collections = collections[collections.index(resume_collection):]
+
+        try:
+            for collection in collections:
+                after = resume_after if collection == resume_collection else None
+                counts[collection] = 0
+                batch: List[bytes] = []
+                async for doc in self._iter_collection(collection, user_id, after):
+                    batch.append(self._line(collection, doc))
+                    if len(batch) >= self.batch_size:
+                        counts[collection] += len(batch)
+                        yield b"".join(batch)
+                        batch = []
+                if batch:
+                    counts[collection] += len(batch)
+                    yield b"".join(batch)
+                export_records.inc(counts[collection], collection=collection)
+        except Exception as e:
+            # Headers are already sent; stop without the completion line so the client resumes
+            logger.error(f"Error exporting health record for user {user_id}: {e}")
+            return
+
+        yield dumps({"complete": True, "counts": counts, "exported_at": datetime.utcnow()}) + b"\n"
+
+    async def _iter_collection(self, collection: str, user_id: str, after: Any) -> AsyncIterator[Dict[str, Any]]:
+        if collection == "health_metrics":
+            async for doc in metric_repository.iter_for_user(user_id, after, self.batch_size):
+                yield doc
+            return
+
+        db = await get_read_database()
+        query: Dict[str, Any] = {"user_id": user_id}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        projection = {field: 0 for field in EXCLUDED_FIELDS.get(collection, ())} or None
+        cursor = db[collection].find(query, projection).sort("_id", 1).batch_size(self.batch_size)
+        async for doc in cursor:
+            yield doc
+
+    def _line(self, collection: str, doc: Dict[str, Any]) -> bytes:
+        doc.pop("user_id", None)
+        return dumps({
+            "collection": collection,
+            "cursor": encode_cursor(collection, doc["_id"]),
+            "record": doc
+        }) + b"\n"
+
+
+# Create singleton instance
+export_service = ExportService(batch_size=settings.export_batch_size)
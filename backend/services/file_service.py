@@ -1,16 +1,21 @@
 import os
+import asyncio
 import aiofiles
 import base64
-from typing import Optional, Tuple
+import hashlib
+from typing import Optional, Set, Tuple
 from fastapi import UploadFile # type: ignore
 import uuid
 from pathlib import Path
 import logging
 from config import settings
+from utils.compression import is_precompressible, precompress_file, remove_variants
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
 
+@traced_class
 class FileService:
     def __init__(self):
         self.upload_dir = Path("uploads")
@@ -21,6 +26,8 @@ class FileService:
         # Create directories if they don't exist
         for dir_path in [self.upload_dir, self.audio_dir, self.documents_dir, self.temp_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
+        # Precompression running after the save returned; referenced so the tasks aren't collected
+        self._precompress_tasks: Set[asyncio.Task] = set()
     
     async def save_uploaded_file(
         self,
@@ -46,6 +53,7 @@ class FileService:
             content = await file.read()
             async with aiofiles.open(file_path, "wb") as f:
                 await f.write(content)
+            self._precompress_later(file_path)
             
             file_size = len(content)
             return file_id, relative_path, file_size
@@ -81,6 +89,7 @@ class FileService:
             # Save file
             async with aiofiles.open(file_path, "wb") as f:
                 await f.write(file_content)
+            self._precompress_later(file_path)
             
             file_size = len(file_content)
             return file_id, relative_path, file_size
@@ -89,6 +98,23 @@ class FileService:
             logger.error(f"Error saving base64 file: {e}")
             raise
     
+    def _precompress_later(self, file_path: Path) -> None:
+        """Write .br/.gz variants for /static to serve, off the request path; the original is served until then"""
+        if not settings.static_precompress or not is_precompressible(str(file_path)):
+            return
+        task = asyncio.create_task(self._precompress(file_path))
+        self._precompress_tasks.add(task)
+        task.add_done_callback(self._precompress_tasks.discard)
+
+    async def _precompress(self, file_path: Path) -> None:
+        try:
+            await asyncio.to_thread(precompress_file, str(file_path), settings.compression_min_bytes)
+            if not file_path.exists():
+                # Deleted while the variants were being written
+                remove_variants(str(file_path))
+        except Exception as e:
+            logger.warning(f"Could not precompress {file_path}: {e}")
+    
     async def read_file_content(self, file_path: str) -> bytes:
         """Read file content as bytes"""
         try:
@@ -98,11 +124,23 @@ class FileService:
             logger.error(f"Error reading file: {e}")
             raise
     
+    async def content_hash(self, file_path: str) -> str:
+        """SHA-256 of a file's content, read in blocks off the event loop"""
+        def digest() -> str:
+            sha = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(block)
+            return sha.hexdigest()
+
+        return await asyncio.to_thread(digest)
+
     async def delete_file(self, file_path: str) -> bool:
         """Delete file from filesystem"""
         try:
             if os.path.exists(file_path):
                 os.remove(file_path)
+                remove_variants(file_path)
                 return True
             return False
         except Exception as e:
@@ -0,0 +1,229 @@
+from typing import Optional, List, Dict, Any, Set
+from datetime import datetime, timedelta
+from bson import ObjectId # type: ignore
+from pymongo import UpdateOne # type: ignore
+import asyncio
+import logging
+
+from config import settings
+from database import get_database
+from services.cache_service import analytics_cache
+from repositories.metric_repository import metric_repository
+
+logger = logging.getLogger(__name__)
+
+# Component weights; components without data are left out and the rest rescaled
+SCORE_WEIGHTS = {
+    "metrics": 0.4,
+    "goals": 0.3,
+    "adherence": 0.3
+}
+
+
+def score_from_inputs(inputs: Dict[str, int]) -> int:
+    """
+    Compute a 0-100 health score from aggregated inputs.
+
+    Inputs use the same shape as the batch analytics ``score_inputs``:
+    metrics_total/metrics_normal, goals_total/goals_completed and
+    intakes_total/intakes_taken.
+    """
+    components = {}
+    if inputs.get("metrics_total"):
+        components["metrics"] = inputs.get("metrics_normal", 0) / inputs["metrics_total"]
+    if inputs.get("goals_total"):
+        components["goals"] = inputs.get("goals_completed", 0) / inputs["goals_total"]
+    if inputs.get("intakes_total"):
+        components["adherence"] = inputs.get("intakes_taken", 0) / inputs["intakes_total"]
+
+    if not components:
+        return 0
+
+    total_weight = sum(SCORE_WEIGHTS[name] for name in components)
+    score = sum(SCORE_WEIGHTS[name] * value for name, value in components.items()) / total_weight
+    return int(round(score * 100))
+
+
+class HealthScoreService:
+    """
+    Incremental health score pipeline.
+
+    Writes that affect the score call ``schedule_recompute``. Requests are
+    debounced: the first one starts a timer, and every user queued before it
+    fires is recomputed together with one aggregation per collection. Scores
+    are stored on the user document (so dashboard reads stay point reads) and
+    changes are appended to ``health_score_history``.
+    """
+
+    def __init__(self, debounce_seconds: float = 5.0, window_days: int = 30):
+        self.debounce_seconds = debounce_seconds
+        self.window_days = window_days
+        self._pending: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushing = False
+
+    async def _get_collections(self):
+        """Get database collections."""
+        db = await get_database()
+        return {
+            'users': db.users,
+            'health_goals': db.health_goals,
+            'medication_intakes': db.medication_intakes,
+            'health_score_history': db.health_score_history
+        }
+
+    def schedule_recompute(self, user_id: str) -> None:
+        """Queue a user for recomputation after the debounce window."""
+        self._pending.add(user_id)
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+            except RuntimeError:
+                # No running loop (e.g. called from a script); recompute on next flush()
+                pass
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.debounce_seconds)
+        await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        self._flushing = True
+        try:
+            # Users queued while a batch is recomputed get no timer of their own; take them here
+            while self._pending:
+                user_ids = list(self._pending)
+                self._pending.clear()
+                await self.recompute(user_ids)
+        finally:
+            self._flushing = False
+
+    async def flush(self) -> None:
+        """Recompute all pending users now (used on shutdown)."""
+        task = self._flush_task
+        self._flush_task = None
+        if task is not None and not task.done():
+            if self._flushing:
+                # Let the running recompute finish rather than lose the users it took
+                await asyncio.wait([task])
+            else:
+                task.cancel()
+        await self._flush_pending()
+
+    async def _compute_inputs(self, user_ids: List[str], collections: Dict) -> Dict[str, Dict[str, int]]:
+        """Aggregate score inputs for a batch of users."""
+        start_date = datetime.utcnow() - timedelta(days=self.window_days)
+        inputs: Dict[str, Dict[str, int]] = {
+            user_id: {
+                "metrics_total": 0, "metrics_normal": 0,
+                "goals_total": 0, "goals_completed": 0,
+                "intakes_total": 0, "intakes_taken": 0
+            }
+            for user_id in user_ids
+        }
+
+        # Metrics may be in a time-series collection; the repository knows the layout
+        metric_counts = await metric_repository.count_by_user(user_ids, start_date)
+        for user_id, (total, good) in metric_counts.items():
+            if user_id in inputs:
+                inputs[user_id]["metrics_total"] = total
+                inputs[user_id]["metrics_normal"] = good
+
+        goals_pipeline = [
+            {"$match": {"user_id": {"$in": user_ids}}},
+            {"$group": {
+                "_id": "$user_id",
+                "total": {"$sum": 1},
+                "good": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+            }}
+        ]
+        intakes_pipeline = [
+            {"$match": {"user_id": {"$in": user_ids}, "scheduled_time": {"$gte": start_date}}},
+            {"$group": {
+                "_id": "$user_id",
+                "total": {"$sum": 1},
+                "good": {"$sum": {"$cond": [{"$eq": ["$taken", True]}, 1, 0]}}
+            }}
+        ]
+
+        for collection, pipeline, total_key, good_key in [
+            ('health_goals', goals_pipeline, "goals_total", "goals_completed"),
+            ('medication_intakes', intakes_pipeline, "intakes_total", "intakes_taken"),
+        ]:
+            async for row in collections[collection].aggregate(pipeline):
+                if row["_id"] in inputs:
+                    inputs[row["_id"]][total_key] = row["total"]
+                    inputs[row["_id"]][good_key] = row["good"]
+
+        return inputs
+
+    async def recompute(self, user_ids: List[str]) -> Dict[str, int]:
+        """Recompute and persist scores for the given users."""
+        try:
+            collections = await self._get_collections()
+            inputs = await self._compute_inputs(user_ids, collections)
+
+            previous = {}
+            cursor = collections['users'].find(
+                {"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}},
+                {"health_score": 1}
+            )
+            async for user in cursor:
+                previous[str(user["_id"])] = user.get("health_score", 0)
+
+            now = datetime.utcnow()
+            scores = {}
+            updates = []
+            history = []
+            for user_id, user_inputs in inputs.items():
+                if user_id not in previous:
+                    continue
+                score = score_from_inputs(user_inputs)
+                scores[user_id] = score
+                if score == previous[user_id]:
+                    continue
+                updates.append(UpdateOne(
+                    {"_id": ObjectId(user_id)},
+                    {"$set": {"health_score": score, "health_score_updated_at": now}}
+                ))
+                history.append({
+                    "user_id": user_id,
+                    "score": score,
+                    "previous_score": previous[user_id],
+                    "inputs": user_inputs,
+                    "computed_at": now
+                })
+
+            if updates:
+                await collections['users'].bulk_write(updates, ordered=False)
+                await collections['health_score_history'].insert_many(history, ordered=False)
+                # Trends embed the current score, so cached results are stale now
+                for entry in history:
+                    await analytics_cache.bump_version(entry["user_id"])
+
+            return scores
+
+        except Exception as e:
+            logger.error(f"Error recomputing health scores: {e}")
+            return {}
+
+    async def get_score_history(self, user_id: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Get a user's score history in chronological order."""
+        try:
+            collections = await self._get_collections()
+            query: Dict[str, Any] = {"user_id": user_id}
+            if since:
+                query["computed_at"] = {"$gte": since}
+            cursor = collections['health_score_history'].find(
+                query, {"_id": 0, "score": 1, "previous_score": 1, "computed_at": 1}
+            ).sort("computed_at", 1)
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error getting health score history: {e}")
+            return []
+
+
+# Create singleton instance
+health_score_service = HealthScoreService(
+    debounce_seconds=settings.health_score_debounce_seconds,
+    window_days=settings.health_score_window_days
+)
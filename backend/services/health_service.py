@@ -1,5 +1,5 @@
-from typing import Optional, List, Dict, Any, Union
-from datetime import datetime, date
+from typing import Optional, List, Dict, Any, Union, AsyncIterator, Tuple
+from datetime import datetime, date, timezone
 from bson import ObjectId # type: ignore
 import logging
 import os
@@ -8,16 +8,27 @@ from fastapi import UploadFile # type: ignore
 
 from models.health import (
     MedicalCondition, MedicalConditionCreate, MedicalConditionUpdate, MedicalConditionResponse,
-    HealthMetric, HealthMetricCreate, HealthMetricResponse,
+    HealthMetric, HealthMetricCreate, HealthMetricReading, HealthMetricResponse,
     HealthGoal, HealthGoalCreate, HealthGoalProgressUpdate, HealthGoalResponse,
     MedicalDocument, MedicalDocumentUpload, MedicalDocumentResponse,
     MetricType, DocumentCategory
 )
+from models.dashboard import ActivityType
 from database import get_database
+from services.cache_service import analytics_cache
+from services.health_score_service import health_score_service
+from services.activity_log_service import activity_log_service
+from repositories.metric_repository import DEVICE_SYNC, metric_repository
+from repositories.document_repository import document_repository
+from services.lab_extractor import LabValue
+from services.analytics_service import extract_metric_value
+from utils.downsample import bucket_size, lttb
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
 
+@traced_class
 class HealthService:
     
     async def _get_collections(self):
@@ -25,12 +36,16 @@ class HealthService:
         db = await get_database()
         return {
             'medical_conditions': db.medical_conditions,
-            'health_metrics': db.health_metrics,
             'health_goals': db.health_goals,
             'medical_documents': db.medical_documents,
             'goal_progress': db.goal_progress
         }
 
+    async def _on_user_data_changed(self, user_id: str) -> None:
+        """Invalidate derived per-user data after a write."""
+        await analytics_cache.bump_version(user_id)
+        health_score_service.schedule_recompute(user_id)
+
     # Medical Conditions Methods
     async def get_medical_conditions(self, user_id: str) -> List[MedicalConditionResponse]:
         """Get all medical conditions for a user."""
@@ -79,6 +94,9 @@ class HealthService:
             
             result = await conditions_collection.insert_one(condition.dict(by_alias=True))
             condition.id = result.inserted_id
+            # Adherence analytics are built from the condition names
+            await analytics_cache.bump_version(user_id)
+            activity_log_service.log(user_id, ActivityType.CONDITION, f"Added condition: {condition.name}")
             
             return MedicalConditionResponse(
                 id=str(condition.id),
@@ -117,6 +135,7 @@ class HealthService:
             )
             
             if result.modified_count > 0:
+                await analytics_cache.bump_version(user_id)
                 updated_condition = await conditions_collection.find_one(
                     {"_id": ObjectId(condition_id), "user_id": user_id}
                 )
@@ -139,53 +158,93 @@ class HealthService:
 
     # Health Metrics Methods
     async def get_health_metrics(self, user_id: str, metric_type: Optional[str] = None, 
-                               date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[HealthMetricResponse]:
-        """Get health metrics for a user."""
+                               date_from: Optional[date] = None, date_to: Optional[date] = None,
+                               max_points: Optional[int] = None, downsample: str = "avg") -> List[Dict[str, Any]]:
+        """
+        Get health metrics for a user as rows shaped like HealthMetricResponse.
+
+        With ``max_points``, each metric type is reduced to at most that many
+        points: time-bucket averages computed by the database (``avg``) or
+        the readings that best keep the chart's shape (``lttb``).
+        """
         try:
-            collections = await self._get_collections()
-            metrics_collection = collections['health_metrics']
-            
-            # Build query
-            query: Dict[str, Any] = {"user_id": user_id}
-            if metric_type:
-                query["metric_type"] = metric_type.lower().replace(" ", "_")
-            if date_from or date_to:
-                date_query: Dict[str, Any] = {}
-                if date_from:
-                    date_query["$gte"] = datetime.combine(date_from, datetime.min.time())
-                if date_to:
-                    date_query["$lte"] = datetime.combine(date_to, datetime.max.time())
-                query["measured_at"] = date_query
-            
-            cursor = metrics_collection.find(query).sort("measured_at", -1)
-            metrics = await cursor.to_list(length=None)
-            
-            response = []
-            for metric in metrics:
-                response.append(HealthMetricResponse(
-                    date=metric["measured_at"].isoformat() if isinstance(metric["measured_at"], datetime) else metric["measured_at"],
-                    type=metric["metric_type"].replace("_", " ").title(),
-                    value=metric["value"],
-                    unit=metric["unit"],
-                    status=metric.get("status", "").title() if metric.get("status") else None,
-                    notes=metric.get("notes")
-                ))
-            
-            return response
+            metric_types = [metric_type.lower().replace(" ", "_")] if metric_type else None
+            start = datetime.combine(date_from, datetime.min.time()) if date_from else None
+            end = datetime.combine(date_to, datetime.max.time()) if date_to else None
+            if max_points and downsample == "avg":
+                return await self._get_bucketed_metrics(user_id, metric_types, start, end, max_points)
+
+            metrics = await metric_repository.list_for_user(user_id, metric_types=metric_types, start=start, end=end)
+            if max_points:
+                metrics = self._decimate_metrics(metrics, max_points)
+            
+            # Projected rows go straight into the response shape, without a model per row
+            return [
+                {
+                    "date": metric["measured_at"].isoformat() if isinstance(metric["measured_at"], datetime) else metric["measured_at"],
+                    "type": metric["metric_type"].replace("_", " ").title(),
+                    "value": metric["value"],
+                    "unit": metric["unit"],
+                    "status": metric["status"].title() if metric.get("status") else None,
+                    "notes": metric.get("notes")
+                }
+                for metric in metrics
+            ]
         except Exception as e:
             logger.error(f"Error getting health metrics: {e}")
             return []
 
+    async def _get_bucketed_metrics(self, user_id: str, metric_types: Optional[List[str]], start: Optional[datetime],
+                                    end: Optional[datetime], max_points: int) -> List[Dict[str, Any]]:
+        time_range = await metric_repository.get_time_range(user_id, metric_types, start, end)
+        if time_range is None:
+            return []
+        unit, bin_size = bucket_size(time_range[1] - time_range[0], max_points)
+        buckets = await metric_repository.get_buckets(user_id, unit, bin_size, metric_types, start, end)
+
+        response = []
+        for bucket in buckets:
+            if bucket.systolic is not None and bucket.diastolic is not None:
+                value = f"{round(bucket.systolic)}/{round(bucket.diastolic)}"
+            elif bucket.value is not None:
+                value = f"{round(bucket.value, 1):g}"
+            else:
+                continue
+            response.append({
+                "date": bucket.start.isoformat(),
+                "type": bucket.metric_type.replace("_", " ").title(),
+                "value": value,
+                "unit": bucket.unit,
+                "status": None,
+                "notes": f"Average of {bucket.count} readings" if bucket.count > 1 else None
+            })
+        return response
+
+    def _decimate_metrics(self, metrics: List[Dict[str, Any]], max_points: int) -> List[Dict[str, Any]]:
+        """Keep at most ``max_points`` real readings per type, chosen by LTTB; input and output newest first."""
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for metric in reversed(metrics):
+            by_type.setdefault(metric["metric_type"], []).append(metric)
+
+        kept = []
+        for metric_type, readings in by_type.items():
+            xs = [reading["measured_at"].timestamp() for reading in readings]
+            ys = [extract_metric_value(metric_type, reading["value"]) for reading in readings]
+            kept.extend(readings[i] for i in lttb(xs, ys, max_points))
+        kept.sort(key=lambda reading: reading["measured_at"], reverse=True)
+        return kept
+
     async def create_health_metric(self, user_id: str, metric_data: HealthMetricCreate) -> Optional[HealthMetricResponse]:
         """Create a new health metric."""
         try:
-            collections = await self._get_collections()
-            metrics_collection = collections['health_metrics']
-            
             # Calculate status based on metric type and value
             from models.health import MetricStatus
+            # Clients usually send only "120/80"; store the parts so averages and status can use them
+            systolic, diastolic = self._blood_pressure_parts(
+                metric_data.metric_type, metric_data.value, metric_data.systolic, metric_data.diastolic
+            )
             status_str = self._calculate_metric_status(metric_data.metric_type, metric_data.value, 
-                                                     metric_data.systolic, metric_data.diastolic)
+                                                     systolic, diastolic)
             status = MetricStatus(status_str) if status_str else None
             
             metric = HealthMetric(
@@ -193,8 +252,8 @@ class HealthService:
                 metric_type=metric_data.metric_type,
                 value=metric_data.value,
                 unit=metric_data.unit,
-                systolic=metric_data.systolic,
-                diastolic=metric_data.diastolic,
+                systolic=systolic,
+                diastolic=diastolic,
                 status=status,
                 notes=metric_data.notes,
                 measured_at=datetime.combine(metric_data.measured_at, datetime.min.time()),
@@ -202,8 +261,12 @@ class HealthService:
                 location=metric_data.location
             )
             
-            result = await metrics_collection.insert_one(metric.dict(by_alias=True))
-            metric.id = result.inserted_id
+            metric.id = await metric_repository.insert(metric.dict(by_alias=True))
+            await self._on_user_data_changed(user_id)
+            activity_log_service.log(
+                user_id, ActivityType.METRIC,
+                f"Recorded {metric.metric_type.value.replace('_', ' ').title()}: {metric.value} {metric.unit}"
+            )
             
             return HealthMetricResponse(
                 date=metric.measured_at.isoformat(),
@@ -217,6 +280,105 @@ class HealthService:
             logger.error(f"Error creating health metric: {e}")
             return None
 
+    async def ingest_health_metrics(self, user_id: str, batches: AsyncIterator[List[HealthMetricReading]]) -> Dict[str, int]:
+        """Store batches of device readings, skipping any already stored (same type, time and device)."""
+        counts = {"inserted": 0, "duplicates": 0}
+        now = datetime.utcnow()
+        try:
+            async for readings in batches:
+                docs = {}
+                for reading in readings:
+                    doc = self._reading_document(user_id, reading, now)
+                    # Duplicates within a batch would race each other's upserts
+                    docs.setdefault((doc["metric_type"], doc["measured_at"], doc["device_used"]), doc)
+                counts["duplicates"] += len(readings) - len(docs)
+                inserted, duplicates = await metric_repository.upsert_readings(list(docs.values()))
+                counts["inserted"] += inserted
+                counts["duplicates"] += duplicates
+            return counts
+        finally:
+            # One invalidation for the whole upload, even if it stopped part way
+            if counts["inserted"]:
+                await self._on_user_data_changed(user_id)
+                activity_log_service.log(user_id, ActivityType.METRIC, f"Synced {counts['inserted']} readings")
+
+    def _blood_pressure_parts(self, metric_type: MetricType, value: str, systolic: Optional[int],
+                              diastolic: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+        """Systolic and diastolic, read from a "120/80" value when not given separately."""
+        if metric_type == MetricType.BLOOD_PRESSURE and systolic is None and "/" in value:
+            try:
+                systolic, diastolic = (int(part) for part in value.split("/", 1))
+            except ValueError:
+                pass
+        return systolic, diastolic
+
+    def _reading_document(self, user_id: str, reading: HealthMetricReading, now: datetime) -> Dict[str, Any]:
+        value = str(reading.value)
+        systolic, diastolic = self._blood_pressure_parts(reading.metric_type, value, reading.systolic, reading.diastolic)
+        measured_at = reading.measured_at
+        if measured_at.tzinfo is not None:
+            # Stored timestamps are naive UTC
+            measured_at = measured_at.astimezone(timezone.utc).replace(tzinfo=None)
+        # BSON dates are millisecond precision; match what comes back when checking for duplicates
+        measured_at = measured_at.replace(microsecond=measured_at.microsecond // 1000 * 1000)
+        return {
+            "user_id": user_id,
+            "metric_type": reading.metric_type.value,
+            "value": value,
+            "unit": reading.unit,
+            "systolic": systolic,
+            "diastolic": diastolic,
+            "status": self._calculate_metric_status(reading.metric_type, value, systolic, diastolic),
+            "notes": reading.notes,
+            "measured_at": measured_at,
+            "device_used": reading.device_used,
+            "location": None,
+            "source": DEVICE_SYNC,
+            "created_at": now
+        }
+
+    async def import_lab_values(self, user_id: str, values: List[LabValue], source_document_id: str,
+                                source_hash: str, source_name: Optional[str] = None) -> int:
+        """
+        Store values extracted from a report as health metrics, replacing any from an earlier import of it.
+
+        Values without a date in the report are skipped: dating an old report's readings
+        today would distort trends, alerts and the health score.
+        """
+        try:
+            from models.health import MetricStatus
+            metrics = []
+            undated = 0
+            for value in values:
+                if value.measured_on is None:
+                    undated += 1
+                    continue
+                status_str = self._calculate_metric_status(value.metric_type, value.value, value.systolic, value.diastolic)
+                metrics.append(HealthMetric(
+                    user_id=user_id,
+                    metric_type=value.metric_type,
+                    value=value.value,
+                    unit=value.unit,
+                    systolic=value.systolic,
+                    diastolic=value.diastolic,
+                    status=MetricStatus(status_str) if status_str else None,
+                    notes=f"{value.label} (from {source_name})" if source_name else value.label,
+                    measured_at=datetime.combine(value.measured_on, datetime.min.time()),
+                    source_document_id=source_document_id,
+                    source_hash=source_hash
+                ).dict(by_alias=True))
+            if undated:
+                logger.info(f"Skipped {undated} lab value(s) without a date in {source_name or source_document_id}")
+            
+            # Re-uploading or re-analyzing the same report (or a job retry) must not duplicate its values
+            await metric_repository.replace_for_source(user_id, source_hash, source_document_id, metrics)
+            if metrics:
+                await self._on_user_data_changed(user_id)
+            return len(metrics)
+        except Exception as e:
+            logger.error(f"Error importing lab values: {e}")
+            return 0
+
     def _calculate_metric_status(self, metric_type: MetricType, value: str, systolic: Optional[int], diastolic: Optional[int]) -> Optional[str]:
         """Calculate status based on metric type and values."""
         try:
@@ -297,6 +459,8 @@ class HealthService:
             
             result = await goals_collection.insert_one(goal.dict(by_alias=True))
             goal.id = result.inserted_id
+            await self._on_user_data_changed(user_id)
+            activity_log_service.log(user_id, ActivityType.GOAL, f"Set goal: {goal.goal_title}")
             
             return HealthGoalResponse(
                 id=str(goal.id),
@@ -348,6 +512,7 @@ class HealthService:
             )
             
             if result.modified_count > 0:
+                await self._on_user_data_changed(user_id)
                 updated_goal = await goals_collection.find_one({"_id": ObjectId(goal_id), "user_id": user_id})
                 if updated_goal:
                     return HealthGoalResponse(
@@ -384,28 +549,26 @@ class HealthService:
             
             # Get paginated results
             skip = (page - 1) * limit
-            cursor = documents_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-            documents = await cursor.to_list(length=limit)
-            
-            response_data = []
-            for doc in documents:
-                # Format file size
-                size_str = self._format_file_size(doc["file_size"])
-                
-                response_data.append(MedicalDocumentResponse(
-                    id=str(doc["_id"]),
-                    name=doc["document_name"],
-                    type=doc["file_type"],
-                    date=doc["document_date"].isoformat() if doc.get("document_date") else None,
-                    size=size_str,
-                    category=doc["category"].title(),
-                    tags=doc.get("tags", []),
-                    status=doc["status"].title(),
-                    url=f"/api/health/documents/{doc['_id']}/download"  # Download URL
-                ))
+            documents = await document_repository.list_page(user_id, category, skip, limit)
+            
+            # Rows shaped like MedicalDocumentResponse, built straight from the projection
+            response_data = [
+                {
+                    "id": str(doc["_id"]),
+                    "name": doc["document_name"],
+                    "type": doc["file_type"],
+                    "date": doc["document_date"].isoformat() if doc.get("document_date") else None,
+                    "size": self._format_file_size(doc["file_size"]),
+                    "category": doc["category"].title(),
+                    "tags": doc.get("tags", []),
+                    "status": doc["status"].title(),
+                    "url": f"/api/health/documents/{doc['_id']}/download"  # Download URL
+                }
+                for doc in documents
+            ]
             
             return {
-                "data": [doc.dict() for doc in response_data],
+                "data": response_data,
                 "total": total,
                 "page": page,
                 "limit": limit,
@@ -452,6 +615,7 @@ class HealthService:
             
             result = await documents_collection.insert_one(document.dict(by_alias=True))
             document.id = result.inserted_id
+            activity_log_service.log(user_id, ActivityType.UPLOAD, f"Uploaded document: {document.document_name}")
             
             return MedicalDocumentResponse(
                 id=str(document.id),
@@ -468,6 +632,21 @@ class HealthService:
             logger.error(f"Error uploading medical document: {e}")
             return None
 
+    async def get_medical_document_file(self, user_id: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """Stored file path, name and MIME type of a user's medical document."""
+        try:
+            collections = await self._get_collections()
+            documents_collection = collections['medical_documents']
+            if not ObjectId.is_valid(document_id):
+                return None
+            return await documents_collection.find_one(
+                {"_id": ObjectId(document_id), "user_id": user_id},
+                {"_id": 0, "file_path": 1, "original_filename": 1, "document_name": 1, "mime_type": 1}
+            )
+        except Exception as e:
+            logger.error(f"Error getting medical document file: {e}")
+            return None
+
     async def delete_medical_document(self, user_id: str, document_id: str) -> bool:
         """Delete a medical document."""
         try:
@@ -0,0 +1,336 @@
+from typing import Optional, List, Dict, Any, Callable, Awaitable
+from datetime import datetime, timedelta
+from bson import ObjectId # type: ignore
+from pymongo import ASCENDING, DESCENDING, ReturnDocument # type: ignore
+import asyncio
+import logging
+import os
+import socket
+
+from config import settings
+from database import get_database
+from models.job import Job, JobTypeEnum, JobStatusEnum
+
+logger = logging.getLogger(__name__)
+
+# progress(percent, stage)
+ProgressCallback = Callable[[int, str], Awaitable[None]]
+JobHandler = Callable[[Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]]
+FailureHandler = Callable[[Dict[str, Any], str], Awaitable[None]]
+
+
+class JobService:
+    """
+    MongoDB-backed job queue with in-process async workers.
+
+    Jobs are claimed atomically with ``find_one_and_update``, so any number of
+    app workers can share the queue. A running job holds a lease that its
+    worker renews; if the worker dies, the lease expires and another worker
+    picks the job up again. Failed jobs are retried up to ``max_attempts``
+    before the failure handler runs; so are jobs whose worker died, since a
+    job that crashes its worker would otherwise be re-run forever. Results
+    are only written by the worker that holds the lease.
+    """
+
+    def __init__(self, concurrency: int = 2, poll_interval: float = 2.0,
+                 lease_seconds: int = 300, max_attempts: int = 2):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._failure_handlers: Dict[str, FailureHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._indexes_created = False
+
+    async def _get_collections(self):
+        """Get database collections."""
+        db = await get_database()
+        return {
+            'jobs': db.jobs
+        }
+
+    def register(self, job_type: JobTypeEnum, handler: JobHandler,
+                 on_failure: Optional[FailureHandler] = None) -> None:
+        """Register the coroutine that runs jobs of ``job_type``."""
+        self._handlers[job_type.value] = handler
+        if on_failure is not None:
+            self._failure_handlers[job_type.value] = on_failure
+
+    async def ensure_indexes(self, collections: Dict) -> None:
+        """Indexes for claiming queued jobs and listing a user's jobs."""
+        if self._indexes_created:
+            return
+        await collections['jobs'].create_index([("status", ASCENDING), ("run_after", ASCENDING)])
+        await collections['jobs'].create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        self._indexes_created = True
+
+    async def enqueue(self, user_id: str, job_type: JobTypeEnum, payload: Dict[str, Any]) -> str:
+        """Queue a job and return its ID."""
+        try:
+            collections = await self._get_collections()
+            now = datetime.utcnow()
+            job_data = {
+                "user_id": user_id,
+                "type": job_type.value,
+                "status": JobStatusEnum.QUEUED.value,
+                "payload": payload,
+                "progress": 0,
+                "stage": "queued",
+                "result": None,
+                "error": None,
+                "attempts": 0,
+                "run_after": now,
+                "created_at": now,
+                "updated_at": now,
+                "started_at": None,
+                "finished_at": None
+            }
+            result = await collections['jobs'].insert_one(job_data)
+            if self._wakeup is not None:
+                self._wakeup.set()
+            return str(result.inserted_id)
+
+        except Exception as e:
+            logger.error(f"Error enqueuing job: {e}")
+            raise
+
+    async def get_job(self, job_id: str, user_id: str) -> Optional[Job]:
+        """Get a user's job by ID."""
+        try:
+            if not ObjectId.is_valid(job_id):
+                return None
+            collections = await self._get_collections()
+            job_data = await collections['jobs'].find_one({"_id": ObjectId(job_id), "user_id": user_id})
+            if job_data:
+                job_data["_id"] = str(job_data["_id"])
+                return Job(**job_data)
+            return None
+
+        except Exception as e:
+            logger.error(f"Error getting job: {e}")
+            return None
+
+    async def list_jobs(self, user_id: str, limit: int = 20) -> List[Job]:
+        """Get a user's most recent jobs."""
+        try:
+            collections = await self._get_collections()
+            cursor = collections['jobs'].find({"user_id": user_id}).sort("created_at", DESCENDING).limit(limit)
+            jobs = []
+            async for job_data in cursor:
+                job_data["_id"] = str(job_data["_id"])
+                jobs.append(Job(**job_data))
+            return jobs
+
+        except Exception as e:
+            logger.error(f"Error listing jobs: {e}")
+            return []
+
+    async def update_progress(self, job_id: str, progress: int, stage: str) -> None:
+        """Record progress and renew the job's lease."""
+        try:
+            collections = await self._get_collections()
+            now = datetime.utcnow()
+            await collections['jobs'].update_one(
+                {"_id": ObjectId(job_id), "worker_id": self.worker_id},
+                {"$set": {
+                    "progress": max(0, min(100, int(progress))),
+                    "stage": stage,
+                    "updated_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+                }}
+            )
+        except Exception as e:
+            logger.error(f"Error updating job progress: {e}")
+
+    async def _claim(self, collections: Dict) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest runnable job, including ones whose worker's lease ran out."""
+        now = datetime.utcnow()
+        return await collections['jobs'].find_one_and_update(
+            {
+                "type": {"$in": list(self._handlers)},
+                "$or": [
+                    {"status": JobStatusEnum.QUEUED.value, "run_after": {"$lte": now}},
+                    {
+                        "status": JobStatusEnum.RUNNING.value,
+                        "lease_expires_at": {"$lt": now},
+                        "attempts": {"$lt": self.max_attempts}
+                    }
+                ]
+            },
+            {
+                "$set": {
+                    "status": JobStatusEnum.RUNNING.value,
+                    "worker_id": self.worker_id,
+                    "started_at": now,
+                    "updated_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_after", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _fail_abandoned(self, collections: Dict) -> None:
+        """Fail jobs whose worker died during their last attempt (e.g. OOM on a huge PDF)."""
+        while True:
+            now = datetime.utcnow()
+            # Take the lease first so only one worker records the failure
+            job = await collections['jobs'].find_one_and_update(
+                {
+                    "type": {"$in": list(self._handlers)},
+                    "status": JobStatusEnum.RUNNING.value,
+                    "lease_expires_at": {"$lt": now},
+                    "attempts": {"$gte": self.max_attempts}
+                },
+                {"$set": {
+                    "worker_id": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+                }},
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                return
+            logger.error(f"Job {job['_id']} ({job['type']}) was abandoned by its worker on attempt {job['attempts']}")
+            await self._record_failure(job, "The worker stopped before the job finished", collections)
+
+    async def _renew_lease(self, job_id: str) -> None:
+        """Keep the lease alive while a long step (e.g. an LLM call) reports no progress."""
+        collections = await self._get_collections()
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await collections['jobs'].update_one(
+                    {"_id": ObjectId(job_id), "worker_id": self.worker_id},
+                    {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+                )
+            except Exception as e:
+                logger.error(f"Error renewing job lease: {e}")
+
+    async def _run(self, job: Dict[str, Any], collections: Dict) -> None:
+        job_id = str(job["_id"])
+        handler = self._handlers[job["type"]]
+
+        async def progress(percent: int, stage: str) -> None:
+            await self.update_progress(job_id, percent, stage)
+
+        heartbeat = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            result = await handler(job["payload"], progress)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['type']}) failed on attempt {job['attempts']}: {e}")
+            await self._record_failure(job, str(e), collections)
+            return
+        finally:
+            heartbeat.cancel()
+
+        now = datetime.utcnow()
+        # If our lease ran out, another worker owns the job now; leave its result alone
+        completed = await collections['jobs'].update_one(
+            {"_id": job["_id"], "worker_id": self.worker_id},
+            {"$set": {
+                "status": JobStatusEnum.COMPLETED.value,
+                "progress": 100,
+                "stage": "completed",
+                "result": result,
+                "error": None,
+                "updated_at": now,
+                "finished_at": now
+            }}
+        )
+        if completed.matched_count == 0:
+            logger.warning(f"Job {job_id} finished after its lease was taken over; result discarded")
+
+    async def _record_failure(self, job: Dict[str, Any], error: str, collections: Dict) -> None:
+        now = datetime.utcnow()
+        if job["attempts"] < self.max_attempts:
+            # Back off before the retry so a struggling dependency gets a break
+            await collections['jobs'].update_one(
+                {"_id": job["_id"], "worker_id": self.worker_id},
+                {"$set": {
+                    "status": JobStatusEnum.QUEUED.value,
+                    "stage": "retrying",
+                    "error": error,
+                    "run_after": now + timedelta(seconds=self.poll_interval * 2 ** job["attempts"]),
+                    "updated_at": now
+                }}
+            )
+            return
+
+        failed = await collections['jobs'].update_one(
+            {"_id": job["_id"], "worker_id": self.worker_id},
+            {"$set": {
+                "status": JobStatusEnum.FAILED.value,
+                "stage": "failed",
+                "error": error,
+                "updated_at": now,
+                "finished_at": now
+            }}
+        )
+        if failed.matched_count == 0:
+            # Another worker took the job over after our lease ran out
+            return
+        on_failure = self._failure_handlers.get(job["type"])
+        if on_failure is not None:
+            try:
+                await on_failure(job["payload"], error)
+            except Exception as e:
+                logger.error(f"Error in job failure handler: {e}")
+
+    async def _worker(self, index: int) -> None:
+        collections = await self._get_collections()
+        while True:
+            try:
+                await self.ensure_indexes(collections)
+                job = await self._claim(collections)
+                if job is None:
+                    await self._fail_abandoned(collections)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                # Sleep until something is enqueued here, or poll for jobs queued by other workers
+                self._wakeup.clear() # type: ignore
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval) # type: ignore
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job, collections)
+
+    def start(self) -> None:
+        """Start the worker tasks on the running loop."""
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        logger.info(f"Started {self.concurrency} job workers ({self.worker_id})")
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers.
+
+        Jobs that were running keep their lease and are picked up again
+        once it expires.
+        """
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = None
+
+
+# Create singleton instance
+job_service = JobService(
+    concurrency=settings.job_workers,
+    poll_interval=settings.job_poll_interval_seconds,
+    lease_seconds=settings.job_lease_seconds,
+    max_attempts=settings.job_max_attempts
+)
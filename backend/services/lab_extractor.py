@@ -0,0 +1,187 @@
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import date, datetime
+import re
+
+from models.health import MetricType
+
+NUMBER = r"(?P<value>\d{1,4}(?:\.\d{1,3})?)"
+PRESSURE = r"(?P<systolic>\d{2,3})\s*/\s*(?P<diastolic>\d{2,3})"
+# Between a test name and its value: "(Fasting)", ":", "-", dots or column padding, but no digits
+GAP = r"[^\d\n]{0,40}?"
+UNIT = r"\s*(?P<unit>(?:°\s*)?[a-zA-Z%µμ][a-zA-Z%/²0-9.]{0,9})?"
+
+DATE_LINE = re.compile(
+    r"\b(?:date|collected|collection|reported|sample|visit|received)\b[^:\n\d]{0,30}[:\-]?\s*"
+    r"(?P<date>\d{4}-\d{2}-\d{2}|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}|\d{1,2}[ -][A-Za-z]{3,9}[ -,]*\d{4}"
+    r"|[A-Za-z]{3,9} \d{1,2},? \d{4})",
+    re.IGNORECASE
+)
+# Day first, as on Indian lab reports
+DATE_FORMATS = (
+    "%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y", "%d.%m.%y",
+    "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d-%B-%Y", "%b %d %Y", "%B %d %Y",
+)
+
+
+def _unit_key(unit: Optional[str]) -> str:
+    return re.sub(r"[\s°.]", "", unit or "").lower().replace("μ", "µ")
+
+
+@dataclass(frozen=True)
+class LabTest:
+    """How to find one metric type in report text and normalize it."""
+    metric_type: MetricType
+    names: str  # regex alternatives for the test name at the start of a line
+    unit: str  # unit the value is stored in
+    low: float  # plausible range in ``unit``; anything outside is a misread
+    high: float
+    # other unit (normalized by _unit_key) -> converter into ``unit``
+    conversions: Tuple[Tuple[str, Callable[[float], float]], ...] = ()
+    decimals: int = 1
+
+    def pattern(self) -> "re.Pattern":
+        value = PRESSURE if self.metric_type == MetricType.BLOOD_PRESSURE else NUMBER
+        return re.compile(rf"^[\W_]*(?P<label>(?:{self.names})\b{GAP})[:=\-\s]*{value}{UNIT}", re.IGNORECASE)
+
+    def normalize(self, value: float, unit: Optional[str]) -> Optional[float]:
+        key = _unit_key(unit)
+        for other, convert in self.conversions:
+            if key == other:
+                value = convert(value)
+                break
+        if not self.low <= value <= self.high:
+            return None
+        return round(value, self.decimals)
+
+
+LAB_TESTS: Tuple[LabTest, ...] = (
+    LabTest(MetricType.BLOOD_PRESSURE, r"blood\s+pressure|b\.?p\.?", "mmHg", 0, 0),
+    LabTest(
+        MetricType.HBA1C, r"hb\s*a1c|glycated\s+ha?emoglobin|glycosylated\s+ha?emoglobin|a1c", "%", 3, 20,
+        (("mmol/mol", lambda v: v / 10.929 + 2.15),)
+    ),
+    LabTest(
+        MetricType.BLOOD_GLUCOSE,
+        r"(?:fasting\s+|random\s+|post[\s-]?prandial\s+|pp\s+)?(?:blood\s+|plasma\s+|serum\s+)?(?:glucose|sugar)"
+        r"|f\.?b\.?s|r\.?b\.?s|pp\.?b\.?s|f\.?b\.?g|fpg",
+        "mg/dL", 20, 700, (("mmol/l", lambda v: v * 18.016),), decimals=0
+    ),
+    # Only total cholesterol; HDL/LDL lines start with their own name and don't match
+    LabTest(
+        MetricType.CHOLESTEROL, r"(?:total\s+|serum\s+|s\.\s*)?cholesterol(?:\s*,?\s*total)?", "mg/dL", 50, 500,
+        (("mmol/l", lambda v: v * 38.67),), decimals=0
+    ),
+    LabTest(MetricType.HEART_RATE, r"heart\s+rate|pulse(?:\s+rate)?|h\.?r", "bpm", 20, 250, decimals=0),
+    LabTest(
+        MetricType.OXYGEN_SATURATION, r"sp\s*o2|sp02|oxygen\s+saturation|o2\s+sat(?:uration)?", "%", 50, 100,
+        decimals=0
+    ),
+    LabTest(
+        MetricType.TEMPERATURE, r"(?:body\s+)?temperature|temp", "°F", 90, 110,
+        (("c", lambda v: v * 9 / 5 + 32),)
+    ),
+    LabTest(
+        MetricType.WEIGHT, r"(?:body\s+)?weight|wt", "kg", 2, 400,
+        (("lb", lambda v: v * 0.4536), ("lbs", lambda v: v * 0.4536))
+    ),
+    LabTest(
+        MetricType.HEIGHT, r"height|ht", "cm", 40, 250,
+        (("m", lambda v: v * 100), ("in", lambda v: v * 2.54), ("inches", lambda v: v * 2.54)), decimals=0
+    ),
+    LabTest(MetricType.BMI, r"b\.?m\.?i|body\s+mass\s+index", "kg/m²", 10, 80),
+)
+
+
+@dataclass
+class LabValue:
+    metric_type: MetricType
+    value: str
+    unit: str
+    label: str  # test name as written in the report
+    measured_on: Optional[date] = None
+    systolic: Optional[int] = None
+    diastolic: Optional[int] = None
+
+
+def parse_report_date(text: str) -> Optional[date]:
+    text = re.sub(r"[\s,]+", " ", text.strip()).replace(" -", "-").replace("- ", "-")
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+        return parsed if parsed.year >= 1950 else None
+    return None
+
+
+class LabValueExtractor:
+    """
+    Rule-based lab value extraction from report text.
+
+    Reads line by line: a line naming a test (blood pressure, glucose, HbA1c,
+    total cholesterol, vitals) followed by a number becomes a typed value,
+    converted to the unit the app stores and dropped if implausible. Date
+    lines ("Collected on: 12/03/2024") set the date for the values after
+    them, so multi-visit reports keep each visit's date. Numbers after the
+    first on a line (reference ranges) are ignored.
+    """
+
+    def __init__(self, tests: Tuple[LabTest, ...] = LAB_TESTS):
+        self.tests = [(test, test.pattern()) for test in tests]
+
+    def extract(self, text: str, default_date: Optional[date] = None) -> List[LabValue]:
+        seen = set()
+        values = []
+        for value in self.iter_values(text, default_date):
+            key = (value.metric_type, value.measured_on, value.value)
+            if key not in seen:
+                seen.add(key)
+                values.append(value)
+        return values
+
+    def iter_values(self, text: str, default_date: Optional[date] = None) -> Iterator[LabValue]:
+        current_date = default_date
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            date_match = DATE_LINE.search(line)
+            if date_match:
+                current_date = parse_report_date(date_match.group("date")) or current_date
+            for segment in re.split(r"\s*[|;]\s*|\t+|\s{4,}(?=[A-Za-z])", line):
+                value = self._match(segment, current_date)
+                if value is not None:
+                    yield value
+
+    def _match(self, segment: str, measured_on: Optional[date]) -> Optional[LabValue]:
+        for test, pattern in self.tests:
+            match = pattern.match(segment)
+            if match is None:
+                continue
+            label = match.group("label").strip(" :=-.\t")
+            if test.metric_type == MetricType.BLOOD_PRESSURE:
+                systolic, diastolic = int(match.group("systolic")), int(match.group("diastolic"))
+                if not (60 <= systolic <= 260 and 30 <= diastolic <= 160 and diastolic < systolic):
+                    return None
+                return LabValue(
+                    test.metric_type, f"{systolic}/{diastolic}", test.unit, label, measured_on, systolic, diastolic
+                )
+            number = test.normalize(float(match.group("value")), match.group("unit"))
+            if number is None:
+                return None
+            value = str(int(number)) if test.decimals == 0 else f"{number:g}"
+            return LabValue(test.metric_type, value, test.unit, label, measured_on)
+        return None
+
+
+def summarize_values(values: List[LabValue]) -> Dict[str, int]:
+    """Count of extracted values per metric type."""
+    counts: Dict[str, int] = {}
+    for value in values:
+        counts[value.metric_type.value] = counts.get(value.metric_type.value, 0) + 1
+    return counts
+
+
+# Create singleton instance
+lab_value_extractor = LabValueExtractor()
@@ -0,0 +1,207 @@
+from typing import Optional, List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pymongo import ASCENDING # type: ignore
+import asyncio
+import hashlib
+import io
+import logging
+import shutil
+import time
+
+from config import settings
+from database import get_database
+from utils.metrics import ocr_page_duration, ocr_pages
+
+# Optional local OCR (pip install pytesseract pillow; needs the tesseract binary)
+try:
+    import pytesseract # type: ignore
+    from PIL import Image # type: ignore
+except ImportError:
+    pytesseract = None
+    Image = None
+
+# PDF page rasterization; installed with pdfplumber
+try:
+    import pypdfium2 as pdfium # type: ignore
+except ImportError:
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OCRPage:
+    number: int  # 1-based; images are page 1
+    text: str
+    seconds: float  # recognition time, 0 when cached
+    cached: bool = False
+
+
+class OCRService:
+    """
+    Local OCR for scanned PDFs and image uploads, so they never have to be
+    sent to the LLM as images.
+
+    Tesseract runs as a subprocess per page, so a small thread pool gives real
+    parallelism. PDF pages are rasterized one at a time (pdfium isn't
+    thread-safe) and handed to the pool as they are ready, with at most two
+    rendered pages per worker held in memory. Results are cached by content
+    hash and page, so re-uploading the same report costs nothing.
+    """
+
+    def __init__(self, workers: int = 2, dpi: int = 300, lang: str = "eng", max_pages: int = 50):
+        self.workers = workers
+        self.dpi = dpi
+        self.lang = lang
+        self.max_pages = max_pages
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._indexes_created = False
+
+    async def _get_collections(self):
+        """Get database collections."""
+        db = await get_database()
+        return {
+            'ocr_cache': db.ocr_cache
+        }
+
+    @property
+    def available(self) -> bool:
+        return pytesseract is not None and shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+    @property
+    def pdf_available(self) -> bool:
+        return self.available and pdfium is not None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def ensure_indexes(self, collections: Dict) -> None:
+        if self._indexes_created:
+            return
+        await collections['ocr_cache'].create_index(
+            [("created_at", ASCENDING)], expireAfterSeconds=settings.ocr_cache_ttl_days * 86400
+        )
+        self._indexes_created = True
+
+    def _cache_key(self, digest: str, number: int) -> str:
+        return f"{digest}:{number}:{self.lang}:{self.dpi}"
+
+    async def _cached(self, digest: str, numbers: List[int]) -> Dict[int, str]:
+        try:
+            collections = await self._get_collections()
+            await self.ensure_indexes(collections)
+            keys = {self._cache_key(digest, n): n for n in numbers}
+            cursor = collections['ocr_cache'].find({"_id": {"$in": list(keys)}})
+            return {keys[entry["_id"]]: entry["text"] async for entry in cursor}
+        except Exception as e:
+            logger.error(f"Error reading OCR cache: {e}")
+            return {}
+
+    async def _store(self, digest: str, pages: List[OCRPage]) -> None:
+        if not pages:
+            return
+        try:
+            collections = await self._get_collections()
+            now = datetime.utcnow()
+            for page in pages:
+                await collections['ocr_cache'].replace_one(
+                    {"_id": self._cache_key(digest, page.number)},
+                    {"text": page.text, "created_at": now},
+                    upsert=True
+                )
+        except Exception as e:
+            logger.error(f"Error writing OCR cache: {e}")
+
+    def _recognize(self, image) -> tuple:
+        started = time.perf_counter()
+        text = pytesseract.image_to_string(image.convert("L"), lang=self.lang)
+        image.close()
+        return text.strip(), time.perf_counter() - started
+
+    def _render(self, pdf, number: int):
+        page = pdf[number - 1]
+        try:
+            return page.render(scale=self.dpi / 72, grayscale=True).to_pil()
+        finally:
+            page.close()
+
+    async def _run(self, numbers: List[int], load_image) -> List[OCRPage]:
+        loop = asyncio.get_running_loop()
+        in_flight = asyncio.Semaphore(self.workers * 2)
+        render_lock = asyncio.Lock()
+
+        async def one(number: int) -> OCRPage:
+            async with in_flight:
+                async with render_lock:
+                    image = await asyncio.to_thread(load_image, number)
+                text, seconds = await loop.run_in_executor(self._pool(), self._recognize, image)
+            ocr_page_duration.observe(seconds)
+            return OCRPage(number=number, text=text, seconds=seconds)
+
+        return list(await asyncio.gather(*(one(n) for n in numbers)))
+
+    async def _recognize_pages(self, content: bytes, numbers: List[int], load_image, source: str) -> List[OCRPage]:
+        digest = hashlib.sha256(content).hexdigest()
+        cached = await self._cached(digest, numbers)
+        ocr_pages.inc(len(cached), source=source, result="cached")
+        missing = [n for n in numbers if n not in cached]
+
+        started = time.perf_counter()
+        recognized = await self._run(missing, load_image) if missing else []
+        elapsed = time.perf_counter() - started
+        if recognized:
+            ocr_pages.inc(len(recognized), source=source, result="recognized")
+            logger.info(
+                f"OCR'd {len(recognized)} {source} page(s) in {elapsed:.1f}s "
+                f"({len(recognized) / elapsed:.2f} pages/s, {self.workers} workers)"
+            )
+        await self._store(digest, recognized)
+
+        pages = recognized + [OCRPage(number=n, text=text, seconds=0.0, cached=True) for n, text in cached.items()]
+        return sorted(pages, key=lambda page: page.number)
+
+    async def ocr_image(self, content: bytes) -> Optional[OCRPage]:
+        """Recognize the text in an uploaded image (JPEG, PNG)."""
+        if not self.available:
+            logger.warning("Image uploaded but OCR is not available (install pytesseract and tesseract)")
+            return None
+        try:
+            pages = await self._recognize_pages(content, [1], lambda _: Image.open(io.BytesIO(content)), "image")
+            return pages[0]
+        except Exception as e:
+            logger.error(f"Image OCR failed: {e}")
+            return None
+
+    async def ocr_pdf_pages(self, content: bytes, numbers: List[int]) -> List[OCRPage]:
+        """Rasterize and recognize the given (1-based) pages of a PDF, up to ``max_pages`` of them."""
+        if not numbers or not self.pdf_available:
+            return []
+        numbers = numbers[:self.max_pages]
+        pdf = None
+        try:
+            pdf = await asyncio.to_thread(pdfium.PdfDocument, content)
+            return await self._recognize_pages(content, numbers, lambda n: self._render(pdf, n), "pdf")
+        except Exception as e:
+            logger.error(f"PDF OCR failed: {e}")
+            return []
+        finally:
+            if pdf is not None:
+                pdf.close()
+
+
+# Create singleton instance
+ocr_service = OCRService(
+    workers=settings.ocr_workers,
+    dpi=settings.ocr_dpi,
+    lang=settings.ocr_lang,
+    max_pages=settings.ocr_max_pages
+)
@@ -0,0 +1,185 @@
+from typing import Optional, List, Tuple
+from enum import IntEnum
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+
+from utils.metrics import openai_queue_wait, openai_queue_depth
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower values are dispatched first."""
+    INTERACTIVE = 0  # a user is waiting on the response, e.g. chat
+    BACKGROUND = 1   # bulk work such as per-chunk document summaries
+
+
+class OpenAIUnavailableError(Exception):
+    """Raised when a call can't get rate-limit capacity or keeps failing after retries."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OpenAIQueueTimeoutError(OpenAIUnavailableError):
+    """No rate-limit capacity became available within the queue wait limit."""
+
+
+class TokenBucket:
+    """Capacity of ``per_minute`` units, refilled continuously."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+        self._refill()
+        # A request larger than the whole bucket goes through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.available -= amount
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+
+class OpenAIScheduler:
+    """
+    Client-side RPM/TPM limiter shared by every OpenAI call in the process.
+
+    Callers ``acquire`` capacity for one request and its estimated tokens
+    before calling the API. Waiters are served by priority, then arrival
+    order, so interactive chat jumps ahead of queued chunk summaries. After
+    the call, ``settle`` corrects the token bucket with the real usage, and
+    ``pause`` holds all dispatching when the provider answers 429.
+
+    Limits are per process; with several workers, configure each with its
+    share of the account limits.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_queue_wait: float = 30.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue_wait = max_queue_wait
+        self._queue: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._paused_until = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures and events belong to one loop; start fresh on a new one
+            self._loop = loop
+            self._queue = []
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def acquire(self, estimated_tokens: int, priority: Priority = Priority.INTERACTIVE) -> None:
+        """Wait for capacity for one request of ``estimated_tokens`` tokens."""
+        self._bind_loop()
+        future = self._loop.create_future() # type: ignore
+        heapq.heappush(self._queue, (int(priority), next(self._counter), float(estimated_tokens), future))
+        label = priority.name.lower()
+        openai_queue_depth.inc(1, priority=label)
+        started = time.perf_counter()
+        self._wake()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_queue_wait)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise OpenAIQueueTimeoutError(
+                f"No OpenAI capacity within {self.max_queue_wait:.0f}s", retry_after=self.max_queue_wait
+            )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            openai_queue_depth.inc(-1, priority=label)
+            openai_queue_wait.observe(time.perf_counter() - started, priority=label)
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket once the real usage is known."""
+        if actual_tokens is None:
+            return
+        difference = estimated_tokens - actual_tokens
+        if difference > 0:
+            self.tokens.refund(difference)
+        elif difference < 0:
+            self.tokens.consume(-difference)
+
+    def pause(self, seconds: float) -> None:
+        """Hold all dispatching, e.g. for a provider ``Retry-After``."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def _dispatch(self) -> None:
+        while self._queue:
+            priority, _, tokens, future = self._queue[0]
+            if future.done():
+                # Timed out or cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self.requests.time_until(1),
+                self.tokens.time_until(tokens)
+            )
+            if wait <= 0:
+                heapq.heappop(self._queue)
+                self.requests.consume(1)
+                self.tokens.consume(tokens)
+                future.set_result(None)
+                continue
+
+            # Sleep until capacity frees up, or until a new (maybe higher priority) waiter arrives
+            self._wakeup.clear() # type: ignore
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait) # type: ignore
+            except asyncio.TimeoutError:
+                pass
+
+
+def backoff_delay(attempt: int, base: float, maximum: float, retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retry ``attempt`` (0-based).
+
+    Honours a provider ``Retry-After`` plus a little jitter, otherwise uses
+    full-jitter exponential backoff so concurrent retries spread out.
+    """
+    if retry_after is not None:
+        return min(maximum, retry_after) + random.uniform(0, base)
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+def estimate_tokens(messages: List[dict], max_tokens: int) -> int:
+    """Rough token estimate for TPM accounting: ~4 characters per token plus the completion budget."""
+    characters = sum(len(str(message.get("content", ""))) for message in messages)
+    return characters // 4 + len(messages) * 4 + max_tokens
@@ -1,15 +1,66 @@
-from openai import AsyncOpenAI # type: ignore
-from typing import List, Dict, Any, Optional
+from openai import ( # type: ignore
+    AsyncOpenAI, DefaultAsyncHttpxClient, APIStatusError, APIConnectionError, RateLimitError, NotFoundError
+)
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+from enum import Enum
 from config import settings
+from services.openai_scheduler import (
+    OpenAIScheduler, OpenAIUnavailableError, OpenAIQueueTimeoutError, Priority, backoff_delay, estimate_tokens
+)
+from utils.metrics import (
+    openai_request_duration, openai_tokens, openai_retries, openai_cost, openai_fallbacks
+)
+from utils.tracing import traced_class, TracingTransport
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ModelTask(str, Enum):
+    CHAT = "chat"
+    CHUNK_MAP = "chunk_map"  # per-chunk summaries of large documents
+    REDUCE = "reduce"  # final answers over a whole document or its chunk summaries
+    HEALTH_INSIGHTS = "health_insights"
+    TITLE = "title"
+
+
+# USD per million (prompt, completion) tokens, for cost accounting only
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4.1": (2.0, 8.0),
+    "gpt-4.1-mini": (0.4, 1.6),
+    "gpt-4.1-nano": (0.1, 0.4),
+    "gpt-3.5-turbo": (0.5, 1.5),
+}
+
+
+@traced_class
 class OpenAIService:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
-        self.model = "gpt-4"
+        self.client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            http_client=DefaultAsyncHttpxClient(transport=TracingTransport()),
+            # Retries go through the scheduler so they respect the shared limits
+            max_retries=0
+        )
+        self.scheduler = OpenAIScheduler(
+            requests_per_minute=settings.openai_requests_per_minute,
+            tokens_per_minute=settings.openai_tokens_per_minute,
+            max_queue_wait=settings.openai_max_queue_wait_seconds
+        )
+        self.models = {
+            ModelTask.CHAT: settings.openai_chat_model,
+            ModelTask.CHUNK_MAP: settings.openai_chunk_map_model,
+            ModelTask.REDUCE: settings.openai_reduce_model,
+            ModelTask.HEALTH_INSIGHTS: settings.openai_health_insights_model,
+            ModelTask.TITLE: settings.openai_title_model,
+        }
+        self.model = self.models[ModelTask.CHAT]
         self.system_prompts = {
             "en": """You are SwasthWrap AI, a helpful health assistant. You provide health advice, 
                      medication reminders, and wellness tips. When users upload documents (PDFs, images, text files), 
@@ -34,9 +85,11 @@ class OpenAIService:
         messages: List[Dict[str, str]],
         language: str = "en",
         temperature: float = 0.7,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        priority: Priority = Priority.INTERACTIVE,
+        task: ModelTask = ModelTask.CHAT
     ) -> Dict[str, Any]:
-        """Get chat completion from OpenAI"""
+        """Get chat completion from OpenAI using the model configured for ``task``"""
         try:
             # Add system prompt based on language
             system_prompt = self.system_prompts.get(language, self.system_prompts["en"])
@@ -46,11 +99,14 @@ class OpenAIService:
                 {"role": "system", "content": system_prompt}
             ] + messages
             
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=full_messages,
-                temperature=temperature,
-                max_tokens=max_tokens
+            response, model = await self._complete_with_fallback(
+                {
+                    "messages": full_messages,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens
+                },
+                task,
+                priority
             )
             
             content = response.choices[0].message.content
@@ -61,6 +117,7 @@ class OpenAIService:
             return {
                 "content": content,
                 "confidence": confidence,
+                "model": model,
                 "usage": response.usage.dict() if response.usage else None
             }
             
@@ -68,6 +125,99 @@ class OpenAIService:
             logger.error(f"OpenAI completion error: {e}")
             raise
     
+    def _fallback_model(self, model: str) -> Optional[str]:
+        """Model to try when ``model`` keeps failing; the chat model backs up the fallback itself."""
+        fallback = settings.openai_fallback_model
+        if fallback == model:
+            fallback = self.models[ModelTask.CHAT]
+        return fallback if fallback and fallback != model else None
+
+    async def _complete_with_fallback(
+        self,
+        params: Dict[str, Any],
+        task: ModelTask,
+        priority: Priority
+    ) -> Tuple[Any, str]:
+        """Run a completion on the task's model, switching to the fallback model if it fails."""
+        model = self.models[task]
+        try:
+            return await self._create_completion({**params, "model": model}, task, priority), model
+        except OpenAIQueueTimeoutError:
+            # Both models share the rate limits, so falling back would only queue again
+            raise
+        except (OpenAIUnavailableError, NotFoundError) as e:
+            fallback = self._fallback_model(model)
+            if not fallback:
+                raise
+            logger.warning(f"OpenAI model {model} failed for {task.value} ({e}), falling back to {fallback}")
+            openai_fallbacks.inc(task=task.value, model=fallback)
+            return await self._create_completion({**params, "model": fallback}, task, priority), fallback
+
+    async def _create_completion(self, params: Dict[str, Any], task: ModelTask, priority: Priority):
+        """Call the chat completions API within the rate limits, retrying transient failures."""
+        estimated = estimate_tokens(params["messages"], params["max_tokens"])
+        attempt = 0
+        while True:
+            await self.scheduler.acquire(estimated, priority)
+            try:
+                with openai_request_duration.time(model=params["model"], task=task.value):
+                    response = await self.client.chat.completions.create(**params)
+            except (RateLimitError, APIStatusError, APIConnectionError) as e:
+                # Nothing was used; the next attempt acquires its estimate again
+                self.scheduler.settle(estimated, 0)
+                status = getattr(e, "status_code", None)
+                if status is not None and status != 429 and status < 500:
+                    raise
+                retry_after = self._retry_after(e)
+                if attempt >= settings.openai_max_retries:
+                    raise OpenAIUnavailableError(
+                        f"OpenAI request failed after {attempt + 1} attempts: {e}",
+                        retry_after=retry_after or settings.openai_retry_base_delay * (2 ** attempt)
+                    ) from e
+                delay = backoff_delay(
+                    attempt, settings.openai_retry_base_delay, settings.openai_retry_max_delay, retry_after
+                )
+                if status == 429:
+                    # Over the provider's limit: hold every queued call, not just this one
+                    self.scheduler.pause(delay)
+                    openai_retries.inc(reason="rate_limited")
+                else:
+                    openai_retries.inc(reason="server_error" if status else "connection_error")
+                logger.warning(f"OpenAI call failed ({status or type(e).__name__}), retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            usage = response.usage
+            self.scheduler.settle(estimated, usage.total_tokens if usage else None)
+            if usage:
+                self._record_usage(params["model"], task, usage.prompt_tokens, usage.completion_tokens)
+            return response
+
+    def _record_usage(self, model: str, task: ModelTask, prompt_tokens: int, completion_tokens: int) -> None:
+        openai_tokens.inc(prompt_tokens, model=model, task=task.value, kind="prompt")
+        openai_tokens.inc(completion_tokens, model=model, task=task.value, kind="completion")
+        # Dated snapshots ("gpt-4o-mini-2024-07-18") are priced like their base model
+        pricing = MODEL_PRICING.get(model) or next(
+            (price for name, price in sorted(MODEL_PRICING.items(), key=lambda item: -len(item[0]))
+             if model.startswith(name + "-")),
+            None
+        )
+        if pricing:
+            cost = (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1_000_000
+            openai_cost.inc(cost, model=model, task=task.value)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Seconds from a ``Retry-After`` header, if the provider sent one."""
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+
     def _calculate_confidence(self, content: str) -> float:
         """Calculate confidence score based on response characteristics"""
         if not content:
@@ -118,6 +268,28 @@ class OpenAIService:
             logger.error(f"Health advice error: {e}")
             raise
     
+    async def generate_session_title(self, first_message: str, language: str = "en") -> str:
+        """Generate a short chat session title from the first message"""
+        try:
+            messages = [{
+                "role": "user",
+                "content": f"Write a title of at most six words for a health chat that starts with this "
+                           f"message. Reply with the title only.\n\nMessage: {first_message[:500]}"
+            }]
+            result = await self.get_chat_completion(
+                messages,
+                language,
+                temperature=0.3,
+                max_tokens=20,
+                priority=Priority.BACKGROUND,
+                task=ModelTask.TITLE
+            )
+            return (result.get("content") or "").strip().strip('"')
+
+        except Exception as e:
+            logger.error(f"Session title generation error: {e}")
+            raise
+
     def get_greeting_message(self, language: str = "en") -> str:
         """Get greeting message in specified language"""
         greetings = {
@@ -166,7 +338,8 @@ class OpenAIService:
                 messages, 
                 language, 
                 temperature=0.3,  # Lower temperature for more factual analysis
-                max_tokens=1500
+                max_tokens=1500,
+                task=ModelTask.REDUCE
             )
             
         except Exception as e:
@@ -177,9 +350,10 @@ class OpenAIService:
         self,
         chunks: List[str],
         query: Optional[str] = None,
-        language: str = "en"
+        language: str = "en",
+        on_chunk: Optional[Callable[[int, int], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
-        """Process large documents by analyzing chunks"""
+        """Process large documents by analyzing chunks; ``on_chunk(done, total)`` reports progress"""
         try:
             chunk_summaries = []
             
@@ -213,7 +387,9 @@ class OpenAIService:
                     messages, 
                     language, 
                     temperature=0.3,
-                    max_tokens=500
+                    max_tokens=500,
+                    priority=Priority.BACKGROUND,
+                    task=ModelTask.CHUNK_MAP
                 )
                 
                 if chunk_result.get("content") and "No relevant information" not in chunk_result["content"]:
@@ -221,6 +397,8 @@ class OpenAIService:
                         "chunk_index": i,
                         "summary": chunk_result["content"]
                     })
+                if on_chunk is not None:
+                    await on_chunk(i + 1, len(chunks))
             
             # Combine chunk summaries into final response
             if chunk_summaries:
@@ -241,7 +419,8 @@ class OpenAIService:
                     messages, 
                     language, 
                     temperature=0.5,
-                    max_tokens=1000
+                    max_tokens=1000,
+                    task=ModelTask.REDUCE
                 )
                 
                 return {
@@ -249,6 +428,7 @@ class OpenAIService:
                     "confidence": final_result.get("confidence", 0.8),
                     "chunks_processed": len(chunks),
                     "relevant_chunks": len(chunk_summaries),
+                    "chunk_summaries": chunk_summaries,
                     "usage": final_result.get("usage")
                 }
             else:
@@ -290,7 +470,8 @@ class OpenAIService:
                 messages, 
                 language, 
                 temperature=0.2,  # Very low temperature for medical accuracy
-                max_tokens=1500
+                max_tokens=1500,
+                task=ModelTask.HEALTH_INSIGHTS
             )
             
         except Exception as e:
@@ -0,0 +1,328 @@
+from typing import Optional, List, Dict, Any
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from bson.binary import Binary # type: ignore
+from pymongo import ASCENDING, DESCENDING # type: ignore
+import asyncio
+import logging
+import math
+import re
+
+from config import settings
+from database import get_database
+
+# Optional local embeddings (pip install sentence-transformers)
+try:
+    import numpy as np # type: ignore
+    from sentence_transformers import SentenceTransformer # type: ignore
+except ImportError:
+    np = None
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can do does for from has have how i if in is it its my "
+    "of on or so that the their there this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word and number tokens without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a document's chunks.
+
+    Only per-chunk term counts are kept; lengths and document frequencies are
+    derived on load, so the stored form stays small.
+    """
+
+    def __init__(self, term_freqs: List[Dict[str, int]], k1: float = 1.5, b: float = 0.75):
+        self.term_freqs = term_freqs
+        self.k1 = k1
+        self.b = b
+        self.lengths = [sum(tf.values()) for tf in term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.doc_freqs: Counter = Counter()
+        for tf in term_freqs:
+            self.doc_freqs.update(tf.keys())
+
+    @classmethod
+    def build(cls, chunks: List[str]) -> "BM25Index":
+        return cls([dict(Counter(tokenize(chunk))) for chunk in chunks])
+
+    def _idf(self, term: str) -> float:
+        n = len(self.term_freqs)
+        df = self.doc_freqs.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of every chunk for ``query``."""
+        terms = set(tokenize(query))
+        scores = [0.0] * len(self.term_freqs)
+        if not terms or not self.avg_length:
+            return scores
+        for term in terms:
+            if term not in self.doc_freqs:
+                continue
+            idf = self._idf(term)
+            for i, tf in enumerate(self.term_freqs):
+                freq = tf.get(term)
+                if freq:
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                    scores[i] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+    def to_document(self) -> Dict[str, Any]:
+        # Terms are stored as pairs because BSON field names can't be arbitrary text
+        return {"k1": self.k1, "b": self.b, "terms": [list(tf.items()) for tf in self.term_freqs]}
+
+    @classmethod
+    def from_document(cls, data: Dict[str, Any]) -> "BM25Index":
+        return cls([dict(pairs) for pairs in data["terms"]], k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+
+
+@dataclass
+class DocumentIndex:
+    bm25: BM25Index
+    embeddings: Any = None  # normalized float16 matrix, one row per chunk
+    embedding_model: Optional[str] = None
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self.bm25.term_freqs)
+
+
+@dataclass
+class StoredDocument:
+    """A document's chunks, index and analysis as kept in session memory."""
+    document_id: str
+    file_name: Optional[str]
+    chunks: List[str]
+    index: DocumentIndex
+    summary: Optional[str] = None
+    chunk_summaries: Optional[Dict[int, str]] = None
+    question: Optional[str] = None  # set when the upload came with a question
+    answer: Optional[str] = None
+
+
+def _rank(scores: List[float]) -> List[int]:
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+
+
+class RetrievalService:
+    """
+    Per-document retrieval over extracted chunks.
+
+    Indexes are built at upload time and stored in ``document_indexes`` with
+    the chunks, so questions (including follow-ups) send only the top-k
+    relevant chunks to the LLM. Stored documents are keyed by chat session
+    too, together with the analysis summaries, and act as the session's
+    document memory. BM25 always runs; if ``retrieval_embedding_model``
+    is set and sentence-transformers is installed, chunk embeddings are stored
+    as float16 and fused with BM25 by reciprocal rank.
+    """
+
+    def __init__(self, embedding_model: Optional[str] = None):
+        self.embedding_model = embedding_model
+        self._encoder = None
+        self._indexes_created = False
+
+    async def _get_collections(self):
+        """Get database collections."""
+        db = await get_database()
+        return {
+            'document_indexes': db.document_indexes
+        }
+
+    @property
+    def embeddings_enabled(self) -> bool:
+        return bool(self.embedding_model) and SentenceTransformer is not None
+
+    def _encode(self, texts: List[str]):
+        if self._encoder is None:
+            self._encoder = SentenceTransformer(self.embedding_model)
+        vectors = self._encoder.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float16)
+
+    async def build_index(self, chunks: List[str]) -> DocumentIndex:
+        """Build the BM25 index (and embeddings when enabled) for a document's chunks."""
+        # Both are CPU-bound; keep them off the event loop
+        bm25 = await asyncio.to_thread(BM25Index.build, chunks)
+        index = DocumentIndex(bm25=bm25)
+        if self.embeddings_enabled:
+            try:
+                index.embeddings = await asyncio.to_thread(self._encode, chunks)
+                index.embedding_model = self.embedding_model
+            except Exception as e:
+                logger.error(f"Error embedding document chunks: {e}")
+        return index
+
+    async def search(self, index: DocumentIndex, query: str, k: int) -> List[int]:
+        """
+        Indices of the ``k`` most relevant chunks, in document order.
+
+        Returns an empty list when nothing in the document matches the query.
+        """
+        bm25_scores = index.bm25.scores(query)
+        rankings = []
+        if any(score > 0 for score in bm25_scores):
+            rankings.append([i for i in _rank(bm25_scores) if bm25_scores[i] > 0])
+
+        if index.embeddings is not None and index.embedding_model == self.embedding_model and self.embeddings_enabled:
+            try:
+                query_vector = (await asyncio.to_thread(self._encode, [query]))[0]
+                similarities = (index.embeddings.astype(np.float32) @ query_vector.astype(np.float32)).tolist()
+                rankings.append(_rank(similarities))
+            except Exception as e:
+                logger.error(f"Error embedding query: {e}")
+
+        if not rankings:
+            return []
+
+        # Reciprocal rank fusion; with BM25 alone this is just the BM25 order
+        fused: Dict[int, float] = {}
+        for ranking in rankings:
+            for position, chunk_index in enumerate(ranking):
+                fused[chunk_index] = fused.get(chunk_index, 0.0) + 1.0 / (60 + position)
+        top = sorted(fused, key=lambda i: fused[i], reverse=True)[:k]
+        return sorted(top)
+
+    async def ensure_indexes(self, collections: Dict) -> None:
+        if self._indexes_created:
+            return
+        await collections['document_indexes'].create_index([("document_id", ASCENDING)], unique=True)
+        await collections['document_indexes'].create_index([("session_id", ASCENDING), ("created_at", DESCENDING)])
+        self._indexes_created = True
+
+    async def save_index(
+        self,
+        document_id: str,
+        user_id: str,
+        chunks: List[str],
+        index: DocumentIndex,
+        session_id: Optional[str] = None,
+        file_name: Optional[str] = None
+    ) -> None:
+        """Store a document's chunks and index for later questions."""
+        try:
+            collections = await self._get_collections()
+            await self.ensure_indexes(collections)
+
+            index_data = {
+                "document_id": document_id,
+                "user_id": user_id,
+                "session_id": session_id,
+                "file_name": file_name,
+                "chunks": chunks,
+                "chunk_count": len(chunks),
+                "bm25": index.bm25.to_document(),
+                "embedding_model": index.embedding_model,
+                "embeddings": Binary(index.embeddings.tobytes()) if index.embeddings is not None else None,
+                "embedding_dims": int(index.embeddings.shape[1]) if index.embeddings is not None else None,
+                "summary": None,
+                "chunk_summaries": [],
+                "question": None,
+                "answer": None,
+                "created_at": datetime.utcnow()
+            }
+            await collections['document_indexes'].replace_one(
+                {"document_id": document_id}, index_data, upsert=True
+            )
+
+        except Exception as e:
+            logger.error(f"Error saving document index: {e}")
+
+    async def save_summaries(
+        self,
+        document_id: str,
+        summary: Optional[str],
+        chunk_summaries: Optional[Dict[int, str]] = None
+    ) -> None:
+        """Attach the analysis and per-chunk summaries to a stored document."""
+        try:
+            collections = await self._get_collections()
+            await collections['document_indexes'].update_one(
+                {"document_id": document_id},
+                {"$set": {
+                    "summary": summary,
+                    # [chunk index, summary] pairs, for the same reason as the BM25 terms
+                    "chunk_summaries": [[i, text] for i, text in sorted((chunk_summaries or {}).items())]
+                }}
+            )
+        except Exception as e:
+            logger.error(f"Error saving document summaries: {e}")
+
+    async def save_answer(self, document_id: str, question: str, answer: Optional[str]) -> None:
+        """Attach the answer to the question the document was uploaded with; it isn't a summary of the document."""
+        try:
+            collections = await self._get_collections()
+            await collections['document_indexes'].update_one(
+                {"document_id": document_id},
+                {"$set": {"question": question, "answer": answer}}
+            )
+        except Exception as e:
+            logger.error(f"Error saving document answer: {e}")
+
+    async def get_document(self, document_id: str, user_id: str) -> Optional[StoredDocument]:
+        """Load a stored document's chunks and index."""
+        try:
+            collections = await self._get_collections()
+            index_data = await collections['document_indexes'].find_one(
+                {"document_id": document_id, "user_id": user_id}
+            )
+            return self._stored_document(index_data) if index_data else None
+
+        except Exception as e:
+            logger.error(f"Error loading document index: {e}")
+            return None
+
+    async def get_session_documents(self, session_id: str, user_id: str, limit: int = 5) -> List[StoredDocument]:
+        """Most recently stored documents of a chat session."""
+        try:
+            collections = await self._get_collections()
+            cursor = collections['document_indexes'].find(
+                {"session_id": session_id, "user_id": user_id}
+            ).sort("created_at", DESCENDING).limit(limit)
+            return [self._stored_document(index_data) async for index_data in cursor]
+
+        except Exception as e:
+            logger.error(f"Error loading session documents: {e}")
+            return []
+
+    async def delete_document(self, document_id: str, user_id: str) -> None:
+        try:
+            collections = await self._get_collections()
+            await collections['document_indexes'].delete_one({"document_id": document_id, "user_id": user_id})
+        except Exception as e:
+            logger.error(f"Error deleting document index: {e}")
+
+    def _stored_document(self, index_data: Dict[str, Any]) -> StoredDocument:
+        return StoredDocument(
+            document_id=index_data["document_id"],
+            file_name=index_data.get("file_name"),
+            chunks=index_data["chunks"],
+            index=self._from_document(index_data),
+            summary=index_data.get("summary"),
+            chunk_summaries={i: text for i, text in index_data.get("chunk_summaries") or []},
+            question=index_data.get("question"),
+            answer=index_data.get("answer")
+        )
+
+    def _from_document(self, index_data: Dict[str, Any]) -> DocumentIndex:
+        index = DocumentIndex(bm25=BM25Index.from_document(index_data["bm25"]))
+        if index_data.get("embeddings") is not None and np is not None:
+            index.embeddings = np.frombuffer(index_data["embeddings"], dtype=np.float16).reshape(
+                -1, index_data["embedding_dims"]
+            )
+            index.embedding_model = index_data.get("embedding_model")
+        return index
+
+
+# Create singleton instance
+retrieval_service = RetrievalService(embedding_model=settings.retrieval_embedding_model)
@@ -2,15 +2,18 @@ import httpx # type: ignore
 import base64
 from typing import Optional, Dict, Any
 from config import settings
+from utils.metrics import sarvam_request_duration
+from utils.tracing import traced_class, TracingTransport
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@traced_class
 class SarvamAIService:
     def __init__(self):
         self.api_key = settings.sarvam_api_key
-        self.base_url = "https://api.sarvam.ai"
+        self.base_url = settings.sarvam_base_url.rstrip("/")
         self.headers = {
             "api-subscription-key": self.api_key,
             "Content-Type": "application/json"
@@ -19,7 +22,7 @@ class SarvamAIService:
     async def speech_to_text(self, audio_file_content: bytes, language_code: str = "en-IN") -> Dict[str, Any]:
         """Convert speech to text using Sarvam AI"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient(transport=TracingTransport()) as client:
                 files = {"file": ("audio.wav", audio_file_content, "audio/wav")}
                 data = {
                     "language_code": language_code,
@@ -27,14 +30,15 @@ class SarvamAIService:
                 }
                 headers = {"api-subscription-key": self.api_key}
                 
-                response = await client.post(
-                    f"{self.base_url}/speech-to-text",
-                    files=files,
-                    data=data,
-                    headers=headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
+                with sarvam_request_duration.time(endpoint="speech-to-text"):
+                    response = await client.post(
+                        f"{self.base_url}/speech-to-text",
+                        files=files,
+                        data=data,
+                        headers=headers,
+                        timeout=30.0
+                    )
+                    response.raise_for_status()
                 return response.json()
         except Exception as e:
             logger.error(f"Speech to text error: {e}")
@@ -72,7 +76,7 @@ class SarvamAIService:
             # Ensure speed is within valid range
             speed = max(0.3, min(3.0, speed))
             
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient(transport=TracingTransport()) as client:
                 payload = {
                     "text": text,
                     "target_language_code": language_code,
@@ -83,18 +87,19 @@ class SarvamAIService:
                 
                 logger.info(f"TTS request payload: {payload}")
                 
-                response = await client.post(
-                    f"{self.base_url}/text-to-speech",
-                    json=payload,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                
-                logger.info(f"TTS response status: {response.status_code}")
-                if response.status_code != 200:
-                    logger.error(f"TTS response body: {response.text}")
-                
-                response.raise_for_status()
+                with sarvam_request_duration.time(endpoint="text-to-speech"):
+                    response = await client.post(
+                        f"{self.base_url}/text-to-speech",
+                        json=payload,
+                        headers=self.headers,
+                        timeout=30.0
+                    )
+                    
+                    logger.info(f"TTS response status: {response.status_code}")
+                    if response.status_code != 200:
+                        logger.error(f"TTS response body: {response.text}")
+                    
+                    response.raise_for_status()
                 return response.json()
         except Exception as e:
             logger.error(f"Text to speech error: {e}")
@@ -108,7 +113,7 @@ class SarvamAIService:
     ) -> Dict[str, Any]:
         """Translate text using Sarvam AI"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient(transport=TracingTransport()) as client:
                 payload = {
                     "input": text,
                     "source_language_code": source_language,
@@ -116,13 +121,14 @@ class SarvamAIService:
                     "model": "mayura:v1"
                 }
                 
-                response = await client.post(
-                    f"{self.base_url}/translate",
-                    json=payload,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
+                with sarvam_request_duration.time(endpoint="translate"):
+                    response = await client.post(
+                        f"{self.base_url}/translate",
+                        json=payload,
+                        headers=self.headers,
+                        timeout=30.0
+                    )
+                    response.raise_for_status()
                 return response.json()
         except Exception as e:
             logger.error(f"Translation error: {e}")
@@ -131,16 +137,17 @@ class SarvamAIService:
     async def detect_language(self, text: str) -> Dict[str, Any]:
         """Detect language of input text"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient(transport=TracingTransport()) as client:
                 payload = {"input": text}
                 
-                response = await client.post(
-                    f"{self.base_url}/text-lid",
-                    json=payload,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
+                with sarvam_request_duration.time(endpoint="text-lid"):
+                    response = await client.post(
+                        f"{self.base_url}/text-lid",
+                        json=payload,
+                        headers=self.headers,
+                        timeout=30.0
+                    )
+                    response.raise_for_status()
                 return response.json()
         except Exception as e:
             logger.error(f"Language detection error: {e}")
@@ -0,0 +1,173 @@
+from typing import Callable, Iterable, Iterator, List, Optional
+from dataclasses import dataclass
+import re
+
+# Accurate token counts when tiktoken is installed
+try:
+    import tiktoken # type: ignore
+except ImportError:
+    tiktoken = None
+
+BLOCK_SEPARATOR = re.compile(r"\n[ \t]*\n+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+# "Hemoglobin: 13.6 g/dL", "HbA1c   6.4 %   4.0-5.6", "| a | b |"
+TABLE_ROW = re.compile(r"(\|.*\|)|(\t)|(\S\s{3,}\S)|(^[^:.!?]{2,60}:\s*[<>]?\d)")
+HEADING = re.compile(r"^(#{1,6}\s+\S.*|[A-Z0-9][A-Z0-9 &/(),-]{2,80}:?|(\d+(\.\d+)*|[IVX]+)[.)]\s+[A-Z][^.!?]{0,80})$")
+
+
+def estimate_tokens(text: str) -> int:
+    """About four characters per token, the same heuristic the OpenAI scheduler uses."""
+    return max(1, len(text) // 4)
+
+
+def tiktoken_counter(encoding: str = "cl100k_base") -> Optional[Callable[[str], int]]:
+    """Exact token counter, or None if tiktoken isn't installed."""
+    if tiktoken is None:
+        return None
+    encoder = tiktoken.get_encoding(encoding)
+    return lambda text: len(encoder.encode(text, disallowed_special=()))
+
+
+@dataclass
+class _Unit:
+    text: str
+    tokens: int
+    joiner: str  # separator placed before this unit when it isn't first in a chunk
+    heading: bool = False
+
+
+class TextChunker:
+    """
+    Structure-aware chunking with a token budget.
+
+    Text is read block by block (blank-line separated), never as one big word
+    list. A heading starts a new chunk once the current one is reasonably
+    full, so sections stay with their titles. Tables and runs of lab-value
+    lines are split only between rows. Prose that doesn't fit is split
+    between sentences; only a sentence longer than the whole budget is cut
+    at whitespace. Consecutive chunks share up to ``overlap_tokens`` of
+    trailing rows or sentences.
+    """
+
+    def __init__(
+        self,
+        target_tokens: int = 1000,
+        overlap_tokens: int = 100,
+        count_tokens: Optional[Callable[[str], int]] = None
+    ):
+        if overlap_tokens >= target_tokens:
+            raise ValueError("overlap_tokens must be smaller than target_tokens")
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens or estimate_tokens
+        # A heading only forces a break once the chunk is at least this full
+        self.min_section_tokens = target_tokens * 2 // 3
+
+    def chunk(self, text: str) -> List[str]:
+        return list(self.iter_chunks(text))
+
+    def chunk_pages(self, pages: Iterable[str]) -> List[str]:
+        """Chunk a document given page by page, e.g. straight from a PDF page iterator."""
+        return list(self._assemble(unit for page in pages for unit in self._units(page)))
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        return self._assemble(self._units(text))
+
+    def _assemble(self, units: Iterable[_Unit]) -> Iterator[str]:
+        current: List[_Unit] = []
+        current_tokens = 0
+
+        for unit in units:
+            starts_section = unit.heading and current_tokens >= self.min_section_tokens
+            if current and (starts_section or current_tokens + unit.tokens > self.target_tokens):
+                yield self._join(current)
+                # New sections start clean; otherwise carry the tail over as overlap
+                current = [] if starts_section else self._overlap(current)
+                current_tokens = sum(u.tokens for u in current)
+                # Drop overlap that would push this unit over the budget
+                while current and current_tokens + unit.tokens > self.target_tokens:
+                    current_tokens -= current.pop(0).tokens
+            current.append(unit)
+            current_tokens += unit.tokens
+
+        if current:
+            yield self._join(current)
+
+    def _overlap(self, units: List[_Unit]) -> List[_Unit]:
+        if not self.overlap_tokens:
+            return []
+        tail: List[_Unit] = []
+        tokens = 0
+        for unit in reversed(units):
+            if unit.heading or tokens + unit.tokens > self.overlap_tokens:
+                break
+            tail.insert(0, unit)
+            tokens += unit.tokens
+        return tail
+
+    def _join(self, units: List[_Unit]) -> str:
+        parts = [units[0].text]
+        for unit in units[1:]:
+            parts.append(unit.joiner)
+            parts.append(unit.text)
+        return "".join(parts).strip()
+
+    def _blocks(self, text: str) -> Iterator[str]:
+        start = 0
+        for match in BLOCK_SEPARATOR.finditer(text):
+            block = text[start:match.start()].strip("\n")
+            if block.strip():
+                yield block
+            start = match.end()
+        block = text[start:].strip("\n")
+        if block.strip():
+            yield block
+
+    def _units(self, text: str) -> Iterator[_Unit]:
+        for block in self._blocks(text):
+            lines = [line.strip() for line in block.split("\n") if line.strip()]
+            lead = "\n\n"  # joiner for the block's first unit
+
+            # A heading line at the top of a block is its own unit
+            if lines and len(lines[0]) <= 80 and HEADING.match(lines[0]) and not TABLE_ROW.search(lines[0]):
+                yield _Unit(lines[0], self.count_tokens(lines[0]), lead, heading=True)
+                lines = lines[1:]
+                lead = "\n"
+            if not lines:
+                continue
+
+            table_rows = sum(1 for line in lines if TABLE_ROW.search(line))
+            if len(lines) > 1 and table_rows * 2 >= len(lines):
+                # Table or list of lab values: keep rows whole
+                for i, line in enumerate(lines):
+                    yield from self._split_long(line, lead if i == 0 else "\n")
+                continue
+
+            paragraph = " ".join(lines)
+            tokens = self.count_tokens(paragraph)
+            if tokens <= self.target_tokens:
+                yield _Unit(paragraph, tokens, lead)
+                continue
+            for i, sentence in enumerate(SENTENCE_END.split(paragraph)):
+                yield from self._split_long(sentence, lead if i == 0 else " ")
+
+    def _split_long(self, text: str, joiner: str) -> Iterator[_Unit]:
+        """Yield ``text`` as one unit, or cut at whitespace if it alone exceeds the budget."""
+        tokens = self.count_tokens(text)
+        if tokens <= self.target_tokens:
+            yield _Unit(text, tokens, joiner)
+            return
+        # Aim well under the budget so the pieces leave room for overlap
+        max_chars = max(1, len(text) * self.target_tokens // tokens // 2)
+        start = 0
+        while start < len(text):
+            end = min(len(text), start + max_chars)
+            if end < len(text):
+                space = text.rfind(" ", start, end)
+                if space > start:
+                    end = space
+            piece = text[start:end].strip()
+            if piece:
+                yield _Unit(piece, self.count_tokens(piece), joiner)
+                joiner = " "
+            start = end
@@ -10,10 +10,13 @@ from models.user import (
 )
 from utils.auth import get_password_hash, verify_password, create_access_token, generate_reset_token, create_session_token
 from database import get_database
+from services.health_score_service import health_score_service
+from utils.tracing import traced_class
 
 logger = logging.getLogger(__name__)
 
 
+@traced_class
 class UserService:
     async def _get_collections(self):
         """Get database collections."""
@@ -331,14 +334,13 @@ class UserService:
 
     async def _update_user_stats(self, user_id: str, users_collection) -> None:
         """Update user statistics like streak, appointments, medications."""
-        # This is a placeholder for calculating user statistics
-        # You can implement the actual logic based on your business requirements
         try:
-            # For now, we'll just update the last_active timestamp
             await users_collection.update_one(
                 {"_id": ObjectId(user_id)},
                 {"$set": {"updated_at": datetime.utcnow()}}
             )
+            # Refresh the health score in the background (debounced)
+            health_score_service.schedule_recompute(user_id)
         except Exception as e:
             logger.error(f"Error updating user stats: {e}")
 
@@ -0,0 +1,78 @@
+import gzip
+import os
+
+import pytest
+
+import utils.compression as compression
+from utils.compression import accepted_encodings, encoded_etag, unencoded_etag
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # Negotiation only; nothing is encoded, so the brotli package isn't needed
+    monkeypatch.setattr(compression, "SUPPORTED_ENCODINGS", ("br", "gzip"))
+
+
+def test_no_header_means_no_encoding():
+    assert accepted_encodings(None) == []
+    assert accepted_encodings("") == []
+    assert accepted_encodings("identity") == []
+
+
+def test_unsupported_encodings_are_ignored():
+    assert accepted_encodings("deflate, gzip") == ["gzip"]
+
+
+def test_q_zero_refuses_an_encoding():
+    assert accepted_encodings("gzip;q=0") == []
+    assert accepted_encodings("*, gzip;q=0") == [e for e in compression.SUPPORTED_ENCODINGS if e != "gzip"]
+
+
+def test_invalid_q_value_refuses_an_encoding():
+    assert accepted_encodings("gzip;q=high") == []
+
+
+def test_higher_q_value_is_preferred(with_brotli):
+    assert accepted_encodings("gzip;q=1.0, br;q=0.5") == ["gzip", "br"]
+    assert accepted_encodings("gzip;q=0.2, br") == ["br", "gzip"]
+
+
+def test_ties_prefer_brotli(with_brotli):
+    assert accepted_encodings("gzip, br") == ["br", "gzip"]
+
+
+def test_wildcard_covers_unlisted_encodings(with_brotli):
+    assert accepted_encodings("gzip, *;q=0.1") == ["gzip", "br"]
+    assert accepted_encodings("GZIP") == ["gzip"]
+
+
+def test_encoded_etag_round_trip():
+    assert encoded_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert unencoded_etag('"abc-gzip"') == '"abc"'
+    assert unencoded_etag('"abc-br"') == '"abc"'
+    assert unencoded_etag('"abc"') == '"abc"'
+
+
+def test_weak_etags_are_not_rewritten():
+    assert encoded_etag('W/"abc"', "gzip") == 'W/"abc"'
+
+
+def test_only_text_and_wav_are_precompressed():
+    assert compression.is_precompressible("uploads/documents/report.txt")
+    assert compression.is_precompressible("uploads/audio/reply.wav")
+    assert not compression.is_precompressible("uploads/documents/report.pdf")
+    assert not compression.is_precompressible("uploads/documents/scan.jpg")
+    assert not compression.is_precompressible("uploads/audio/voice.mp3")
+
+
+def test_precompress_keeps_only_variants_that_shrink(tmp_path):
+    text = tmp_path / "report.txt"
+    text.write_bytes(b"Hemoglobin: 13.2 g/dL\n" * 500)
+    noise = tmp_path / "noise.txt"
+    noise.write_bytes(os.urandom(20000))
+
+    written = compression.precompress_file(str(text))
+    assert str(text) + ".gz" in written
+    assert gzip.decompress((tmp_path / "report.txt.gz").read_bytes()) == text.read_bytes()
+    assert compression.precompress_file(str(noise)) == []
+    assert not list(tmp_path.glob("*.tmp"))
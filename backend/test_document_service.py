@@ -14,7 +14,7 @@ async def test_document_service():
     
     # Test text chunking
     sample_text = "This is a test document. " * 100  # Create a long text
-    chunks = document_service.chunk_text(sample_text, max_chunk_size=200)
+    chunks = document_service.chunk_text(sample_text, target_tokens=50, overlap_tokens=10)
     print(f"Text chunking test: Created {len(chunks)} chunks from {len(sample_text)} characters")
     
     # Test summary creation
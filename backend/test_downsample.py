@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+import asyncio
+
+from utils.downsample import bucket_size, lttb
+
+
+def series(count: int):
+    xs = [float(i) for i in range(count)]
+    ys = [float(i % 7) for i in range(count)]
+    return xs, ys
+
+
+def test_lttb_returns_threshold_points_including_endpoints():
+    xs, ys = series(1000)
+    selected = lttb(xs, ys, 50)
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert selected == sorted(set(selected))
+
+
+def test_lttb_keeps_short_series_whole():
+    xs, ys = series(20)
+    assert lttb(xs, ys, 20) == list(range(20))
+    assert lttb(xs, ys, 100) == list(range(20))
+
+
+def test_lttb_keeps_a_spike():
+    xs = [float(i) for i in range(500)]
+    ys = [1.0] * 500
+    ys[321] = 50.0
+    assert 321 in lttb(xs, ys, 20)
+
+
+def test_lttb_below_three_points_keeps_endpoints():
+    xs, ys = series(100)
+    assert lttb(xs, ys, 2) == [0, 99]
+
+
+def test_bucket_size_is_the_smallest_that_fits():
+    assert bucket_size(timedelta(days=1), 100) == ("minute", 15)
+    assert bucket_size(timedelta(days=1), 25) == ("hour", 1)
+    assert bucket_size(timedelta(days=30), 31) == ("day", 1)
+
+
+def test_bucket_size_caps_at_a_year():
+    assert bucket_size(timedelta(days=365 * 50), 10) == ("year", 1)
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield row
+
+
+class FakeCollection:
+    """Records the aggregation pipeline and returns canned rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.pipeline = None
+
+    def aggregate(self, pipeline):
+        self.pipeline = pipeline
+        return FakeCursor(self.rows)
+
+
+def test_buckets_average_blood_pressure_from_the_value(monkeypatch):
+    from repositories.metric_repository import MetricRepository
+
+    start = datetime(2024, 5, 1)
+    collection = FakeCollection([{
+        "_id": {"metric_type": "blood_pressure", "start": start},
+        "value": None, "systolic": 125.0, "diastolic": 82.5, "unit": "mmHg", "count": 2
+    }])
+    repository = MetricRepository()
+
+    async def fake_collection(read_only=False):
+        return collection
+
+    monkeypatch.setattr(repository, "_collection", fake_collection)
+    buckets = asyncio.run(repository.get_buckets("user", "day", 1))
+
+    assert (buckets[0].systolic, buckets[0].diastolic, buckets[0].count) == (125.0, 82.5, 2)
+    group = collection.pipeline[1]["$group"]
+    # Readings stored as just "120/80" fall back to the split value
+    for field, index in (("systolic", 0), ("diastolic", 1)):
+        fallback = group[field]["$avg"]["$ifNull"]
+        assert fallback[0] == f"${field}"
+        split = fallback[1]["$cond"][1]["$convert"]["input"]["$arrayElemAt"]
+        assert split[1] == index and "$split" in split[0]
+
+
+def test_bucketed_metrics_format_averages(monkeypatch):
+    from repositories.metric_repository import MetricBucket, metric_repository
+    from services.health_service import health_service
+
+    start = datetime(2024, 5, 1)
+    buckets = [
+        MetricBucket("blood_pressure", start, 3, "mmHg", systolic=121.4, diastolic=79.6),
+        MetricBucket("heart_rate", start, 1, "bpm", value=72.25),
+        MetricBucket("weight", start, 2, "kg"),  # nothing numeric to average
+    ]
+
+    async def time_range(*args):
+        return start, start + timedelta(days=30)
+
+    async def get_buckets(*args):
+        return buckets
+
+    monkeypatch.setattr(metric_repository, "get_time_range", time_range)
+    monkeypatch.setattr(metric_repository, "get_buckets", get_buckets)
+    rows = asyncio.run(health_service._get_bucketed_metrics("user", None, None, None, 31))
+
+    assert [(row["type"], row["value"], row["notes"]) for row in rows] == [
+        ("Blood Pressure", "121/80", "Average of 3 readings"),
+        ("Heart Rate", "72.2", None),
+    ]
+
+
+def test_blood_pressure_parts_are_read_from_the_value():
+    from models.health import MetricType
+    from services.health_service import health_service
+
+    assert health_service._blood_pressure_parts(MetricType.BLOOD_PRESSURE, "120/80", None, None) == (120, 80)
+    assert health_service._blood_pressure_parts(MetricType.BLOOD_PRESSURE, "120/80", 118, 76) == (118, 76)
+    assert health_service._blood_pressure_parts(MetricType.HEART_RATE, "72", None, None) == (None, None)
@@ -0,0 +1,25 @@
+from bson import ObjectId # type: ignore
+import pytest
+
+from services.export_service import InvalidExportCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    last_id = ObjectId()
+    assert decode_cursor(encode_cursor("health_metrics", last_id)) == ("health_metrics", last_id)
+
+
+def test_non_object_id_is_kept_as_string():
+    assert decode_cursor("chat_messages:legacy-42") == ("chat_messages", "legacy-42")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "health_metrics",
+    "health_metrics:",
+    "users:5f43a1b2c3d4e5f6a7b8c9d0",
+    ":5f43a1b2c3d4e5f6a7b8c9d0",
+])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidExportCursor):
+        decode_cursor(cursor)
@@ -0,0 +1,69 @@
+from datetime import date
+
+from models.health import MetricType
+from services.lab_extractor import LabValueExtractor, parse_report_date
+
+
+def extract(text: str):
+    return {value.metric_type: value for value in LabValueExtractor().extract(text)}
+
+
+def test_units_are_converted_to_stored_units():
+    values = extract(
+        "Fasting Blood Sugar: 6.2 mmol/L\n"
+        "HbA1c 48 mmol/mol\n"
+        "Weight: 154 lbs\n"
+        "Temperature 38.5 C\n"
+        "Total Cholesterol: 5.2 mmol/L"
+    )
+    assert (values[MetricType.BLOOD_GLUCOSE].value, values[MetricType.BLOOD_GLUCOSE].unit) == ("112", "mg/dL")
+    assert (values[MetricType.HBA1C].value, values[MetricType.HBA1C].unit) == ("6.5", "%")
+    assert (values[MetricType.WEIGHT].value, values[MetricType.WEIGHT].unit) == ("69.9", "kg")
+    assert (values[MetricType.TEMPERATURE].value, values[MetricType.TEMPERATURE].unit) == ("101.3", "°F")
+    assert values[MetricType.CHOLESTEROL].value == "201"
+
+
+def test_implausible_values_are_dropped():
+    values = extract("Heart Rate: 900 bpm\nSpO2: 40 %\nBP: 80/120 mmHg\nPulse: 72 bpm")
+    assert MetricType.OXYGEN_SATURATION not in values
+    assert MetricType.BLOOD_PRESSURE not in values
+    assert values[MetricType.HEART_RATE].value == "72"
+
+
+def test_blood_pressure_keeps_both_readings():
+    value = extract("Blood Pressure: 130/85 mmHg")[MetricType.BLOOD_PRESSURE]
+    assert (value.value, value.systolic, value.diastolic) == ("130/85", 130, 85)
+
+
+def test_reference_range_is_ignored():
+    assert extract("Glucose (Fasting)   98 mg/dL   70-110")[MetricType.BLOOD_GLUCOSE].value == "98"
+
+
+def test_dates_are_day_first():
+    assert parse_report_date("05/03/2024") == date(2024, 3, 5)
+    assert parse_report_date("05-03-24") == date(2024, 3, 5)
+    assert parse_report_date("12 Mar 2024") == date(2024, 3, 12)
+    assert parse_report_date("2024-03-05") == date(2024, 3, 5)
+
+
+def test_implausible_dates_are_rejected():
+    assert parse_report_date("01/01/1900") is None
+    assert parse_report_date("31/02/2024") is None
+
+
+def test_date_lines_apply_to_the_values_after_them():
+    values = LabValueExtractor().extract(
+        "Collected on: 05/03/2024\nFasting Glucose: 110 mg/dL\n"
+        "Collected on: 05/06/2024\nFasting Glucose: 101 mg/dL"
+    )
+    assert [(value.value, value.measured_on) for value in values] == [
+        ("110", date(2024, 3, 5)), ("101", date(2024, 6, 5))
+    ]
+
+
+def test_values_without_a_date_line_have_no_date():
+    assert extract("HbA1c: 6.1 %")[MetricType.HBA1C].measured_on is None
+
+
+def test_repeated_values_are_reported_once():
+    assert len(LabValueExtractor().extract("Date: 05/03/2024\nHbA1c: 6.1 %\nHbA1c: 6.1 %")) == 1
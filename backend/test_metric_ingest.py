@@ -0,0 +1,166 @@
+import asyncio
+import json
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException # type: ignore
+from mongomock_motor import AsyncMongoMockClient # type: ignore
+from pymongo.errors import DuplicateKeyError # type: ignore
+
+import repositories.base
+import services.health_service as health_module
+from config import settings
+from controllers.health_controller import health_controller
+from models.health import HealthMetricCreate, HealthMetricReading, MetricType
+from repositories.metric_repository import MetricRepository
+from services.health_service import health_service
+
+
+class FakeRequest:
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self._body = body
+        self.chunk_size = chunk_size
+
+    async def body(self) -> bytes:
+        return self._body
+
+    async def stream(self):
+        for start in range(0, len(self._body), self.chunk_size):
+            yield self._body[start:start + self.chunk_size]
+
+
+def reading(minute: int, device: str = "watch") -> dict:
+    return {
+        "metric_type": "heart_rate", "value": 60 + minute, "unit": "bpm",
+        "measured_at": f"2024-03-05T08:{minute:02d}:00Z", "device_used": device
+    }
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+def new_report() -> dict:
+    return {"received": 0, "rejected": 0, "errors": [], "truncated": False}
+
+
+def test_ndjson_lines_split_across_chunks_are_joined():
+    body = b"\n".join(json.dumps(reading(i)).encode() for i in range(5)) + b"\n\n"
+    rows = asyncio.run(collect(health_controller._iter_ndjson(FakeRequest(body, chunk_size=7))))
+    assert [number for number, _ in rows] == [1, 2, 3, 4, 5]
+    assert [row["value"] for _, row in rows] == [60, 61, 62, 63, 64]
+
+
+def test_ndjson_last_line_without_newline_is_read():
+    body = (json.dumps(reading(0)) + "\n" + json.dumps(reading(1))).encode()
+    rows = asyncio.run(collect(health_controller._iter_ndjson(FakeRequest(body, chunk_size=1000))))
+    assert [number for number, _ in rows] == [1, 2]
+
+
+def test_bad_lines_are_reported_by_row():
+    body = "\n".join([json.dumps(reading(0)), "{not json", json.dumps({**reading(2), "value": None})]).encode()
+    report = new_report()
+    batches = asyncio.run(collect(
+        health_controller._validated_batches(health_controller._iter_ndjson(FakeRequest(body)), report)
+    ))
+    assert sum(len(batch) for batch in batches) == 1
+    assert (report["received"], report["rejected"]) == (3, 2)
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert report["errors"][0]["error"] == "Line is not valid JSON"
+
+
+def test_batches_are_cut_at_write_size(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_batch_write_size", 2)
+    body = json.dumps([reading(i) for i in range(5)]).encode()
+    batches = asyncio.run(collect(
+        health_controller._validated_batches(health_controller._iter_json_array(FakeRequest(body)), new_report())
+    ))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_ndjson_stops_at_row_limit(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_batch_max_rows", 3)
+    body = b"\n".join(json.dumps(reading(i)).encode() for i in range(5))
+    report = new_report()
+    batches = asyncio.run(collect(
+        health_controller._validated_batches(health_controller._iter_ndjson(FakeRequest(body)), report)
+    ))
+    assert sum(len(batch) for batch in batches) == 3
+    assert report["received"] == 3 and report["truncated"]
+
+
+def test_json_array_over_limit_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_batch_max_rows", 3)
+    body = json.dumps([reading(i) for i in range(4)]).encode()
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(collect(health_controller._iter_json_array(FakeRequest(body))))
+    assert error.value.status_code == 413
+
+
+@pytest.mark.parametrize("body", [b"[{", b'{"metric_type": "heart_rate"}'])
+def test_json_body_must_be_an_array(body):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(collect(health_controller._iter_json_array(FakeRequest(body))))
+    assert error.value.status_code == 400
+
+
+def test_duplicates_within_a_batch_are_written_once(monkeypatch):
+    written = []
+
+    async def upsert_readings(docs):
+        written.extend(docs)
+        return len(docs), 0
+
+    async def no_op(user_id):
+        pass
+
+    monkeypatch.setattr(health_module.metric_repository, "upsert_readings", upsert_readings)
+    monkeypatch.setattr(health_service, "_on_user_data_changed", no_op)
+    monkeypatch.setattr(health_module.activity_log_service, "log", lambda *args: None)
+
+    async def batches():
+        # The same reading sent twice, once with a UTC offset, plus one from another device
+        yield [
+            HealthMetricReading.model_validate(reading(0)),
+            HealthMetricReading.model_validate({**reading(0), "measured_at": "2024-03-05T09:00:00+01:00"}),
+            HealthMetricReading.model_validate(reading(0, device="ring")),
+        ]
+
+    counts = asyncio.run(health_service.ingest_health_metrics("user-1", batches()))
+    assert counts == {"inserted": 2, "duplicates": 1}
+    assert {doc["device_used"] for doc in written} == {"watch", "ring"}
+    assert all(doc["measured_at"] == datetime(2024, 3, 5, 8, 0) for doc in written)
+
+
+def test_manual_readings_from_one_device_may_repeat(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+
+    async def get_database():
+        return db
+
+    async def no_op(user_id):
+        pass
+
+    monkeypatch.setattr(repositories.base, "get_database", get_database)
+    monkeypatch.setattr(health_module, "metric_repository", MetricRepository())
+    monkeypatch.setattr(health_service, "_on_user_data_changed", no_op)
+    monkeypatch.setattr(health_module.activity_log_service, "log", lambda *args: None)
+
+    async def run():
+        manual = HealthMetricCreate(
+            metric_type=MetricType.BLOOD_PRESSURE, value="120/80", unit="mmHg",
+            measured_at=date(2024, 3, 5), device_used="Omron"
+        )
+        created = [await health_service.create_health_metric("user-1", manual) for _ in range(2)]
+        synced = health_service._reading_document(
+            "user-1", HealthMetricReading.model_validate({**reading(0), "device_used": "Omron"}), datetime.utcnow()
+        )
+        await db["health_metrics"].insert_one(dict(synced))
+        with pytest.raises(DuplicateKeyError):
+            await db["health_metrics"].insert_one(dict(synced))
+        return created, await db["health_metrics"].count_documents({})
+
+    created, stored = asyncio.run(run())
+    # Only synced readings are unique, so both manual entries are kept
+    assert all(metric is not None for metric in created)
+    assert stored == 3
@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx # type: ignore
+import pytest
+from openai import APIConnectionError # type: ignore
+
+from config import settings
+from services.openai_scheduler import OpenAIScheduler, OpenAIUnavailableError, Priority, estimate_tokens
+from services.openai_service import ModelTask, openai_service
+
+PARAMS = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hello " * 200}], "max_tokens": 500}
+
+
+def fail_then(monkeypatch, failures: int):
+    calls = []
+
+    async def create(**params):
+        calls.append(params)
+        if len(calls) <= failures:
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        return SimpleNamespace(usage=None)
+
+    async def no_sleep(delay):
+        pass
+
+    scheduler = OpenAIScheduler(requests_per_minute=1000, tokens_per_minute=100000)
+    monkeypatch.setattr(openai_service, "scheduler", scheduler)
+    monkeypatch.setattr(openai_service.client.chat.completions, "create", create)
+    monkeypatch.setattr("services.openai_service.asyncio.sleep", no_sleep)
+    monkeypatch.setattr(settings, "openai_max_retries", 2)
+    return scheduler, calls
+
+
+def test_failed_attempts_give_their_tokens_back(monkeypatch):
+    scheduler, calls = fail_then(monkeypatch, failures=2)
+
+    async def run():
+        await openai_service._create_completion(dict(PARAMS), ModelTask.CHAT, Priority.INTERACTIVE)
+        return scheduler.tokens.available
+
+    available = asyncio.run(run())
+    assert len(calls) == 3
+    # Only the successful attempt's estimate is still held
+    estimated = estimate_tokens(PARAMS["messages"], PARAMS["max_tokens"])
+    assert scheduler.tokens.capacity - available == pytest.approx(estimated, abs=50)
+
+
+def test_exhausted_retries_give_their_tokens_back(monkeypatch):
+    scheduler, calls = fail_then(monkeypatch, failures=10)
+
+    async def run():
+        with pytest.raises(OpenAIUnavailableError):
+            await openai_service._create_completion(dict(PARAMS), ModelTask.CHAT, Priority.INTERACTIVE)
+        return scheduler.tokens.available
+
+    assert asyncio.run(run()) == pytest.approx(scheduler.tokens.capacity, rel=0.01)
+    assert len(calls) == 3
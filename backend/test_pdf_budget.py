@@ -0,0 +1,31 @@
+import asyncio
+
+from config import settings
+from services.document_service import PageText, document_service
+
+
+def extract_pdf(monkeypatch, tmp_path, pages, truncated):
+    async def extract_pdf_pages(content, max_chars=None):
+        return {"pages": pages, "page_count": len(pages), "truncated": truncated}
+
+    monkeypatch.setattr(document_service, "extract_pdf_pages", extract_pdf_pages)
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    return asyncio.run(document_service.extract_text_from_file(str(path)))
+
+
+def test_page_separators_do_not_count_towards_the_budget(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "document_max_chars", 30)
+    pages = [PageText(number, "x" * 10, "pdfplumber") for number in (1, 2, 3)]
+    result = extract_pdf(monkeypatch, tmp_path, pages, truncated=False)
+    assert not result["truncated"]
+    assert result["text"] == "\n\n".join(["x" * 10] * 3)
+    assert result["text"] == "\n\n".join(result["pages"])
+
+
+def test_truncation_comes_from_the_page_budget(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "document_max_chars", 15)
+    pages = [PageText(1, "x" * 10, "pdfplumber"), PageText(2, "y" * 5, "pdfplumber")]
+    result = extract_pdf(monkeypatch, tmp_path, pages, truncated=True)
+    assert result["truncated"]
+    assert result["pages"] == ["x" * 10, "y" * 5]
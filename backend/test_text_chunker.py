@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+from services.text_chunker import TextChunker
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def sentences(count: int) -> str:
+    return " ".join(f"Sentence number {i} is here." for i in range(count))
+
+
+def test_chunks_stay_within_budget():
+    chunks = TextChunker(target_tokens=30, overlap_tokens=5, count_tokens=count_words).chunk(sentences(40))
+    assert len(chunks) > 1
+    assert all(count_words(chunk) <= 30 for chunk in chunks)
+
+
+def test_prose_is_split_between_sentences():
+    chunks = TextChunker(target_tokens=30, overlap_tokens=0, count_tokens=count_words).chunk(sentences(40))
+    assert all(chunk.startswith("Sentence number") and chunk.endswith("is here.") for chunk in chunks)
+    # Without overlap every sentence appears exactly once
+    assert " ".join(chunks) == sentences(40)
+
+
+def test_consecutive_chunks_share_overlap():
+    chunks = TextChunker(target_tokens=30, overlap_tokens=10, count_tokens=count_words).chunk(sentences(40))
+    for previous, current in zip(chunks, chunks[1:]):
+        # The next chunk opens with whole trailing sentences of this one, up to the overlap budget
+        shared = [s for s in re.findall(r"Sentence number \d+ is here\.", current) if s in previous]
+        overlap = " ".join(shared)
+        assert shared and current.startswith(overlap) and previous.endswith(overlap)
+        assert count_words(overlap) <= 10
+
+
+def test_sentence_longer_than_budget_is_cut_at_whitespace():
+    chunks = TextChunker(target_tokens=10, overlap_tokens=0, count_tokens=count_words).chunk("word " * 25)
+    assert all(count_words(chunk) <= 10 for chunk in chunks)
+    assert sum(count_words(chunk) for chunk in chunks) == 25
+
+
+def test_table_rows_are_kept_whole():
+    rows = [f"Hemoglobin {i}:   13.{i} g/dL   12.0-15.0" for i in range(12)]
+    chunks = TextChunker(target_tokens=25, overlap_tokens=0, count_tokens=count_words).chunk(
+        "RESULTS\n" + "\n".join(rows)
+    )
+    assert len(chunks) > 1
+    for chunk in chunks:
+        for line in chunk.splitlines():
+            assert line == "RESULTS" or line in rows
+
+
+def test_heading_starts_a_new_chunk():
+    text = (
+        "INTRODUCTION\n\n" + " ".join(f"Intro sentence {i} ends." for i in range(6))
+        + "\n\nFINDINGS\n\n" + " ".join(f"Finding {i} noted." for i in range(4))
+    )
+    chunks = TextChunker(target_tokens=30, overlap_tokens=0, count_tokens=count_words).chunk(text)
+    assert [chunk.splitlines()[0] for chunk in chunks] == ["INTRODUCTION", "FINDINGS"]
+
+
+def test_pages_are_block_boundaries():
+    chunks = TextChunker(target_tokens=50, overlap_tokens=0, count_tokens=count_words).chunk_pages(
+        ["Page one text.", "Page two text."]
+    )
+    assert chunks == ["Page one text.\n\nPage two text."]
+
+
+def test_overlap_must_be_smaller_than_target():
+    with pytest.raises(ValueError):
+        TextChunker(target_tokens=10, overlap_tokens=10)
@@ -0,0 +1,149 @@
+"""
+Content-coding helpers shared by the compression middleware and static files.
+
+gzip is always available; brotli is used when the ``brotli`` package is
+installed. Static files can carry precompressed ``.br``/``.gz`` variants
+next to them, written once when the file is saved.
+"""
+from typing import List, Optional
+from pathlib import Path
+import gzip
+import logging
+import mimetypes
+import os
+import zlib
+
+try:
+    import brotli # type: ignore
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Preferred first when the client weights them equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml"
+)
+# Uncompressed audio (TTS replies) shrinks too; other media and PDFs are compressed already
+PRECOMPRESSED_AUDIO = ("audio/wav", "audio/x-wav", "audio/wave")
+
+
+def accepted_encodings(header: Optional[str]) -> List[str]:
+    """Supported encodings the client accepts, most preferred first."""
+    if not header:
+        return []
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    accepted = []
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > 0:
+            accepted.append((quality, encoding))
+    # sorted() is stable, so ties keep SUPPORTED_ENCODINGS order
+    return [encoding for _, encoding in sorted(accepted, key=lambda item: -item[0])]
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def is_precompressible(path: str) -> bool:
+    """Whether a stored file is worth writing ``.br``/``.gz`` variants of."""
+    content_type = mimetypes.guess_type(path)[0]
+    return is_compressible(content_type) or content_type in PRECOMPRESSED_AUDIO
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """A strong ETag names exact bytes, so an encoded body gets its own: ``"abc"`` -> ``"abc-gzip"``."""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def unencoded_etag(etag: str) -> str:
+    """The ETag ``encoded_etag`` started from; other tags are returned unchanged."""
+    for encoding in VARIANT_SUFFIXES:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+class StreamCompressor:
+    """Incremental gzip or brotli encoder; ``compress`` flushes so each chunk is decodable on arrival."""
+
+    def __init__(self, encoding: str, gzip_level: int = 6, brotli_quality: int = 4):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def compress(data: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """One-shot encoding of a whole body."""
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def precompress_file(path: str, min_bytes: int = 1024, max_ratio: float = 0.9) -> List[str]:
+    """
+    Write ``.br``/``.gz`` variants of ``path`` at maximum compression.
+
+    A variant is kept only if it is at most ``max_ratio`` of the original
+    size; returns the variants written.
+    """
+    source = Path(path)
+    try:
+        data = source.read_bytes()
+    except OSError as e:
+        logger.warning(f"Could not read {path} for precompression: {e}")
+        return []
+    if len(data) < min_bytes:
+        return []
+
+    written = []
+    for encoding in SUPPORTED_ENCODINGS:
+        encoded = compress(data, encoding, gzip_level=9, brotli_quality=11)
+        if len(encoded) > len(data) * max_ratio:
+            continue
+        variant = source.with_name(source.name + VARIANT_SUFFIXES[encoding])
+        # Write aside and rename, so static files never serve a half-written variant
+        partial = variant.with_name(variant.name + ".tmp")
+        partial.write_bytes(encoded)
+        os.replace(partial, variant)
+        written.append(str(variant))
+    return written
+
+
+def remove_variants(path: str) -> None:
+    for suffix in VARIANT_SUFFIXES.values():
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
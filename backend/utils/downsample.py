@@ -0,0 +1,68 @@
+from typing import List, Sequence, Tuple
+from datetime import timedelta
+
+# $dateTrunc (unit, binSize) choices, each with its shortest possible length
+BUCKET_SIZES: Tuple[Tuple[str, int, timedelta], ...] = (
+    ("minute", 1, timedelta(minutes=1)),
+    ("minute", 5, timedelta(minutes=5)),
+    ("minute", 15, timedelta(minutes=15)),
+    ("minute", 30, timedelta(minutes=30)),
+    ("hour", 1, timedelta(hours=1)),
+    ("hour", 3, timedelta(hours=3)),
+    ("hour", 6, timedelta(hours=6)),
+    ("hour", 12, timedelta(hours=12)),
+    ("day", 1, timedelta(days=1)),
+    ("week", 1, timedelta(weeks=1)),
+    ("month", 1, timedelta(days=28)),
+    ("quarter", 1, timedelta(days=89)),
+    ("year", 1, timedelta(days=365)),
+)
+
+
+def bucket_size(span: timedelta, max_points: int) -> Tuple[str, int]:
+    """Smallest $dateTrunc bucket that splits ``span`` into at most ``max_points`` buckets."""
+    for unit, bin_size, length in BUCKET_SIZES:
+        # One extra bucket can appear when the span doesn't start on a boundary
+        if length * max(1, max_points - 1) >= span:
+            return unit, bin_size
+    unit, bin_size, _ = BUCKET_SIZES[-1]
+    return unit, bin_size
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets decimation.
+
+    Returns the indices of at most ``threshold`` points (always the first and
+    last) that keep the visual shape of the series: from each bucket, the
+    point forming the largest triangle with the previous pick and the next
+    bucket's average. ``xs`` must be ascending.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n)) if threshold >= n else [0, n - 1][:max(1, threshold)]
+
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        # Point of this bucket with the largest triangle
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
@@ -0,0 +1,46 @@
+"""
+JSON responses rendered with orjson when it is installed.
+
+List endpoints build plain dict rows in their response schema and return a
+``FastJSONResponse`` directly, so FastAPI skips ``jsonable_encoder`` and the
+body is written in one pass. Without orjson the stdlib encoder is used with
+the same output.
+"""
+from typing import Any
+from datetime import date, datetime
+from enum import Enum
+from bson import ObjectId # type: ignore
+import json
+
+from fastapi.responses import JSONResponse # type: ignore
+
+try:
+    import orjson # type: ignore
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Values neither encoder handles natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson, falling back to the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,287 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Metrics are per process; with several uvicorn workers each worker exposes its
+own ``/metrics`` and Prometheus aggregates them.
+"""
+from typing import Optional, List, Dict, Tuple, Sequence
+from contextlib import contextmanager
+import asyncio
+import threading
+import time
+
+# Default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """Base class; samples are keyed by the tuple of label values."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Pymongo listeners call in from driver threads
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of a block.
+
+        If the histogram has an ``outcome`` label it is filled in with
+        ``success`` or ``error`` depending on whether the block raised.
+        """
+        started = time.perf_counter()
+        outcome = "success"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            if "outcome" in self.labelnames:
+                labels["outcome"] = outcome
+            self.observe(time.perf_counter() - started, **labels)
+
+    def get_count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()}
+        lines = []
+        bucket_names = self.labelnames + ("le",)
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_names, key + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_names, key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames)) # type: ignore
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames)) # type: ignore
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets)) # type: ignore
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format (version 0.0.4)."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# Global registry and application metrics
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by router",
+    ("router", "method", "status")
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ("router",)
+)
+mongodb_command_duration = registry.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency",
+    ("command", "outcome"), buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+mongodb_pool_connections = registry.gauge(
+    "mongodb_pool_connections", "MongoDB pool connections", ("state",)
+)
+mongodb_pool_checkouts = registry.gauge(
+    "mongodb_pool_checkouts", "MongoDB pool checkouts since start", ("outcome",)
+)
+mongodb_pool_wait_seconds = registry.gauge(
+    "mongodb_pool_wait_seconds", "Total time spent waiting for a pooled connection"
+)
+openai_request_duration = registry.histogram(
+    "openai_request_duration_seconds", "OpenAI API call latency", ("model", "task", "outcome")
+)
+openai_tokens = registry.counter(
+    "openai_tokens_total", "OpenAI tokens consumed", ("model", "task", "kind")
+)
+openai_cost = registry.counter(
+    "openai_cost_usd_total", "Estimated OpenAI spend from token usage and list prices", ("model", "task")
+)
+openai_fallbacks = registry.counter(
+    "openai_fallbacks_total", "OpenAI calls retried on the fallback model", ("task", "model")
+)
+openai_queue_wait = registry.histogram(
+    "openai_queue_wait_seconds", "Time OpenAI calls waited for rate-limit capacity", ("priority",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+openai_queue_depth = registry.gauge(
+    "openai_queue_depth", "OpenAI calls waiting for rate-limit capacity", ("priority",)
+)
+openai_retries = registry.counter(
+    "openai_retries_total", "OpenAI calls retried after a transient failure", ("reason",)
+)
+sarvam_request_duration = registry.histogram(
+    "sarvam_request_duration_seconds", "Sarvam AI API call latency", ("endpoint", "outcome")
+)
+document_extraction_duration = registry.histogram(
+    "document_extraction_duration_seconds", "Document text extraction time",
+    ("file_type", "outcome")
+)
+document_pages = registry.counter(
+    "document_pages_extracted_total", "PDF pages extracted, by the method that found text", ("method",)
+)
+ocr_page_duration = registry.histogram(
+    "ocr_page_duration_seconds", "Tesseract recognition time per page",
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+)
+ocr_pages = registry.counter(
+    "ocr_pages_total", "Pages run through OCR, recognized or served from cache", ("source", "result")
+)
+export_records = registry.counter(
+    "export_records_total", "Records written to health record exports", ("collection",)
+)
+event_loop_lag = registry.histogram(
+    "event_loop_lag_seconds", "Delay between a scheduled wake-up and when the event loop ran it",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+event_loop_lag_current = registry.gauge(
+    "event_loop_lag_current_seconds", "Most recent event loop lag sample"
+)
+
+
+def record_pool_stats(stats: Dict) -> None:
+    """Copy a ``PoolStatsListener.snapshot()`` into the pool gauges."""
+    mongodb_pool_connections.set(stats["connections_open"], state="open")
+    mongodb_pool_connections.set(stats["connections_in_use"], state="in_use")
+    mongodb_pool_checkouts.set(stats["checkouts"], outcome="success")
+    mongodb_pool_checkouts.set(sum(stats["checkout_failures"].values()), outcome="failed")
+    mongodb_pool_wait_seconds.set(stats["wait_ms_sum"] / 1000)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5, stop: Optional[asyncio.Event] = None) -> None:
+    """Sample event loop lag until cancelled (or until ``stop`` is set)."""
+    loop = asyncio.get_running_loop()
+    while stop is None or not stop.is_set():
+        scheduled = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - scheduled - interval)
+        event_loop_lag.observe(lag)
+        event_loop_lag_current.set(lag)
@@ -0,0 +1,56 @@
+from typing import Optional
+import mimetypes
+import os
+import stat
+
+from starlette.datastructures import Headers # type: ignore
+from starlette.responses import FileResponse, Response # type: ignore
+from starlette.staticfiles import StaticFiles, NotModifiedResponse # type: ignore
+from starlette.types import Scope # type: ignore
+
+from utils.compression import accepted_encodings, VARIANT_SUFFIXES
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong ETag that changes whenever the file is replaced or rewritten."""
+    return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+class CompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves precompressed ``.br``/``.gz`` variants.
+
+    A variant is used when the client accepts its encoding and it is at least
+    as new as the original. Every file gets a strong ETag from its inode,
+    mtime and size; ``Range`` and ``If-Range`` are handled by FileResponse.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        headers = {"Vary": "Accept-Encoding"}
+
+        variant = self._find_variant(str(full_path), stat_result, request_headers.get("accept-encoding"))
+        if variant is not None and status_code == 200:
+            encoding, variant_path, variant_stat = variant
+            full_path, stat_result = variant_path, variant_stat
+            headers["Content-Encoding"] = encoding
+        headers["ETag"] = file_etag(stat_result)
+
+        response = FileResponse(
+            full_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _find_variant(self, full_path: str, stat_result: os.stat_result, accept_encoding: Optional[str]):
+        for encoding in accepted_encodings(accept_encoding):
+            variant_path = full_path + VARIANT_SUFFIXES[encoding]
+            try:
+                variant_stat = os.stat(variant_path)
+            except OSError:
+                continue
+            if stat.S_ISREG(variant_stat.st_mode) and variant_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+                return encoding, variant_path, variant_stat
+        return None
@@ -0,0 +1,311 @@
+"""
+Lightweight request tracing.
+
+The span API follows OpenTelemetry naming (``start_as_current_span``,
+``set_attribute``, ``record_exception``, W3C ``traceparent``) so it can be
+swapped for the real SDK later, but needs no collector: finished traces are
+written as JSON lines by ``JsonFileExporter`` and can be logged as a
+waterfall in debug mode.
+
+Spans are only recorded inside a request trace started by the tracing
+middleware; elsewhere (scripts, background jobs) every call is a no-op.
+"""
+from typing import Optional, List, Dict, Any, Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import inspect
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+import httpx # type: ignore
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+class Span:
+    def __init__(self, name: str, trace: "Trace", parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "UNSET"
+        self.status_message: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def is_recording(self) -> bool:
+        return self.end_ns is None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_status(self, status: str, message: Optional[str] = None) -> None:
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+        self.set_status("ERROR", str(exc))
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.spans.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1_000_000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """OTLP-style JSON representation."""
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message}
+        }
+
+
+class NonRecordingSpan:
+    """Returned when no trace is active."""
+
+    span_id = None
+    is_recording = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_status(self, status: str, message: Optional[str] = None) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NON_RECORDING_SPAN = NonRecordingSpan()
+
+
+class Trace:
+    """All spans recorded for one request."""
+
+    def __init__(self, request_id: str, trace_id: Optional[str] = None):
+        self.request_id = request_id
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.spans: List[Span] = []
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    """Request ID of the trace being recorded, if any."""
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+def get_current_span():
+    return _current_span.get() or NON_RECORDING_SPAN
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Dict[str, str]]:
+    """Parse a W3C ``traceparent`` header into trace and parent span IDs."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return {"trace_id": parts[1], "parent_id": parts[2]}
+
+
+class JsonFileExporter:
+    """Append finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.error(f"Error exporting spans: {e}")
+
+
+def format_waterfall(trace: Trace, width: int = 40) -> str:
+    """Render a trace as an indented text waterfall."""
+    if not trace.spans:
+        return ""
+    spans = sorted(trace.spans, key=lambda s: s.start_ns)
+    start = spans[0].start_ns
+    total_ns = max(max(s.end_ns or s.start_ns for s in spans) - start, 1)
+    by_id = {s.span_id: s for s in spans}
+
+    def depth(span: Span) -> int:
+        level = 0
+        while span.parent_id in by_id:
+            span = by_id[span.parent_id]
+            level += 1
+        return level
+
+    lines = [f"trace {trace.trace_id} request {trace.request_id} ({total_ns / 1_000_000:.1f} ms)"]
+    for span in spans:
+        offset = int((span.start_ns - start) / total_ns * width)
+        length = max(1, int(((span.end_ns or span.start_ns) - span.start_ns) / total_ns * width))
+        bar = " " * offset + "#" * min(length, width - offset)
+        marker = " !" if span.status == "ERROR" else ""
+        label = "  " * depth(span) + span.name
+        lines.append(f"{bar:<{width}} {span.duration_ms:9.2f} ms  {label}{marker}")
+    return "\n".join(lines)
+
+
+class Tracer:
+    def __init__(self, enabled: bool = True, exporter: Optional[JsonFileExporter] = None,
+                 waterfall: bool = False):
+        self.enabled = enabled
+        self.exporter = exporter
+        self.waterfall = waterfall
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """Start a span under the current one without making it current."""
+        trace = _current_trace.get()
+        if trace is None:
+            return NON_RECORDING_SPAN
+        parent = _current_span.get()
+        return Span(name, trace, parent.span_id if parent else None, attributes)
+
+    @contextmanager
+    def start_as_current_span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        span = self.start_span(name, attributes)
+        if span is NON_RECORDING_SPAN:
+            yield span
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    @contextmanager
+    def start_trace(self, name: str, request_id: str, traceparent: Optional[str] = None,
+                    attributes: Optional[Dict[str, Any]] = None):
+        """Start a request trace with a root span; export it when the block exits."""
+        if not self.enabled:
+            yield NON_RECORDING_SPAN
+            return
+        parent = parse_traceparent(traceparent)
+        trace = Trace(request_id, parent["trace_id"] if parent else None)
+        root = Span(name, trace, parent["parent_id"] if parent else None, attributes)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            root.end()
+            self._finish(trace)
+
+    def _finish(self, trace: Trace) -> None:
+        if self.exporter:
+            self.exporter.export(trace.spans)
+        if self.waterfall:
+            logger.info("\n" + format_waterfall(trace))
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator that runs a coroutine function inside a span."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return await func(*args, **kwargs)
+            with tracer.start_as_current_span(span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def traced_class(cls):
+    """Class decorator that wraps every public coroutine method in a span."""
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records outbound calls and propagates the request ID."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        span = tracer.start_span(
+            f"HTTP {request.method} {request.url.host}",
+            {"http.method": request.method, "http.url": str(request.url.copy_with(query=None))}
+        )
+        if span is NON_RECORDING_SPAN:
+            return await self._transport.handle_async_request(request)
+
+        request.headers[REQUEST_ID_HEADER] = span.trace.request_id
+        request.headers["traceparent"] = f"00-{span.trace.trace_id}-{span.span_id}-01"
+        try:
+            response = await self._transport.handle_async_request(request)
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status("ERROR")
+            return response
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+# Global instance
+tracer = Tracer()
+
+
+def configure_tracing(settings) -> Tracer:
+    """Apply tracing settings to the global tracer."""
+    tracer.enabled = settings.tracing_enabled
+    tracer.exporter = JsonFileExporter(settings.tracing_export_path) if settings.tracing_export_path else None
+    tracer.waterfall = settings.debug and settings.tracing_waterfall
+    return tracer